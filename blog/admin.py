@@ -1,9 +1,25 @@
 from django.contrib import admin
 from django.utils import timezone
 from django.utils.html import format_html
+
+from casipe.db import ImmediateWriteAdminMixin
+
+from . import archive, page_cache, related
 from .models import Post, PostAudio
 
 
+def audio_details(obj):
+    """
+    Size and bitrate from the stored metadata (blog/audio_metadata.py).
+    Never touches the file, so admin pages do no filesystem I/O.
+    """
+    if obj.audio_size is None:
+        return 'Reading file details…'
+    if obj.audio_bitrate:
+        return f'{obj.audio_size_formatted} · {obj.audio_bitrate} kbps'
+    return obj.audio_size_formatted
+
+
 # ========================================
 # INLINE FOR MULTIPLE AUDIO FILES
 # ========================================
@@ -24,10 +40,10 @@ class PostAudioInline(admin.TabularInline):
                 <audio controls style="width: 250px;">
                     <source src="{}" type="audio/mpeg">
                 </audio>
-                <br><small>{:.1f} MB</small>
+                <br><small>{}</small>
                 ''',
                 obj.audio_file.url,
-                obj.audio_file.size / (1024 * 1024)
+                audio_details(obj)
             )
         return format_html('<span style="color: #999;">No file</span>')
     
@@ -58,7 +74,7 @@ class PostAudioInline(admin.TabularInline):
 # ========================================
 # MAIN POST ADMIN
 # ========================================
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ImmediateWriteAdminMixin, admin.ModelAdmin):
     list_display = (
         'title', 
         'excerpt_preview', 
@@ -71,6 +87,7 @@ class PostAdmin(admin.ModelAdmin):
         'updated_at'
     )
     list_filter = ('is_published', 'reviewed', 'created_at', 'updated_at')
+    list_select_related = ('author',)
     search_fields = ('title', 'subtitle', 'excerpt', 'content', 'review_notes', 'meta_description')
     #prepopulated_fields = {'slug': ('title',)}
     date_hierarchy = 'created_at'
@@ -158,7 +175,7 @@ class PostAdmin(admin.ModelAdmin):
     
     def audio_count_display(self, obj):
         """Display count of audio files"""
-        count = obj.audio_files.count()
+        count = obj.audio_count
         if obj.audio_file:
             count += 1
         
@@ -269,14 +286,14 @@ class PostAdmin(admin.ModelAdmin):
                     </audio>
                     <div style="margin-top: 5px;">
                         <small><strong>File:</strong> {}</small><br>
-                        <small><strong>Size:</strong> {:.1f} MB</small>
+                        <small><strong>Size:</strong> {}</small>
                         {}
                     </div>
                 </div>
                 ''',
                 obj.audio_file.url,
                 obj.audio_file.name.split('/')[-1],
-                obj.audio_file.size / (1024 * 1024),
+                audio_details(obj),
                 f'<br><small><strong>Duration:</strong> {obj.audio_duration_formatted}</small>' if obj.audio_duration else ''
             )
         return format_html(
@@ -309,13 +326,26 @@ class PostAdmin(admin.ModelAdmin):
     # ========================================
     
     def unpublish_posts(self, request, queryset):
-        updated = queryset.update(is_published=False)
+        # update() sends no post_save signals: keep the archive, related posts and page cache in sync here
+        selected = Post.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        before = archive.count_buckets(selected)
+        updated = selected.update(is_published=False, updated_at=timezone.now())
+        archive.move_posts(before, archive.count_buckets(selected))
+        related.refresh_on_commit(selected.values_list('pk', flat=True))
+        page_cache.invalidate_on_commit()
         self.message_user(request, f'{updated} posts have been unpublished.')
     
     unpublish_posts.short_description = "Mark selected posts as unpublished"
     
     def publish_posts_now(self, request, queryset):
-        updated = queryset.update(is_published=True, published_date=timezone.now())
+        # update() sends no post_save signals: keep the archive, related posts and page cache in sync here
+        selected = Post.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        before = archive.count_buckets(selected)
+        now = timezone.now()
+        updated = selected.update(is_published=True, published_date=now, updated_at=now)
+        archive.move_posts(before, archive.count_buckets(selected))
+        related.refresh_on_commit(selected.values_list('pk', flat=True))
+        page_cache.invalidate_on_commit()
         self.message_user(request, f'{updated} posts have been published immediately.')
     
     publish_posts_now.short_description = "Publish selected posts now"
@@ -336,12 +366,12 @@ class PostAdmin(admin.ModelAdmin):
 # ========================================
 # STANDALONE POSTAUDIO ADMIN (Optional)
 # ========================================
-class PostAudioAdmin(admin.ModelAdmin):
+class PostAudioAdmin(ImmediateWriteAdminMixin, admin.ModelAdmin):
     """
     Standalone admin for PostAudio if you want to manage audio files separately.
     This is optional - you can remove it if you only want inline editing.
     """
-    list_display = ('title', 'post', 'audio_file', 'audio_duration', 'order', 'created_at')
+    list_display = ('title', 'post', 'audio_file', 'audio_duration', 'audio_bitrate', 'order', 'created_at')
     list_filter = ('created_at', 'post')
     search_fields = ('title', 'description', 'post__title')
     ordering = ('post', 'order', 'created_at')
@@ -358,11 +388,11 @@ class PostAudioAdmin(admin.ModelAdmin):
                     <source src="{}" type="audio/mpeg">
                 </audio>
                 <p><small><strong>File:</strong> {}</small><br>
-                <small><strong>Size:</strong> {:.1f} MB</small></p>
+                <small><strong>Size:</strong> {}</small></p>
                 ''',
                 obj.audio_file.url,
                 obj.audio_file.name.split('/')[-1],
-                obj.audio_file.size / (1024 * 1024)
+                audio_details(obj)
             )
         return format_html('<span style="color: #999;">No file</span>')
     
@@ -0,0 +1,143 @@
+"""
+Year/month archive index for the blog.
+
+ArchiveMonth stores how many published posts fall in each month of
+published_date. The counts are adjusted incrementally:
+
+    - Post save / delete      -> blog/signals.py (old bucket -1, new bucket +1)
+    - publish/unpublish admin -> blog/admin.py (queryset.update() sends no signals)
+
+Scheduled posts are counted as soon as they are published; get_archive_months()
+subtracts the ones that aren't live yet with an indexed range query on
+published_date, so the sidebar is always exact without scanning Post.
+`python manage.py rebuild_archive_index` recomputes everything in one grouped query.
+"""
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from django.utils.dates import MONTHS
+
+from casipe.db import immediate_atomic
+
+from .models import ArchiveMonth, Post
+
+
+def bucket(is_published, published_date):
+    """(year, month) a post is counted in, or None if it isn't published."""
+    if not is_published or published_date is None:
+        return None
+    published_date = timezone.localtime(published_date)
+    return published_date.year, published_date.month
+
+
+def saved_bucket(post_id):
+    """Bucket of the post as currently stored in the database."""
+    if post_id is None:
+        return None
+    row = Post.objects.filter(pk=post_id).values('is_published', 'published_date').first()
+    if row is None:
+        return None
+    return bucket(row['is_published'], row['published_date'])
+
+
+def count_buckets(queryset):
+    """Counter of buckets for the published posts in a queryset."""
+    dates = queryset.filter(
+        is_published=True, published_date__isnull=False
+    ).values_list('published_date', flat=True)
+    return Counter(bucket(True, published_date) for published_date in dates)
+
+
+def apply_changes(changes):
+    """
+    Add {(year, month): delta} to the stored counts. A missing month is
+    created at 0 first (in a savepoint, so a worker that loses the race to
+    create it just finds the other's row) and then updated like any other.
+    The write lock is taken up front, so the get_or_create read never has to
+    be upgraded.
+    """
+    with immediate_atomic():
+        for (year, month), delta in changes.items():
+            if not delta:
+                continue
+            months = ArchiveMonth.objects.filter(year=year, month=month)
+            if not months.update(post_count=F('post_count') + delta):
+                with transaction.atomic():
+                    ArchiveMonth.objects.get_or_create(year=year, month=month)
+                months.update(post_count=F('post_count') + delta)
+
+
+def move_post(old_bucket, new_bucket):
+    """Record a single post moving between buckets (None = not counted)."""
+    if old_bucket == new_bucket:
+        return
+    changes = Counter()
+    if old_bucket:
+        changes[old_bucket] -= 1
+    if new_bucket:
+        changes[new_bucket] += 1
+    apply_changes(changes)
+
+
+def move_posts(before, after):
+    """Record a bulk change given count_buckets() taken before and after it."""
+    changes = Counter(after)
+    changes.subtract(before)
+    apply_changes(changes)
+
+
+def rebuild():
+    """Recompute every month from scratch. Returns the number of months."""
+    rows = Post.objects.filter(
+        is_published=True, published_date__isnull=False
+    ).annotate(
+        year=ExtractYear('published_date'), month=ExtractMonth('published_date')
+    ).values('year', 'month').annotate(count=Count('id')).order_by()
+
+    with transaction.atomic():
+        ArchiveMonth.objects.all().delete()
+        months = ArchiveMonth.objects.bulk_create([
+            ArchiveMonth(year=row['year'], month=row['month'], post_count=row['count'])
+            for row in rows
+        ])
+    return len(months)
+
+
+def month_range(year, month):
+    """[start, end) datetimes of a month in the current timezone."""
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1))
+    return start, end
+
+
+def get_archive_months():
+    """
+    Live post counts for the archive sidebar, newest first:
+    [{'year': 2025, 'count': 5, 'months': [{'month': 3, 'name': 'March', 'count': 2}, ...]}, ...]
+    """
+    counts = Counter({
+        (row.year, row.month): row.post_count
+        for row in ArchiveMonth.objects.filter(post_count__gt=0)
+    })
+    # Scheduled posts are already counted but not visible yet
+    scheduled = Post.objects.filter(
+        is_published=True, published_date__gt=timezone.now()
+    ).values_list('published_date', flat=True)
+    for published_date in scheduled:
+        counts[bucket(True, published_date)] -= 1
+
+    years = {}
+    for (year, month), count in sorted(counts.items(), reverse=True):
+        if count <= 0:
+            continue
+        entry = years.setdefault(year, {'year': year, 'count': 0, 'months': []})
+        entry['count'] += count
+        entry['months'].append({'month': month, 'name': MONTHS[month], 'count': count})
+    return list(years.values())
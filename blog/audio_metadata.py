@@ -0,0 +1,281 @@
+"""
+Audio metadata for Post.audio_file and PostAudio.audio_file.
+
+Duration, bitrate and byte size are read from the uploaded file's headers in
+pure Python (MP3, Ogg Vorbis/Opus and WAV) by a background thread after the
+upload is committed, and stored on the model (audio_duration, audio_bitrate,
+audio_size). Admin pages then only read those columns instead of stat()ing
+every file on every render.
+
+    pre_save  -> a new or replaced file clears the stored metadata (blog/signals.py)
+    post_save -> models with audio_size missing are queued for extraction
+    `python manage.py extract_audio_metadata` fills in existing uploads.
+"""
+import logging
+import struct
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+AudioMetadata = namedtuple('AudioMetadata', ['duration', 'bitrate', 'size'])
+AudioMetadata.__doc__ = 'duration in seconds, bitrate in kbps, size in bytes (None when unknown)'
+
+HEADER_BYTES = 64 * 1024
+
+# ========================================
+# MP3
+# ========================================
+MP3_BITRATES = {
+    # (MPEG-1?, layer): kbps by bitrate index
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),   # MPEG-2.5
+}
+
+Mp3Frame = namedtuple('Mp3Frame', ['mpeg1', 'layer', 'bitrate', 'sample_rate', 'samples', 'length', 'mono'])
+
+
+def parse_mp3_frame(header):
+    """Decode a 4-byte MPEG audio frame header, or None if it isn't one."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate * 1000 // sample_rate + padding
+    mono = (header[3] >> 6) == 3
+    return Mp3Frame(mpeg1, layer, bitrate, sample_rate, samples, length, mono)
+
+
+def id3v2_size(data):
+    """Bytes taken by an ID3v2 tag at the start of the file (0 if none)."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def read_mp3(f, size):
+    head = f.read(10)
+    start = id3v2_size(head)
+    f.seek(start)
+    data = f.read(HEADER_BYTES)
+
+    # First frame header that is followed by another valid header
+    offset, frame = 0, None
+    while offset < len(data) - 4:
+        frame = parse_mp3_frame(data[offset:offset + 4])
+        if frame:
+            following = data[offset + frame.length:offset + frame.length + 4]
+            if len(following) < 4 or parse_mp3_frame(following):
+                break
+        frame = None
+        offset += 1
+    if frame is None:
+        return None
+    audio_start = start + offset
+
+    # VBR headers: Xing/Info (LAME) or VBRI (Fraunhofer)
+    if frame.mpeg1:
+        side_info = 17 if frame.mono else 32
+    else:
+        side_info = 9 if frame.mono else 17
+    frame_count = None
+    xing = data[offset + 4 + side_info:offset + 4 + side_info + 12]
+    if xing[:4] in (b'Xing', b'Info') and len(xing) == 12:
+        flags = struct.unpack('>I', xing[4:8])[0]
+        if flags & 0x01:
+            frame_count = struct.unpack('>I', xing[8:12])[0]
+    vbri = data[offset + 36:offset + 36 + 18]
+    if frame_count is None and vbri[:4] == b'VBRI' and len(vbri) == 18:
+        frame_count = struct.unpack('>I', vbri[14:18])[0]
+
+    audio_bytes = size - audio_start
+    f.seek(max(size - 128, 0))
+    if f.read(3) == b'TAG':
+        audio_bytes -= 128
+
+    if frame_count:
+        duration = frame_count * frame.samples / frame.sample_rate
+        bitrate = round(audio_bytes * 8 / duration / 1000) if duration else frame.bitrate
+    else:
+        bitrate = frame.bitrate
+        duration = audio_bytes * 8 / (bitrate * 1000)
+    return duration, bitrate
+
+
+# ========================================
+# OGG (Vorbis / Opus)
+# ========================================
+def read_ogg(f, size):
+    data = f.read(HEADER_BYTES)
+    if data[:4] != b'OggS' or len(data) < 27:
+        return None
+    segments = data[26]
+    packet = data[27 + segments:27 + segments + 64]
+    pre_skip = 0
+    if packet[:7] == b'\x01vorbis' and len(packet) >= 28:
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+    elif packet[:8] == b'OpusHead' and len(packet) >= 12:
+        sample_rate = 48000  # Opus granule positions always count 48 kHz samples
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+    else:
+        return None
+    if not sample_rate:
+        return None
+
+    # Granule position of the last page = total samples
+    f.seek(max(size - HEADER_BYTES, 0))
+    tail = f.read()
+    position = tail.rfind(b'OggS')
+    while position != -1:
+        page = tail[position:position + 14]
+        if len(page) == 14:
+            granule = struct.unpack('<q', page[6:14])[0]
+            if granule > 0:
+                duration = max(granule - pre_skip, 0) / sample_rate
+                bitrate = round(size * 8 / duration / 1000) if duration else None
+                return duration, bitrate
+        position = tail.rfind(b'OggS', 0, position)
+    return None
+
+
+# ========================================
+# WAV
+# ========================================
+def read_wav(f, size):
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:8])[0]
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size + (chunk_size & 1))
+            if len(fmt) < 16:
+                return None
+            byte_rate = struct.unpack('<I', fmt[8:12])[0]
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # Streamed files may not know their data size
+            data_size = min(chunk_size, size - f.tell())
+            return data_size / byte_rate, round(byte_rate * 8 / 1000)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def read_metadata(f, size):
+    """
+    Parse an open binary file. Always returns AudioMetadata;
+    duration/bitrate are None for unsupported or damaged files.
+    """
+    head = f.read(12)
+    f.seek(0)
+    if head[:4] == b'RIFF':
+        reader = read_wav
+    elif head[:4] == b'OggS':
+        reader = read_ogg
+    elif head[:3] == b'ID3' or parse_mp3_frame(head[:4]):
+        reader = read_mp3
+    else:
+        reader = None
+
+    result = None
+    if reader:
+        try:
+            result = reader(f, size)
+        except (struct.error, ZeroDivisionError, OSError):
+            result = None
+    if not result:
+        return AudioMetadata(None, None, size)
+    duration, bitrate = result
+    return AudioMetadata(round(duration), bitrate, size)
+
+
+def read_field_metadata(field_file):
+    """AudioMetadata for a FieldFile, read through its storage."""
+    size = field_file.size
+    with field_file.open('rb') as f:
+        return read_metadata(f, size)
+
+
+# ========================================
+# BACKGROUND EXTRACTION
+# ========================================
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='audio-metadata')
+    return _executor
+
+
+def update_metadata(model_label, pk):
+    """
+    Read the file of one Post/PostAudio and store its metadata.
+    Uses update() so no save signals (cache invalidation, ...) fire again.
+    """
+    model = apps.get_model(model_label)
+    obj = model.objects.filter(pk=pk).only('audio_file', 'audio_duration').first()
+    if obj is None or not obj.audio_file:
+        return None
+    try:
+        metadata = read_field_metadata(obj.audio_file)
+    except OSError:
+        logger.warning('Could not read audio file %s', obj.audio_file.name)
+        return None
+
+    values = {'audio_size': metadata.size, 'audio_bitrate': metadata.bitrate}
+    if metadata.duration is not None:
+        values['audio_duration'] = metadata.duration
+    # Only if the file hasn't been replaced in the meantime
+    model.objects.filter(pk=pk, audio_file=obj.audio_file.name).update(**values)
+    return metadata
+
+
+def _run_in_worker(model_label, pk):
+    try:
+        update_metadata(model_label, pk)
+    except Exception:
+        logger.exception('Audio metadata extraction failed for %s %s', model_label, pk)
+    finally:
+        connection.close()  # the worker thread has its own connection
+
+
+def extract_in_background(instance):
+    """Queue metadata extraction once the current transaction commits."""
+    model_label = instance._meta.label
+    pk = instance.pk
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, model_label, pk))
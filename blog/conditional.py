@@ -0,0 +1,154 @@
+"""
+Conditional GET (ETag / Last-Modified) for the public blog views.
+
+Each view gets a validators function that returns (etag, last_modified) from a
+single aggregate query. When the client (or a reverse proxy) already has the
+current version, a 304 Not Modified is returned without running the view or
+rendering any template.
+
+    post page  -> Post.updated_at / published_date plus the latest change to,
+                  and number of, its audio_files (so deleting one counts too)
+                  and of its live related posts
+    listings   -> latest updated_at / published_date and number of live posts,
+                  as an ETag only: unpublishing or deleting a post doesn't move
+                  any date forward, so a Last-Modified would let clients that
+                  only send If-Modified-Since keep a list that has changed
+
+Both pages also show author names and are rendered from templates and hashed
+static URLs, so every ETag also carries
+
+    - the authors version, a token replaced whenever an author with posts is
+      saved (blog/signals.py); losing it from the cache only costs one full response
+    - the release: settings.RELEASE_VERSION (set it per deploy) and the hash
+      of the collected staticfiles manifest
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Post
+
+
+AUTHORS_KEY = 'blog:conditional:authors'
+
+
+def authors_version():
+    """(token, changed_at) of the author data shown on blog pages."""
+    version = cache.get(AUTHORS_KEY)
+    if version is None:
+        version = (uuid.uuid4().hex, timezone.now())
+        cache.set(AUTHORS_KEY, version, None)
+    return version
+
+
+def authors_changed():
+    cache.delete(AUTHORS_KEY)
+
+
+def authors_changed_on_commit():
+    transaction.on_commit(authors_changed)
+
+
+def release():
+    """Changes whenever a deploy can change the rendered pages."""
+    return getattr(settings, 'RELEASE_VERSION', ''), getattr(staticfiles_storage, 'manifest_hash', '')
+
+
+def _etag(*parts):
+    parts += release()
+    value = '|'.join('' if part is None else str(part) for part in parts)
+    return quote_etag(hashlib.md5(value.encode('utf-8')).hexdigest())
+
+
+def _latest(*timestamps):
+    timestamps = [ts for ts in timestamps if ts is not None]
+    return max(timestamps) if timestamps else None
+
+
+def post_validators(request, slug):
+    """Validators for post_page, or None if the post isn't live (the view returns 404)."""
+    live_related = Q(
+        related_links__related__is_published=True,
+        related_links__related__published_date__lte=timezone.now()
+    )
+    row = Post.objects.published().filter(slug=slug).aggregate(
+        posts=Count('id', distinct=True),
+        updated_at=Max('updated_at'),
+        published_date=Max('published_date'),
+        audio_updated_at=Max('audio_files__updated_at'),
+        audio_count=Count('audio_files', distinct=True),
+        # Neighbour lists are rewritten (new computed_at) whenever they change
+        related_computed_at=Max('related_links__computed_at'),
+        related_updated_at=Max('related_links__related__updated_at', filter=live_related),
+        related_count=Count('related_links', filter=live_related, distinct=True),
+    )
+    if not row['posts']:
+        return None
+    authors, authors_changed_at = authors_version()
+    etag = _etag(
+        slug, row['updated_at'], row['published_date'],
+        row['audio_updated_at'], row['audio_count'],
+        row['related_computed_at'], row['related_updated_at'], row['related_count'],
+        settings.MEDIA_URL, authors
+    )
+    return etag, _latest(
+        row['updated_at'], row['published_date'], row['audio_updated_at'],
+        row['related_computed_at'], row['related_updated_at'], authors_changed_at
+    )
+
+
+def listing_validators(request, *args, **kwargs):
+    """Validators shared by the archive and search listings (no Last-Modified, see above)."""
+    row = Post.objects.published().aggregate(
+        posts=Count('id'),
+        ids=Sum('id'),
+        updated_at=Max('updated_at'),
+        published_date=Max('published_date'),
+    )
+    authors = authors_version()[0]
+    return _etag(row['posts'], row['ids'], row['updated_at'], row['published_date'], authors), None
+
+
+def conditional_page(validators_func):
+    """
+    Like django.views.decorators.http.condition, but the ETag and Last-Modified
+    values come from one call (one query) instead of two.
+    Responses must be revalidated (Cache-Control: no-cache) so a new post or
+    edit is picked up on the next request.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            validators = validators_func(request, *args, **kwargs)
+            if validators is None:
+                return view_func(request, *args, **kwargs)
+
+            etag, last_modified = validators
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                if not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                if timestamp and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(timestamp)
+                patch_cache_control(response, no_cache=True)
+            return response
+
+        return inner
+
+    return decorator
@@ -0,0 +1,178 @@
+"""
+RSS 2.0 and Atom feeds of the latest live blog posts, streamed from cached entries.
+
+A feed is a header, FEED_SIZE entries and a footer. Every <item>/<entry> is
+rendered once and cached under a key that contains everything it depends on
+(post id, updated_at, published_date, author name, site URL), so serving a feed
+costs one small query for the latest posts plus one get_many() for their
+entries; only posts that changed since they were last rendered are rendered
+again (with one query for all of them).
+
+Saving a post or a scheduled post going live (post_went_live) renders its
+entries straight into the cache (blog/signals.py), so the next feed request
+only has to splice them in. The response itself is streamed and revalidated
+with the listing ETag (blog/conditional.py).
+"""
+import hashlib
+from io import StringIO
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .models import Post
+
+FEED_SIZE = 20
+
+ENTRY_TIMEOUT = 60 * 60 * 24 * 30  # 30 days; stale versions just expire
+
+# Site URL of the last feed request, used to render entries outside a request
+BASE_URL_KEY = 'blog:feed:base_url'
+
+TITLE = 'Casipe.net Blog'
+DESCRIPTION = 'Spanish learning posts from Casipe.net'
+
+ENTRY_FIELDS = ('pk', 'slug', 'updated_at', 'published_date', 'author__nickname', 'author__username')
+
+
+class LatestDateMixin:
+    """lastBuildDate / <updated> from our entries instead of feed.items (which stay empty)."""
+    latest = None
+
+    def latest_post_date(self):
+        return self.latest or super().latest_post_date()
+
+
+class PostRssFeed(LatestDateMixin, Rss201rev2Feed):
+    item_element = 'item'
+    footer = '</channel></rss>'
+
+    def write_header(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+        self.add_root_elements(handler)
+
+
+class PostAtomFeed(LatestDateMixin, Atom1Feed):
+    item_element = 'entry'
+    footer = '</feed>'
+
+    def write_header(self, handler):
+        handler.startElement('feed', self.root_attributes())
+        self.add_root_elements(handler)
+
+
+FEED_CLASSES = {
+    'rss': PostRssFeed,
+    'atom': PostAtomFeed,
+}
+
+
+def author_name(row):
+    return row['author__nickname'] or row['author__username']
+
+
+def entry_key(kind, base_url, row):
+    version = '|'.join(str(part) for part in (
+        base_url, row['updated_at'].isoformat(), row['published_date'].isoformat(), author_name(row)
+    ))
+    return f"blog:feed:{kind}:{row['pk']}:{hashlib.md5(version.encode('utf-8')).hexdigest()}"
+
+
+def make_feed(kind, base_url):
+    return FEED_CLASSES[kind](
+        title=TITLE,
+        link=base_url + reverse('blog'),
+        description=DESCRIPTION,
+        feed_url=base_url + reverse(f'blog_{kind}'),
+        language='es',
+    )
+
+
+def render_entry(feed, post, row, base_url):
+    """XML of one <item>/<entry>."""
+    link = base_url + reverse('post_page', args=[post.slug])
+    feed.add_item(
+        title=post.title,
+        link=link,
+        description=post.excerpt or Truncator(strip_tags(post.content)).words(60),
+        unique_id=link,
+        pubdate=row['published_date'],
+        updateddate=row['updated_at'],
+        author_name=author_name(row),
+    )
+    item = feed.items.pop()
+    stream = StringIO()
+    handler = SimplerXMLGenerator(stream, 'utf-8', short_empty_elements=True)
+    handler.startElement(feed.item_element, feed.item_attributes(item))
+    feed.add_item_elements(handler, item)
+    handler.endElement(feed.item_element)
+    return stream.getvalue()
+
+
+def render_header(feed):
+    stream = StringIO()
+    handler = SimplerXMLGenerator(stream, 'utf-8')
+    handler.startDocument()
+    feed.write_header(handler)
+    return stream.getvalue()
+
+
+def latest_rows():
+    return list(
+        Post.objects.published().order_by('-published_date', '-pk').values(*ENTRY_FIELDS)[:FEED_SIZE]
+    )
+
+
+def feed_response(request, kind):
+    base_url = f'{request.scheme}://{request.get_host()}'
+    if cache.get(BASE_URL_KEY) != base_url:
+        cache.set(BASE_URL_KEY, base_url, None)
+
+    rows = latest_rows()
+    keys = [entry_key(kind, base_url, row) for row in rows]
+    cached = cache.get_many(keys)
+    missing = {row['pk'] for row, key in zip(rows, keys) if key not in cached}
+    posts = Post.objects.only('slug', 'title', 'excerpt', 'content').in_bulk(missing) if missing else {}
+
+    feed = make_feed(kind, base_url)
+    if rows:
+        feed.latest = max(max(row['updated_at'], row['published_date']) for row in rows)
+
+    def stream():
+        yield render_header(feed)
+        rendered = {}
+        for row, key in zip(rows, keys):
+            entry = cached.get(key)
+            if entry is None:
+                entry = rendered[key] = render_entry(feed, posts[row['pk']], row, base_url)
+            yield entry
+        yield feed.footer
+        if rendered:
+            cache.set_many(rendered, ENTRY_TIMEOUT)
+
+    return StreamingHttpResponse(stream(), content_type=feed.content_type)
+
+
+def refresh_entry(post_id):
+    """Render the entries of one post into the cache (no-op until a feed has been requested)."""
+    base_url = cache.get(BASE_URL_KEY)
+    if base_url is None:
+        return
+    row = Post.objects.published().filter(pk=post_id).values(*ENTRY_FIELDS).first()
+    if row is None:
+        return  # unpublished, scheduled or deleted: simply not in the next feed
+    post = Post.objects.only('slug', 'title', 'excerpt', 'content').get(pk=post_id)
+    cache.set_many({
+        entry_key(kind, base_url, row): render_entry(make_feed(kind, base_url), post, row, base_url)
+        for kind in FEED_CLASSES
+    }, ENTRY_TIMEOUT)
+
+
+def refresh_entry_on_commit(post_id):
+    transaction.on_commit(lambda: refresh_entry(post_id))
@@ -0,0 +1,5 @@
+"""
+FullTextField now lives in casipe/fts.py, shared with temario. It is
+re-exported here because migration 0010 imports it from blog.fields.
+"""
+from casipe.fts import FullTextField, Match  # noqa: F401
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from blog.audio_metadata import update_metadata
+from blog.models import Post, PostAudio
+
+
+class Command(BaseCommand):
+    help = 'Read duration, bitrate and size of uploaded blog audio files into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-read every file, not only the ones without stored metadata'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, PostAudio):
+            queryset = model.objects.exclude(audio_file='').exclude(audio_file__isnull=True)
+            if not options['all']:
+                queryset = queryset.filter(audio_size__isnull=True)
+
+            updated = 0
+            for pk in queryset.values_list('pk', flat=True).iterator():
+                metadata = update_metadata(model._meta.label, pk)
+                if metadata is None:
+                    self.stderr.write(f'{model.__name__} {pk}: file missing or unreadable')
+                    continue
+                updated += 1
+                if metadata.duration is None:
+                    self.stderr.write(f'{model.__name__} {pk}: unsupported format, only the size was stored')
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.verbose_name_plural}: {updated} updated'))
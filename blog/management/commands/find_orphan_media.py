@@ -0,0 +1,103 @@
+import os
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from blog import media_index
+from blog.models import MediaReference
+from casipe import images
+
+
+class Command(BaseCommand):
+    help = 'List files in MEDIA_ROOT that nothing references, and {{MEDIA:...}} references to missing files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute the media reference index before comparing'
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete the orphaned files older than the grace period (always rebuilds the index first)'
+        )
+
+    def handle(self, *args, **options):
+        # Never delete on the word of an index that may have missed a field or a save
+        if options['rebuild'] or options['delete']:
+            count = media_index.rebuild()
+            self.stdout.write(f'Rebuilt media reference index: {count} references')
+
+        files = self.media_files()
+
+        referenced = defaultdict(list)
+        for path, content_type_id, object_id, source in MediaReference.objects.values_list(
+            'path', 'content_type', 'object_id', 'source'
+        ).iterator():
+            referenced[path].append((content_type_id, object_id, source))
+
+        # Derivatives live in derivatives/<content hash>/ (casipe/images.py)
+        live_hashes = set()
+        for model, field_name, derivatives_field in images.registry:
+            for derivatives in model._default_manager.values_list(derivatives_field, flat=True).iterator():
+                if derivatives and 'hash' in derivatives:
+                    live_hashes.add(derivatives['hash'])
+
+        # Uploads not committed yet and derivatives being written aren't indexed yet
+        cutoff = time.time() - media_index.get_grace_period()
+        orphans = []
+        recent = 0
+        for path, (size, modified) in sorted(files.items()):
+            if path in referenced:
+                continue
+            parts = path.split('/')
+            if parts[0] == images.DERIVATIVES_DIR and len(parts) == 3 and parts[1] in live_hashes:
+                continue
+            if modified > cutoff:
+                recent += 1
+                continue
+            orphans.append((path, size))
+
+        dangling = sorted(path for path in referenced if path not in files)
+
+        self.report_orphans(orphans, options['delete'])
+        if recent:
+            self.stdout.write(f'Skipped {recent} unreferenced files newer than the grace period')
+        self.report_dangling(dangling, referenced)
+
+    def media_files(self):
+        """{relative path: (size, mtime)} for every file under MEDIA_ROOT, in one walk."""
+        files = {}
+        root = settings.MEDIA_ROOT
+        for directory, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                full_path = os.path.join(directory, filename)
+                relative = os.path.relpath(full_path, root).replace(os.sep, '/')
+                stat = os.stat(full_path)
+                files[relative] = (stat.st_size, stat.st_mtime)
+        return files
+
+    def report_orphans(self, orphans, delete):
+        total = sum(size for path, size in orphans)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Orphaned files: {len(orphans)} ({total / (1024 * 1024):.1f} MB)'
+        ))
+        for path, size in orphans:
+            self.stdout.write(f'  {path} ({size / 1024:.0f} KB)')
+            if delete:
+                os.remove(os.path.join(settings.MEDIA_ROOT, path))
+        if delete and orphans:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {len(orphans)} files'))
+
+    def report_dangling(self, dangling, referenced):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'References to missing files: {len(dangling)}'))
+        for path in dangling:
+            users = ', '.join(
+                f'{ContentType.objects.get_for_id(content_type_id).model} #{object_id} ({source})'
+                for content_type_id, object_id, source in referenced[path]
+            )
+            self.stdout.write(self.style.WARNING(f'  {path}: {users}'))
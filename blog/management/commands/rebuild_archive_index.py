@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog import archive
+
+
+class Command(BaseCommand):
+    help = 'Recompute the year/month post counts used by the blog archive'
+
+    def handle(self, *args, **options):
+        count = archive.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt archive index: {count} months'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the TF-IDF related posts of every published post and save the corpus snapshot '
+        '(run once after deploying, then nightly to refresh IDF weights)'
+    )
+
+    def handle(self, *args, **options):
+        if not related.is_available():
+            raise CommandError('NumPy is not installed')
+        count = related.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt related posts for {count} posts'))
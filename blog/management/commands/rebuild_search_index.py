@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog import search
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all blog posts'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite FTS5; nothing to rebuild'))
+            return
+
+        count = search.rebuild_index(Post.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} posts'))
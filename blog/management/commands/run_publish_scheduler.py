@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog.scheduler import PublishScheduler, wake_socket
+
+
+class Command(BaseCommand):
+    help = 'Send go-live events for scheduled blog posts exactly at their published_date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=60,
+            help='Seconds between reloads of the schedule; saved posts wake the scheduler at once, '
+                 'this catches changes made without signals'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process posts that are due now and exit (for cron)'
+        )
+
+    def handle(self, *args, **options):
+        scheduler = PublishScheduler(poll_interval=options['poll_interval'])
+
+        if options['once']:
+            self._report(scheduler.run_pending())
+            return
+
+        sock = wake_socket()
+        self.stdout.write(self.style.SUCCESS(
+            'Publish scheduler started (listening for schedule changes on %s:%d)' % sock.getsockname()
+        ))
+        try:
+            while True:
+                close_old_connections()
+                self._report(scheduler.run_pending())
+                scheduler.wait(sock, scheduler.seconds_until_next())
+        except KeyboardInterrupt:
+            self.stdout.write('Publish scheduler stopped')
+        finally:
+            sock.close()
+
+    def _report(self, posts):
+        for post in posts:
+            self.stdout.write(f'Went live: {post.title} ({post.published_date:%Y-%m-%d %H:%M})')
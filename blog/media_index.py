@@ -0,0 +1,154 @@
+"""
+Index of the files under MEDIA_ROOT that are actually used.
+
+Authors paste {{MEDIA:blog/audio/...}} placeholders into Post.content and
+nothing else knew which uploads were still referenced, so media/ only grew.
+MediaReference rows record, per object, every path it uses:
+
+    - FileField / ImageField values (Post.image, PostAudio.audio_file,
+      Reader.cover_image), source = field name
+    - {{MEDIA:...}} placeholders and MEDIA_URL links (e.g. CKEditor uploads)
+      in text fields rendered as HTML (Post.content, Reader.content, ...),
+      source = field name
+
+Models that can reference media opt in with connect(); see blog/signals.py
+and readers/signals.py. The rows of one object are diffed and updated on
+every save and dropped on delete. `python manage.py find_orphan_media`
+compares the index with one walk over MEDIA_ROOT to list unreferenced files
+and placeholders pointing at missing files. Its --delete always rebuilds the
+index first, so a file is never deleted on the word of an index that missed a
+save, and it leaves files younger than get_grace_period() alone: uploads
+whose transaction hasn't committed and derivatives still being written
+aren't in the index yet.
+"""
+import re
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import MediaReference
+from .rendering import MEDIA_PATTERN
+
+DEFAULT_GRACE_PERIOD = 24 * 60 * 60  # 1 day
+
+# {model: (field name, ...)} registered with connect()
+registry = {}
+
+
+def get_grace_period():
+    """Seconds a new file is kept by find_orphan_media --delete even though nothing references it."""
+    return getattr(settings, 'MEDIA_ORPHAN_GRACE_PERIOD', DEFAULT_GRACE_PERIOD)
+
+
+def file_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if field.name in registry.get(model, ()) and isinstance(field, models.FileField)
+    ]
+
+
+def text_fields(model):
+    return tuple(
+        field.name for field in model._meta.concrete_fields
+        if field.name in registry.get(model, ()) and not isinstance(field, models.FileField)
+    )
+
+
+def tracked_models():
+    return list(registry)
+
+
+def media_url_pattern():
+    # Links like /media/uploads/photo.jpg or https://site/media/uploads/photo.jpg
+    return re.compile(re.escape(settings.MEDIA_URL) + r'''([^"'\s<>()?#]+)''')
+
+
+def content_paths(text):
+    """Media paths referenced in a piece of HTML."""
+    if not text:
+        return set()
+    paths = {match.strip() for match in MEDIA_PATTERN.findall(text)}
+    paths.update(unquote(match) for match in media_url_pattern().findall(text))
+    return {path.lstrip('/') for path in paths if path}
+
+
+def references(instance):
+    """{(source, path)} used by one object."""
+    found = set()
+    for field in file_fields(type(instance)):
+        field_file = getattr(instance, field.attname)
+        if field_file:
+            found.add((field.name, field_file.name))
+    for field_name in text_fields(type(instance)):
+        found.update((field_name, path) for path in content_paths(getattr(instance, field_name)))
+    return found
+
+
+def sync(instance, update_fields=None):
+    """Bring the index rows of one object in line with its current values."""
+    model = type(instance)
+    if update_fields is not None and not set(registry[model]) & set(update_fields):
+        return  # e.g. the admin publish actions
+
+    content_type = ContentType.objects.get_for_model(model)
+    current = references(instance)
+    existing = {
+        (source, path): pk
+        for pk, source, path in MediaReference.objects.filter(
+            content_type=content_type, object_id=instance.pk
+        ).values_list('pk', 'source', 'path')
+    }
+
+    removed = [pk for reference, pk in existing.items() if reference not in current]
+    if removed:
+        MediaReference.objects.filter(pk__in=removed).delete()
+    added = current - existing.keys()
+    if added:
+        MediaReference.objects.bulk_create([
+            MediaReference(path=path, source=source, content_type=content_type, object_id=instance.pk)
+            for source, path in added
+        ])
+
+
+def remove(instance):
+    MediaReference.objects.filter(
+        content_type=ContentType.objects.get_for_model(type(instance)),
+        object_id=instance.pk
+    ).delete()
+
+
+def rebuild():
+    """Recompute the whole index."""
+    rows = []
+    for model in tracked_models():
+        content_type = ContentType.objects.get_for_model(model)
+        for instance in model._default_manager.only('pk', *registry[model]).iterator():
+            rows.extend(
+                MediaReference(path=path, source=source, content_type=content_type, object_id=instance.pk)
+                for source, path in references(instance)
+            )
+    with transaction.atomic():
+        MediaReference.objects.all().delete()
+        MediaReference.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+
+def connect(model, *field_names):
+    """
+    Index the media used by model: FileField / ImageField values and the
+    placeholders and media links in the other field_names.
+    """
+    def update_references(sender, instance, update_fields=None, **kwargs):
+        sync(instance, update_fields)
+
+    def remove_references(sender, instance, **kwargs):
+        remove(instance)
+
+    registry[model] = field_names
+    uid = f'{model._meta.label}:media_index'
+    post_save.connect(update_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(remove_references, sender=model, weak=False, dispatch_uid=uid)
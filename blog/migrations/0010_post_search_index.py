@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:07
+
+import blog.fields
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+FTS_TABLE = 'blog_post_fts'
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 table and index the existing posts (SQLite only)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "title, subtitle, excerpt, content, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    # Rank by BM25 with title > subtitle > excerpt > content
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 5.0, 3.0, 1.0)')"
+    )
+    Post = apps.get_model('blog', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        for post in Post.objects.iterator():
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, subtitle, excerpt, content) VALUES (%s, %s, %s, %s, %s)",
+                [post.pk, post.title, post.subtitle, post.excerpt, strip_tags(post.content)]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_postaudio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='blog.post')),
+                ('title', models.TextField()),
+                ('subtitle', models.TextField()),
+                ('excerpt', models.TextField()),
+                ('content', models.TextField()),
+                ('document', blog.fields.FullTextField(db_column='blog_post_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'blog_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:13
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def populate_archive(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    ArchiveMonth = apps.get_model('blog', 'ArchiveMonth')
+    rows = Post.objects.filter(
+        is_published=True, published_date__isnull=False
+    ).annotate(
+        year=ExtractYear('published_date'), month=ExtractMonth('published_date')
+    ).values('year', 'month').annotate(count=Count('id')).order_by()
+    ArchiveMonth.objects.bulk_create([
+        ArchiveMonth(year=row['year'], month=row['month'], post_count=row['count'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_postaudio_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('post_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+                'constraints': [models.UniqueConstraint(fields=('year', 'month'), name='blog_archivemonth_year_month_unique')],
+            },
+        ),
+        migrations.RunPython(populate_archive, migrations.RunPython.noop),
+    ]
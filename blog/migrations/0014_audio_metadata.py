@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_archivemonth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='audio_bitrate',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='kbps', null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='audio_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Bytes', null=True),
+        ),
+        migrations.AddField(
+            model_name='postaudio',
+            name='audio_bitrate',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='kbps', null=True),
+        ),
+        migrations.AddField(
+            model_name='postaudio',
+            name='audio_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, help_text='Bytes', null=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='audio_duration',
+            field=models.PositiveIntegerField(blank=True, help_text='Duration in seconds (read from the file after upload)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='postaudio',
+            name='audio_duration',
+            field=models.PositiveIntegerField(blank=True, help_text='Duration in seconds (read from the file after upload)', null=True),
+        ),
+    ]
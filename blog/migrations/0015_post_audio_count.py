@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_audio_count(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    PostAudio = apps.get_model('blog', 'PostAudio')
+    counts = PostAudio.objects.filter(post=OuterRef('pk')).values('post').annotate(c=Count('pk')).values('c')
+    Post.objects.update(audio_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_audio_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='audio_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_audio_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:23
+
+import re
+from urllib.parse import unquote
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of what blog.media_index indexed when this migration was written
+MEDIA_PATTERN = re.compile(r'\{\{MEDIA:(.*?)\}\}')
+TEXT_FIELDS = {
+    'blog.Post': ('content',),
+}
+
+
+def content_paths(text):
+    if not text:
+        return set()
+    media_url_pattern = re.compile(re.escape(settings.MEDIA_URL) + r'''([^"'\s<>()?#]+)''')
+    paths = {match.strip() for match in MEDIA_PATTERN.findall(text)}
+    paths.update(unquote(match) for match in media_url_pattern.findall(text))
+    return {path.lstrip('/') for path in paths if path}
+
+
+def populate_media_references(apps, schema_editor):
+    MediaReference = apps.get_model('blog', 'MediaReference')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    rows = []
+    for model in apps.get_models():
+        file_fields = [field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+        text_fields = TEXT_FIELDS.get(model._meta.label, ())
+        if not file_fields and not text_fields:
+            continue
+        content_type = ContentType.objects.get_for_model(model)
+        for instance in model._default_manager.only('pk', *file_fields, *text_fields).iterator():
+            found = {(name, getattr(instance, name).name) for name in file_fields if getattr(instance, name)}
+            for name in text_fields:
+                found.update((name, path) for path in content_paths(getattr(instance, name)))
+            rows.extend(
+                MediaReference(path=path, source=source, content_type=content_type, object_id=instance.pk)
+                for source, path in found
+            )
+    MediaReference.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_image_derivatives'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Relative to MEDIA_ROOT', max_length=500)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('source', models.CharField(max_length=100)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['content_type', 'object_id'], name='blog_mediaref_object_idx'), models.Index(fields=['path'], name='blog_mediaref_path_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id', 'source', 'path'), name='blog_mediareference_unique')],
+            },
+        ),
+        migrations.RunPython(populate_media_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_relatedpost'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postaudio',
+            index=models.Index(fields=['post', 'order', 'created_at'], name='blog_postaudio_post_order_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_postaudio_post_order_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed_until', models.DateTimeField()),
+            ],
+        ),
+    ]
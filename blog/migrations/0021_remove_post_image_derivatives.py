@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_publishwatermark'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='post',
+            name='image_derivatives',
+        ),
+    ]
@@ -1,14 +1,53 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 
+from casipe.fts import FullTextField
+from casipe.maintained import MaintainedFieldsMixin
+
 User = get_user_model()
 
 
+# ========================================
+# POST QUERIES
+# ========================================
+class PostQuerySet(models.QuerySet):
+    # Columns shown on listing cards (templates/blog/blog.html)
+    CARD_FIELDS = (
+        'title',
+        'slug',
+        'excerpt',
+        'published_date',
+        'author__nickname',
+        'author__username',
+    )
+
+    def published(self):
+        """Posts that are published and whose published_date has passed."""
+        return self.filter(is_published=True, published_date__lte=timezone.now())
+
+    def cards(self):
+        """
+        Lightweight projection for listing pages: only the card columns
+        (no content TextField) with the author fetched in the same query.
+        """
+        return self.select_related('author').only(*self.CARD_FIELDS)
+
+
 # ========================================
 # MAIN POST MODEL
 # ========================================
-class Post(models.Model):
+class Post(MaintainedFieldsMixin, models.Model):
+    # Written with F()/update() by signals and workers, not by ordinary saves (casipe/maintained.py)
+    maintained_fields = {
+        'audio_count': None,
+        'audio_duration': 'audio_file',
+        'audio_bitrate': 'audio_file',
+        'audio_size': 'audio_file',
+    }
+
     title = models.CharField(max_length=200)
     subtitle = models.CharField(max_length=250, blank=True, help_text="Optional subtitle or tagline")
     slug = models.SlugField(unique=True)
@@ -31,8 +70,13 @@ class Post(models.Model):
     audio_duration = models.PositiveIntegerField(
         blank=True, 
         null=True, 
-        help_text="Duration in seconds"
+        help_text="Duration in seconds (read from the file after upload)"
     )
+    # Filled in by the audio metadata worker (blog/audio_metadata.py)
+    audio_bitrate = models.PositiveIntegerField(blank=True, null=True, editable=False, help_text="kbps")
+    audio_size = models.PositiveBigIntegerField(blank=True, null=True, editable=False, help_text="Bytes")
+    # Number of PostAudio rows, kept up to date by blog/signals.py
+    audio_count = models.PositiveIntegerField(default=0, editable=False)
     
     is_published = models.BooleanField(default=False)
     published_date = models.DateTimeField(blank=True, null=True)
@@ -42,6 +86,20 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Public listings: published posts ordered/paginated on (published_date, id).
+            # Partial index because Django filters booleans as WHERE "is_published",
+            # which SQLite can't match against a regular (is_published, ...) index.
+            models.Index(
+                fields=['published_date'],
+                condition=models.Q(is_published=True),
+                name='blog_post_published_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -76,7 +134,7 @@ class Post(models.Model):
         """
         Returns True if the post has any audio files attached.
         """
-        return bool(self.audio_file) or self.audio_files.exists()
+        return bool(self.audio_file) or self.audio_count > 0
 
     @property
     def audio_duration_formatted(self):
@@ -87,15 +145,28 @@ class Post(models.Model):
             return f"{minutes}:{seconds:02d}"
         return None
 
+    @property
+    def audio_size_formatted(self):
+        """Return the stored file size in MB, without touching the file"""
+        if self.audio_size is not None:
+            return f"{self.audio_size / (1024 * 1024):.1f} MB"
+        return None
+
 
 # ========================================
 # RELATED AUDIO MODEL (NEW!)
 # ========================================
-class PostAudio(models.Model):
+class PostAudio(MaintainedFieldsMixin, models.Model):
     """
     Multiple audio files can be attached to a single post.
     This allows unlimited audio files per post.
     """
+    # Written by the audio metadata worker, see blog/audio_metadata.py
+    maintained_fields = {
+        'audio_duration': 'audio_file',
+        'audio_bitrate': 'audio_file',
+        'audio_size': 'audio_file',
+    }
     post = models.ForeignKey(
         Post, 
         on_delete=models.CASCADE, 
@@ -112,8 +183,11 @@ class PostAudio(models.Model):
     audio_duration = models.PositiveIntegerField(
         blank=True, 
         null=True, 
-        help_text="Duration in seconds (optional)"
+        help_text="Duration in seconds (read from the file after upload)"
     )
+    # Filled in by the audio metadata worker (blog/audio_metadata.py)
+    audio_bitrate = models.PositiveIntegerField(blank=True, null=True, editable=False, help_text="kbps")
+    audio_size = models.PositiveBigIntegerField(blank=True, null=True, editable=False, help_text="Bytes")
     description = models.CharField(
         max_length=500,
         blank=True,
@@ -124,11 +198,16 @@ class PostAudio(models.Model):
         help_text="Display order (lower numbers appear first)"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order', 'created_at']
         verbose_name = "Post Audio File"
         verbose_name_plural = "Post Audio Files"
+        indexes = [
+            # post.audio_files.all() in display order, without a sort step
+            models.Index(fields=['post', 'order', 'created_at'], name='blog_postaudio_post_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.post.title} - {self.title}"
@@ -141,6 +220,13 @@ class PostAudio(models.Model):
             seconds = self.audio_duration % 60
             return f"{minutes}:{seconds:02d}"
         return None
+
+    @property
+    def audio_size_formatted(self):
+        """Return the stored file size in MB, without touching the file"""
+        if self.audio_size is not None:
+            return f"{self.audio_size / (1024 * 1024):.1f} MB"
+        return None
     
     @property
     def file_path_for_content(self):
@@ -151,4 +237,134 @@ class PostAudio(models.Model):
         if self.audio_file:
             # Return the path without 'media/' prefix
             return str(self.audio_file.name)
-        return ""
\ No newline at end of file
+        return ""
+
+
+# ========================================
+# ARCHIVE INDEX
+# ========================================
+class ArchiveMonth(models.Model):
+    """
+    Number of published posts per year/month of their published_date.
+    Kept up to date incrementally by blog.archive, so the archive sidebar
+    reads this small table instead of aggregating over Post.
+    Scheduled posts are counted in their month as soon as they are published.
+    """
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    post_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='blog_archivemonth_year_month_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d}: {self.post_count} posts"
+
+
+# ========================================
+# PUBLISH SCHEDULER
+# ========================================
+class PublishWatermark(models.Model):
+    """
+    Single row: the time up to which blog.scheduler has sent go-live events.
+    Kept in the database (not the cache, which culls entries) so a restarted
+    scheduler catches up on every post that went live while it was down.
+    """
+    processed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"Go-live events sent up to {self.processed_until}"
+
+
+# ========================================
+# RELATED POSTS
+# ========================================
+class RelatedPost(models.Model):
+    """
+    Precomputed "related reading" for a post: its TOP_K most similar posts
+    by TF-IDF cosine similarity, maintained by blog.related.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['post', 'rank']
+        indexes = [
+            models.Index(fields=['post', 'rank'], name='blog_relatedpost_post_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_relatedpost_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.2f})"
+
+
+# ========================================
+# MEDIA REFERENCES
+# ========================================
+class MediaReference(models.Model):
+    """
+    One file under MEDIA_ROOT used by one object: the value of a FileField /
+    ImageField, or a {{MEDIA:...}} placeholder or media link in a text field
+    registered with media_index.connect() (Post.content, Reader.description, ...).
+    source is the name of the field it was found in.
+    Kept up to date by blog.media_index; read by the find_orphan_media command.
+    """
+    path = models.CharField(max_length=500, help_text="Relative to MEDIA_ROOT")
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    source = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='blog_mediaref_object_idx'),
+            models.Index(fields=['path'], name='blog_mediaref_path_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'source', 'path'],
+                name='blog_mediareference_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.path} ({self.source})"
+
+
+# ========================================
+# FULL-TEXT SEARCH INDEX (SQLite FTS5)
+# ========================================
+class PostSearchIndex(models.Model):
+    """
+    Read-only mapping of the FTS5 table that indexes post text.
+    The table is created by migration 0010 and kept in sync by blog.search,
+    so Django never creates or alters it (managed = False).
+    Use it through the reverse relation: Post.objects.filter(search_index__document__match=...)
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index'
+    )
+    title = models.TextField()
+    subtitle = models.TextField()
+    excerpt = models.TextField()
+    content = models.TextField()
+    # Hidden FTS5 columns
+    document = FullTextField(db_column='blog_post_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'blog_post_fts'
@@ -0,0 +1,134 @@
+"""
+Full-page cache for the public blog views (archive, search, post pages).
+
+Only anonymous GET/HEAD requests are cached. Every cached page is stored under
+the current cache *generation*; starting a new generation makes all existing
+pages unreachable at once. A new generation starts when:
+
+    - a Post or PostAudio is saved or deleted (blog/signals.py)
+    - the publish / unpublish admin actions run (blog/admin.py)
+    - a scheduled post goes live
+
+Scheduled posts are handled in one of two ways:
+
+    - BLOG_PUBLISH_SCHEDULER = True: run_publish_scheduler sends post_went_live
+      at each publish time, which invalidates the cache. Requests do no
+      publish-time checks at all.
+    - otherwise the generation is stored together with the next scheduled
+      publish time, and the first request after it passes rolls the generation.
+
+Either way a scheduled post appears exactly on time, without waiting for
+entries to expire.
+
+Pages live in their own cache alias (CACHES['pages'], falling back to the
+default cache when it isn't configured): every ?page=/?q= variant is a new
+entry, and a crawl that fills the cache must only cull other pages. Losing
+the generation (kept in the default cache) merely starts a new one.
+Pages are stored with all their headers, so a hit is the response the view
+(and any decorator inside this one) produced.
+"""
+import hashlib
+import math
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import Min
+from django.http import HttpResponse
+from django.utils import timezone
+
+STATE_KEY = 'blog:pages:state'
+
+PAGES_ALIAS = 'pages'
+
+DEFAULT_TIMEOUT = 60 * 60  # 1 hour
+
+
+def get_timeout():
+    """Seconds a page may stay cached; 0 disables the page cache."""
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def next_scheduled_publish():
+    """published_date of the next post waiting to go live, or None."""
+    from .models import Post
+
+    return Post.objects.filter(
+        is_published=True,
+        published_date__gt=timezone.now()
+    ).aggregate(next_publish=Min('published_date'))['next_publish']
+
+
+def scheduler_enabled():
+    """True when run_publish_scheduler invalidates pages at each publish time."""
+    return getattr(settings, 'BLOG_PUBLISH_SCHEDULER', False)
+
+
+def current_state():
+    """
+    Return (generation, next_publish) and start a new generation when the
+    next scheduled post has gone live. next_publish is None when the
+    publish scheduler takes care of go-live invalidation.
+    """
+    state = cache.get(STATE_KEY)
+    if state is None or (state[1] is not None and state[1] <= timezone.now()):
+        next_publish = None if scheduler_enabled() else next_scheduled_publish()
+        state = (uuid.uuid4().hex, next_publish)
+        cache.set(STATE_KEY, state, None)
+    return state
+
+
+def page_store():
+    """The cache pages are stored in."""
+    return caches[PAGES_ALIAS] if PAGES_ALIAS in settings.CACHES else cache
+
+
+def invalidate():
+    """Drop every cached page (they are orphaned and expire on their own)."""
+    cache.delete(STATE_KEY)
+
+
+def invalidate_on_commit():
+    """Invalidate once the current transaction commits, so no page is re-cached from old data."""
+    transaction.on_commit(invalidate)
+
+
+def page_key(generation, request):
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f'blog:page:{generation}:{request.method}:{url}'
+
+
+def cache_public_page(view_func):
+    """
+    Serve anonymous visitors from the page cache; render and store on a miss.
+    Responses that aren't plain 200s or that set cookies are never cached.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = get_timeout()
+        if timeout <= 0 or request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        generation, next_publish = current_state()
+        key = page_key(generation, request)
+        store = page_store()
+        cached = store.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers:
+                response.headers[header] = value
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            if next_publish is not None:
+                seconds_left = (next_publish - timezone.now()).total_seconds()
+                timeout = min(timeout, math.ceil(seconds_left))
+            if timeout > 0:
+                store.set(key, (response.content, list(response.items())), timeout)
+        return response
+
+    return wrapper
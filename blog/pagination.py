@@ -0,0 +1,132 @@
+"""
+Keyset (cursor) pagination for post listings.
+
+Django's Paginator needs a COUNT(*) plus an OFFSET query that gets slower the
+deeper the page. KeysetPaginator orders on (published_date, id) and fetches a
+page with a single range query starting right after (or before) the cursor,
+so every page costs the same regardless of its position (a ?before= page
+adds an EXISTS query to know whether it has a next page).
+
+Cursors are opaque url-safe strings: ?after=<cursor> for the next page,
+?before=<cursor> for the previous one.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(post):
+    value = f'{post.published_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (published_date, id) or None for a missing or invalid cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        published_date, pk = value.split('|')
+        return datetime.fromisoformat(published_date), int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+class CursorPage:
+    """
+    Page of results with links to its neighbours.
+    Mirrors the parts of django.core.paginator.Page the templates use.
+    """
+    is_cursor_page = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class KeysetPaginator:
+    """
+    Paginate a Post queryset on (published_date, id).
+    descending=True lists newest first, False oldest first.
+    """
+
+    def __init__(self, queryset, per_page, descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = descending
+
+    def _ordered(self, descending):
+        if descending:
+            return self.queryset.order_by('-published_date', '-id')
+        return self.queryset.order_by('published_date', 'id')
+
+    @staticmethod
+    def _beyond(key, descending):
+        """Rows that come after `key` in the given direction."""
+        published_date, pk = key
+        if descending:
+            return Q(published_date__lte=published_date) & (Q(published_date__lt=published_date) | Q(id__lt=pk))
+        return Q(published_date__gte=published_date) & (Q(published_date__gt=published_date) | Q(id__gt=pk))
+
+    def page(self, after=None, before=None):
+        after_key = decode_cursor(after)
+        before_key = decode_cursor(before) if after_key is None else None
+
+        if before_key is not None:
+            # Walk backwards from the cursor, then restore display order
+            queryset = self._ordered(not self.descending).filter(
+                self._beyond(before_key, not self.descending)
+            )
+            rows = list(queryset[:self.per_page + 1])
+            if not rows:
+                # Stale cursor (the newest rows were deleted): start over
+                return self.page()
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            last = rows[-1]
+            has_next = self._ordered(self.descending).filter(
+                self._beyond((last.published_date, last.pk), self.descending)
+            ).exists()
+            return CursorPage(rows, has_next=has_next, has_previous=has_previous)
+
+        queryset = self._ordered(self.descending)
+        if after_key is not None:
+            queryset = queryset.filter(self._beyond(after_key, self.descending))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], has_next=has_next, has_previous=after_key is not None)
@@ -0,0 +1,409 @@
+"""
+Related posts: precomputed TF-IDF nearest neighbours.
+
+Every published post (scheduled ones included, so they are linked the moment
+they go live) is turned into a TF-IDF vector of its title, excerpt and content.
+The TOP_K most cosine-similar posts are stored as RelatedPost rows, so
+post_page only runs one indexed lookup.
+
+    rebuild()          full batch: vectorize everything, top-k cosine neighbours per row
+                       (`python manage.py rebuild_related_posts`, e.g. nightly)
+    refresh_post(post) incremental, after every save (blog/signals.py) in a background
+                       thread: re-vectorizes one post and only recomputes the lists
+                       it enters or leaves, then invalidates the page cache again
+
+The matrix is saved in CSR form (indptr / indices / data arrays) as an .npz
+snapshot (BLOG_RELATED_CORPUS_PATH), so an incremental refresh never reads the
+other posts' text again; until rebuild() has written the first snapshot, saves
+leave the lists alone. Both hold snapshot_lock (casipe/snapshots.py) while they
+load, change and save it, so concurrent saves in different workers don't lose
+each other's rows; only the RelatedPost writes run in a transaction, so the
+TF-IDF computation never holds the database write lock. Between full rebuilds
+the IDF weights stay fixed: a changed post is scored against the existing
+vocabulary, which is plenty for "related reading" and keeps a save cheap.
+Terms that occur in a single post can't make two posts similar, so they only
+count towards the vector norm and get no matrix column.
+
+Without NumPy installed the feature is disabled and post pages show no related posts.
+"""
+import logging
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from casipe.snapshots import snapshot_lock
+
+from . import page_cache
+from .models import Post, PostQuerySet, RelatedPost
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 4
+
+# Title words say more about a post than body words
+FIELD_WEIGHTS = (('title', 3.0), ('excerpt', 2.0), ('content', 1.0))
+
+TOKEN_PATTERN = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+
+STOPWORDS = frozenset('''
+    que los las del por con una para como más mas pero sus este esta esto estos estas
+    ese esa eso son está esta están fue ser hay muy sin sobre también tambien entre
+    cuando todo todos todas nos les porque donde desde hasta otro otra otros otras
+    ella ellos ellas usted ustedes hace puede tiene tienen era han has hemos
+    the and for with that this from are was were you your not have has but
+'''.split())
+
+
+def is_available():
+    return np is not None
+
+
+def get_corpus_path():
+    return getattr(
+        settings, 'BLOG_RELATED_CORPUS_PATH', os.path.join(settings.BASE_DIR, 'cache', 'related-corpus.npz')
+    )
+
+
+def fold(text):
+    """Lowercase and strip accents, so 'Árbol' and 'arbol' are one term."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def term_counts(post):
+    """Field-weighted term frequencies of a post."""
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        text = getattr(post, field) or ''
+        if field == 'content':
+            text = strip_tags(text)
+        for token in TOKEN_PATTERN.findall(fold(text)):
+            if token not in STOPWORDS:
+                counts[token] += weight
+    return counts
+
+
+def corpus_posts():
+    return Post.objects.filter(is_published=True).only(*(field for field, weight in FIELD_WEIGHTS)).order_by('pk')
+
+
+class Corpus:
+    """L2-normalized TF-IDF rows in CSR form, one per post in post_ids."""
+
+    def __init__(self, post_ids, vocabulary, idf, single_idf, indptr, indices, data):
+        self.post_ids = post_ids
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.single_idf = single_idf  # weight of a term no other post uses
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def build(cls, counts_by_post):
+        post_ids = sorted(counts_by_post)
+        document_frequency = Counter()
+        for counts in counts_by_post.values():
+            document_frequency.update(counts.keys())
+
+        total = len(post_ids)
+        shared_terms = sorted(term for term, df in document_frequency.items() if df > 1)
+        vocabulary = {term: column for column, term in enumerate(shared_terms)}
+        idf = np.array(
+            [math.log((1 + total) / (1 + document_frequency[term])) + 1 for term in shared_terms],
+            dtype=np.float32
+        )
+        corpus = cls(
+            np.array(post_ids, dtype=np.int64), vocabulary, idf,
+            math.log((1 + total) / 2) + 1,
+            np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        )
+        rows = [corpus.vector(counts_by_post[post_id]) for post_id in post_ids]
+        corpus.indptr = np.cumsum([0] + [len(indices) for indices, data in rows], dtype=np.int64)
+        if rows:
+            corpus.indices = np.concatenate([indices for indices, data in rows])
+            corpus.data = np.concatenate([data for indices, data in rows])
+        return corpus
+
+    def vector(self, counts):
+        """Sparse (indices, data) row for term counts, normalized over all its terms."""
+        columns, weights, norm = [], [], 0.0
+        for term, count in counts.items():
+            column = self.vocabulary.get(term)
+            weight = (1 + math.log(count)) * (self.single_idf if column is None else float(self.idf[column]))
+            norm += weight * weight
+            if column is not None:
+                columns.append(column)
+                weights.append(weight)
+        indices = np.array(columns, dtype=np.int32)
+        data = np.array(weights, dtype=np.float32)
+        if norm:
+            data /= math.sqrt(norm)
+        order = np.argsort(indices)
+        return indices[order], data[order]
+
+    def row(self, position):
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def scores(self, indices, data):
+        """Cosine similarity of a sparse row with every post, straight from the CSR arrays."""
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        query[indices] = data
+        return np.bincount(self.row_numbers(), weights=query[self.indices] * self.data, minlength=len(self.post_ids))
+
+    def row_numbers(self):
+        """Row of every stored value (the CSR arrays expanded to COO), cached until the next change."""
+        if getattr(self, '_row_numbers', None) is None:
+            self._row_numbers = np.repeat(np.arange(len(self.post_ids)), np.diff(self.indptr))
+        return self._row_numbers
+
+    def row_index(self, post_id):
+        position = int(np.searchsorted(self.post_ids, post_id))
+        if position < len(self.post_ids) and self.post_ids[position] == post_id:
+            return position
+        return None
+
+    def set_row(self, post_id, indices, data):
+        """Insert or replace the row of one post, keeping post_ids sorted."""
+        self.remove_row(post_id)
+        self._row_numbers = None
+        position = int(np.searchsorted(self.post_ids, post_id))
+        start = self.indptr[position]
+        self.post_ids = np.insert(self.post_ids, position, post_id)
+        self.indices = np.concatenate([self.indices[:start], indices, self.indices[start:]])
+        self.data = np.concatenate([self.data[:start], data, self.data[start:]])
+        self.indptr = np.concatenate([
+            self.indptr[:position + 1],
+            self.indptr[position:] + len(indices)
+        ])
+
+    def remove_row(self, post_id):
+        position = self.row_index(post_id)
+        if position is None:
+            return
+        start, end = self.indptr[position], self.indptr[position + 1]
+        self._row_numbers = None
+        self.post_ids = np.delete(self.post_ids, position)
+        self.indices = np.concatenate([self.indices[:start], self.indices[end:]])
+        self.data = np.concatenate([self.data[:start], self.data[end:]])
+        self.indptr = np.concatenate([self.indptr[:position], self.indptr[position + 1:] - (end - start)])
+
+    # ----- snapshot -----
+    FIELDS = ('post_ids', 'idf', 'indptr', 'indices', 'data')
+
+    def save(self, path):
+        """Write the snapshot under a temporary name and rename it, so readers never see half a file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(temporary_path, 'wb') as f:
+            np.savez(
+                f, terms=np.array(terms, dtype=str), single_idf=np.array(self.single_idf),
+                **{field: getattr(self, field) for field in self.FIELDS}
+            )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            vocabulary = {term: column for column, term in enumerate(data['terms'].tolist())}
+            return cls(
+                data['post_ids'], vocabulary, data['idf'], float(data['single_idf']),
+                data['indptr'], data['indices'], data['data']
+            )
+
+
+def top_neighbours(corpus, scores, position):
+    """[(post_id, score), ...] best first, for the similarity row of one post."""
+    scores = scores.copy()
+    scores[position] = -1  # not related to itself
+    k = min(TOP_K, len(scores) - 1)
+    if k <= 0:
+        return []
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return [(int(corpus.post_ids[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+def store_neighbours(lists):
+    """Replace the RelatedPost rows of the posts in {post_id: [(related_id, score), ...]}."""
+    RelatedPost.objects.filter(post_id__in=list(lists)).delete()
+    RelatedPost.objects.bulk_create([
+        RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+        for post_id, neighbours in lists.items()
+        for rank, (related_id, score) in enumerate(neighbours)
+    ], batch_size=500)
+
+
+def save_corpus(corpus):
+    corpus.save(get_corpus_path())
+
+
+def load_corpus():
+    """The saved corpus, or None until rebuild_related_posts has written one."""
+    path = get_corpus_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        return Corpus.load(path)
+    except (OSError, ValueError, KeyError):
+        logger.warning('Unreadable related posts corpus %s', path)
+        return None
+
+
+def rebuild():
+    """Recompute every neighbour list from scratch. Returns the number of posts."""
+    if not is_available():
+        return 0
+    with snapshot_lock(get_corpus_path()):
+        corpus = Corpus.build({post.pk: term_counts(post) for post in corpus_posts().iterator()})
+        lists = {
+            int(post_id): top_neighbours(corpus, corpus.scores(*corpus.row(position)), position)
+            for position, post_id in enumerate(corpus.post_ids)
+        }
+        # Only the row swap takes the write lock, not the computation
+        with transaction.atomic():
+            RelatedPost.objects.all().delete()
+            store_neighbours(lists)
+        save_corpus(corpus)
+    page_cache.invalidate()
+    return len(corpus.post_ids)
+
+
+def refresh_post(post_id, linked_from=()):
+    """
+    Update the neighbour lists after one post was saved, (un)published or deleted.
+    Only lists that contain the post, or that it now enters, are recomputed.
+    linked_from: posts that listed it before a delete cascaded their rows away.
+    """
+    if not is_available():
+        return
+    path = get_corpus_path()
+    if not os.path.exists(path):
+        logger.warning('No related posts corpus yet; run `python manage.py rebuild_related_posts`')
+        return
+    with snapshot_lock(path):
+        corpus = load_corpus()
+        if corpus is None:
+            return
+        lists = refresh_lists(corpus, post_id, linked_from)
+        with transaction.atomic():
+            store_neighbours(lists)
+        save_corpus(corpus)
+
+
+def refresh_lists(corpus, post_id, linked_from):
+    """
+    refresh_post() on the loaded corpus: updates the post's row in place and
+    returns the recomputed lists, {post_id: [(related_id, score), ...]}.
+    """
+    post = corpus_posts().filter(pk=post_id).first()
+    if post is not None:
+        corpus.set_row(post_id, *corpus.vector(term_counts(post)))
+    else:
+        corpus.remove_row(post_id)
+
+    affected = set(linked_from)
+    affected.update(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    lists = {}
+    if post is not None:
+        position = corpus.row_index(post_id)
+        scores = corpus.scores(*corpus.row(position))
+        lists[post_id] = top_neighbours(corpus, scores, position)
+
+        # Posts whose list the changed post now beats the weakest entry of (or
+        # fills up); only posts sharing a term with it can be among them
+        candidates = {
+            int(corpus.post_ids[other_position]): float(scores[other_position])
+            for other_position in np.flatnonzero(scores > 0)
+        }
+        candidates.pop(post_id, None)
+        weakest = {
+            row['post_id']: (row['links'], row['weakest'])
+            for row in RelatedPost.objects.filter(post_id__in=list(candidates)).values('post_id').annotate(
+                links=Count('pk'), weakest=Min('score')
+            ).order_by()
+        }
+        for other_id, score in candidates.items():
+            links, weakest_score = weakest.get(other_id, (0, 0))
+            if links < TOP_K or score > weakest_score:
+                affected.add(other_id)
+    else:
+        lists[post_id] = []
+
+    affected.discard(post_id)
+    for other_id in affected:
+        position = corpus.row_index(other_id)
+        if position is not None:
+            lists[other_id] = top_neighbours(corpus, corpus.scores(*corpus.row(position)), position)
+    return lists
+
+
+# ========================================
+# BACKGROUND REFRESH
+# ========================================
+_executor = None
+
+
+def get_executor():
+    """One thread, so the saves of one worker are applied in order."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='related-posts')
+    return _executor
+
+
+def refresh_posts(post_ids, linked_from=()):
+    for post_id in post_ids:
+        refresh_post(post_id, linked_from)
+
+
+def _run_in_worker(post_ids, linked_from):
+    try:
+        refresh_posts(post_ids, linked_from)
+        # The save's own invalidation ran before the new lists were stored;
+        # pages cached in between still show the old ones
+        page_cache.invalidate()
+    except Exception:
+        logger.exception('Related posts refresh failed for posts %s', post_ids)
+    finally:
+        connection.close()  # the worker thread has its own connection
+
+
+def refresh_in_background(post_ids, linked_from=()):
+    get_executor().submit(_run_in_worker, post_ids, linked_from)
+
+
+def refresh_on_commit(post_ids, linked_from=()):
+    """Refresh off the request once the change commits (the admin actions pass several posts)."""
+    post_ids = list(post_ids)
+    linked_from = list(linked_from)
+    transaction.on_commit(lambda: refresh_in_background(post_ids, linked_from))
+
+
+def related_posts(post):
+    """Live related posts for post_page, best first (one query)."""
+    return [
+        link.related for link in RelatedPost.objects.filter(
+            post=post,
+            related__is_published=True,
+            related__published_date__lte=timezone.now()
+        ).select_related('related__author').only(
+            'post_id', 'rank', *(f'related__{field}' for field in PostQuerySet.CARD_FIELDS)
+        ).order_by('rank')
+    ]
@@ -0,0 +1,72 @@
+"""
+Render-once cache for post bodies.
+
+post_page used to run the {{ title }}-style replacements and the process_media
+regex over the whole body on every request. The processed HTML is now cached
+per post revision; the cache key includes everything the output depends on:
+
+    updated_at      -> any edit of the post
+    published_date  -> changed by the admin publish action without a save()
+    author name     -> {{ author }} placeholder (nickname or username)
+    MEDIA_URL       -> {{MEDIA:...}} placeholders
+
+so a stale entry can never be served; it simply stops being looked up and
+expires on its own.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Pattern to match {{MEDIA:path/to/file}}
+MEDIA_PATTERN = re.compile(r'\{\{MEDIA:(.*?)\}\}')
+
+RENDERED_CONTENT_TIMEOUT = 60 * 60 * 24 * 7  # 1 week
+
+
+def replace_media_placeholders(content):
+    """
+    Replace media placeholders with actual media URLs.
+    Example: {{MEDIA:blog/audio/Estoy_comiendo.mp3}} -> /media/blog/audio/Estoy_comiendo.mp3
+    """
+    if not content:
+        return content
+
+    media_url = settings.MEDIA_URL.rstrip('/')
+    return MEDIA_PATTERN.sub(lambda match: f"{media_url}/{match.group(1).strip()}", content)
+
+
+def render_content(post):
+    """Fill the {{ title }}, {{ slug }}, {{ author }} and {{ published_date }} placeholders and media paths."""
+    content = post.content
+    content = content.replace('{{ title }}', post.title)
+    content = content.replace('{{ slug }}', post.slug)
+    content = content.replace('{{ author }}', str(post.author))
+    if post.published_date:
+        content = content.replace('{{ published_date }}', post.published_date.strftime('%B %d, %Y'))
+    return replace_media_placeholders(content)
+
+
+def cache_key(post):
+    revision = '|'.join([
+        post.updated_at.isoformat() if post.updated_at else '',
+        post.published_date.isoformat() if post.published_date else '',
+        str(post.author),
+        settings.MEDIA_URL,
+    ])
+    digest = hashlib.md5(revision.encode('utf-8')).hexdigest()
+    return f'blog:post-content:{post.pk}:{digest}'
+
+
+def get_rendered_content(post):
+    """
+    Return the processed HTML for a post, rendering it only on a cache miss.
+    Load the post with select_related('author') to avoid an extra query.
+    """
+    key = cache_key(post)
+    content = cache.get(key)
+    if content is None:
+        content = render_content(post)
+        cache.set(key, content, RENDERED_CONTENT_TIMEOUT)
+    return content
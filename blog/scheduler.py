@@ -0,0 +1,151 @@
+"""
+Publish scheduler: fires a go-live event when a scheduled post goes live.
+
+A post is scheduled when is_published=True and published_date is in the future.
+PublishScheduler keeps those publish times in a heap (sorted queue), sleeps
+until the earliest one and then sends the `post_went_live` signal
+(blog/signals.py) for every post that just went live. Receivers use it to
+invalidate the page cache, refresh the search index, regenerate feeds, ...
+
+Run it with `python manage.py run_publish_scheduler` (or `--once` from cron).
+The last processed time is stored in the database (PublishWatermark) so a
+restarted scheduler catches up on posts that went live while it was down.
+It is written when posts went live, and otherwise at most once per
+WATERMARK_CHECKPOINT, not on every poll: each write takes SQLite's write lock.
+
+Saving a scheduled post (new, or moved to another time) sends a datagram to
+BLOG_SCHEDULER_WAKE_ADDRESS on commit (blog/signals.py); the running scheduler
+waits on that socket, so it reloads its queue at once instead of on the next
+poll. The poll remains as a fallback for changes made without signals
+(queryset.update(), raw SQL) and for datagrams lost while it was restarting.
+"""
+import heapq
+import select
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Post, PublishWatermark
+from .signals import post_went_live
+
+DEFAULT_WAKE_ADDRESS = ('127.0.0.1', 8765)
+
+WAKE_MESSAGE = b'reload'
+
+# Longest time the stored watermark lags behind while no post goes live; a
+# restart re-sends post_went_live for posts published directly within it
+WATERMARK_CHECKPOINT = timedelta(hours=1)
+
+
+def wake_address():
+    return tuple(getattr(settings, 'BLOG_SCHEDULER_WAKE_ADDRESS', DEFAULT_WAKE_ADDRESS))
+
+
+def wake_socket():
+    """The socket a running scheduler listens on for schedule changes."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(wake_address())
+    sock.setblocking(False)
+    return sock
+
+
+def notify_schedule_changed():
+    """Make a running scheduler reload its queue now. Fire and forget: nobody may be listening."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        try:
+            sock.sendto(WAKE_MESSAGE, wake_address())
+        except OSError:
+            pass
+
+
+def load_watermark():
+    return PublishWatermark.objects.filter(pk=1).values_list('processed_until', flat=True).first()
+
+
+def save_watermark(value):
+    if not PublishWatermark.objects.filter(pk=1).update(processed_until=value):
+        PublishWatermark.objects.create(pk=1, processed_until=value)
+
+
+class PublishScheduler:
+
+    def __init__(self, poll_interval=60):
+        # How often to reload the queue to pick up new or rescheduled posts
+        self.poll_interval = timedelta(seconds=poll_interval)
+        self.queue = []
+        self.reloaded_at = None
+        self.watermark = load_watermark() or timezone.now()
+        self.watermark_saved_at = None
+
+    def reload(self, now=None):
+        """Rebuild the queue from every post published after the watermark."""
+        now = now or timezone.now()
+        self.queue = list(
+            Post.objects.filter(
+                is_published=True,
+                published_date__gt=self.watermark
+            ).values_list('published_date', 'pk')
+        )
+        heapq.heapify(self.queue)
+        self.reloaded_at = now
+
+    def run_pending(self, now=None):
+        """
+        Send post_went_live for every queued post whose time has come.
+        Returns the posts that went live.
+        """
+        now = now or timezone.now()
+        if self.reloaded_at is None or now - self.reloaded_at >= self.poll_interval:
+            self.reload(now)
+
+        due_ids = []
+        while self.queue and self.queue[0][0] <= now:
+            due_ids.append(heapq.heappop(self.queue)[1])
+
+        live_posts = []
+        if due_ids:
+            # Re-check: the post may have been unpublished or rescheduled since
+            live_posts = list(Post.objects.filter(
+                pk__in=due_ids,
+                is_published=True,
+                published_date__gt=self.watermark,
+                published_date__lte=now
+            ).order_by('published_date', 'pk'))
+            for post in live_posts:
+                post_went_live.send(sender=Post, post=post)
+
+        self.watermark = now
+        if (
+            live_posts or self.watermark_saved_at is None
+            or now - self.watermark_saved_at >= WATERMARK_CHECKPOINT
+        ):
+            save_watermark(now)
+            self.watermark_saved_at = now
+        return live_posts
+
+    def schedule_changed(self):
+        """Reload the queue on the next run_pending()."""
+        self.reloaded_at = None
+
+    def seconds_until_next(self, now=None):
+        """How long to sleep before the next publish time or queue reload."""
+        if self.reloaded_at is None:
+            return 0
+        now = now or timezone.now()
+        wake_at = self.reloaded_at + self.poll_interval
+        if self.queue:
+            wake_at = min(wake_at, self.queue[0][0])
+        return max((wake_at - now).total_seconds(), 0)
+
+    def wait(self, sock, seconds):
+        """Sleep up to `seconds`, returning early when a schedule change arrives on `sock`."""
+        readable, _, _ = select.select([sock], [], [], seconds)
+        if readable:
+            while True:
+                try:
+                    sock.recv(64)
+                except (BlockingIOError, InterruptedError):
+                    break
+            self.schedule_changed()
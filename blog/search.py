@@ -0,0 +1,105 @@
+"""
+Full-text search for blog posts.
+
+Every Post is indexed in the SQLite FTS5 table `blog_post_fts` (rowid = post id)
+with the columns title, subtitle, excerpt and content. Results are ranked with
+BM25, weighting title matches above subtitle, excerpt and body matches.
+
+The index is updated from the post_save / post_delete signals in blog/signals.py.
+Publishing only touches is_published / published_date, so the index holds every
+post and the views filter on publication status as usual.
+Run `python manage.py rebuild_search_index` after bulk imports done with raw SQL.
+
+On databases other than SQLite the search falls back to icontains lookups.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+from casipe.fts import build_match_query
+
+FTS_TABLE = 'blog_post_fts'
+FTS_COLUMNS = ('title', 'subtitle', 'excerpt', 'content')
+
+# bm25() column weights, same order as FTS_COLUMNS.
+# Stored as the table's default `rank` by migration 0010 and rebuild_index().
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+
+def is_available():
+    """True when the FTS5 index can be used on the default database."""
+    return connection.vendor == 'sqlite'
+
+
+def document_values(post):
+    """Plain-text values indexed for a post, in FTS_COLUMNS order."""
+    return [
+        post.title or '',
+        post.subtitle or '',
+        post.excerpt or '',
+        strip_tags(post.content or ''),
+    ]
+
+
+def index_post(post):
+    """Add or replace a single post in the index."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [post.pk] + document_values(post)
+        )
+
+
+def remove_post(post_id):
+    """Drop a post from the index."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_index(posts):
+    """
+    Replace the whole index with the given posts. Returns the number indexed.
+    """
+    if not is_available():
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for post in posts.iterator(chunk_size=500):
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+                [post.pk] + document_values(post)
+            )
+            count += 1
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES (%s, %s)",
+            ['rank', f"bm25({', '.join(str(w) for w in BM25_WEIGHTS)})"]
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def search_posts(queryset, text):
+    """
+    Filter a Post queryset to posts matching `text`, best matches first.
+    """
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+
+    if not is_available():
+        return queryset.filter(
+            Q(title__icontains=text) |
+            Q(subtitle__icontains=text) |
+            Q(excerpt__icontains=text) |
+            Q(content__icontains=text)
+        ).order_by('-published_date')
+
+    return queryset.filter(
+        search_index__document__match=match
+    ).order_by('search_index__rank', '-published_date')
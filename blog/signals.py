@@ -0,0 +1,199 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import archive, audio_metadata, conditional, feeds, media_index, page_cache, related, search
+from .models import Post, PostAudio, RelatedPost
+
+User = get_user_model()
+
+# Sent by the publish scheduler (blog/scheduler.py) when a scheduled post goes live.
+# Arguments: post
+post_went_live = Signal()
+
+
+# ========================================
+# SEARCH INDEX
+# ========================================
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Keep the full-text index in sync with the saved post."""
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """Remove a deleted post from the full-text index."""
+    search.remove_post(instance.pk)
+
+
+# ========================================
+# ARCHIVE INDEX
+# ========================================
+@receiver(pre_save, sender=Post)
+def remember_archive_bucket(sender, instance, **kwargs):
+    """Remember which month the post was counted in before this save."""
+    instance._archive_bucket = archive.saved_bucket(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def update_archive_on_save(sender, instance, **kwargs):
+    """Move the post between months when it is published, unpublished or rescheduled."""
+    archive.move_post(
+        getattr(instance, '_archive_bucket', None),
+        archive.bucket(instance.is_published, instance.published_date)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def update_archive_on_delete(sender, instance, **kwargs):
+    archive.move_post(archive.bucket(instance.is_published, instance.published_date), None)
+
+
+# ========================================
+# RELATED POSTS
+# ========================================
+RELATED_FIELDS = {'title', 'excerpt', 'content', 'is_published'}
+
+
+@receiver(post_save, sender=Post)
+def refresh_related_posts(sender, instance, update_fields=None, **kwargs):
+    """Re-score the saved post off the request; the refresh invalidates the page cache once stored."""
+    if update_fields is None or RELATED_FIELDS & set(update_fields):
+        related.refresh_on_commit([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_related_links(sender, instance, **kwargs):
+    """The delete cascades the RelatedPost rows pointing at the post: remember whose lists to refill."""
+    instance._linked_from = list(RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def refresh_related_after_delete(sender, instance, **kwargs):
+    related.refresh_on_commit([instance.pk], getattr(instance, '_linked_from', ()))
+
+
+# ========================================
+# FEEDS
+# ========================================
+@receiver(post_save, sender=Post)
+def refresh_feed_entry(sender, instance, **kwargs):
+    """Render the post's feed entries now, so the next feed request only splices them in."""
+    feeds.refresh_entry_on_commit(instance.pk)
+
+
+# ========================================
+# AUDIO COUNT
+# ========================================
+def change_audio_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(audio_count__gte=-delta)
+    posts.update(audio_count=F('audio_count') + delta)
+
+
+@receiver(pre_save, sender=PostAudio)
+def remember_audio_post(sender, instance, **kwargs):
+    """Remember the post an existing audio belonged to, in case it is moved."""
+    if not instance._state.adding:
+        instance._previous_post_id = PostAudio.objects.filter(
+            pk=instance.pk
+        ).values_list('post_id', flat=True).first()
+
+
+@receiver(post_save, sender=PostAudio)
+def count_saved_audio(sender, instance, created, **kwargs):
+    previous_post_id = None if created else getattr(instance, '_previous_post_id', instance.post_id)
+    if previous_post_id != instance.post_id:
+        if previous_post_id is not None:
+            change_audio_count(previous_post_id, -1)
+        change_audio_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=PostAudio)
+def count_deleted_audio(sender, instance, **kwargs):
+    change_audio_count(instance.post_id, -1)
+
+
+# ========================================
+# AUDIO METADATA
+# ========================================
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=PostAudio)
+def reset_audio_metadata(sender, instance, **kwargs):
+    """
+    A new upload (not yet committed to storage) or a removed file
+    invalidates the stored size and bitrate.
+    """
+    audio_file = instance.audio_file
+    if not audio_file or not audio_file._committed:
+        instance.audio_size = None
+        instance.audio_bitrate = None
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=PostAudio)
+def queue_audio_metadata(sender, instance, **kwargs):
+    """Read duration, bitrate and size in the background after the upload is committed."""
+    if instance.audio_file and instance.audio_size is None:
+        audio_metadata.extract_in_background(instance)
+
+
+# ========================================
+# MEDIA REFERENCES
+# ========================================
+media_index.connect(Post, 'image', 'audio_file', 'excerpt', 'content')
+media_index.connect(PostAudio, 'audio_file')
+
+
+# ========================================
+# PAGE CACHE
+# ========================================
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=PostAudio)
+@receiver(post_delete, sender=PostAudio)
+def invalidate_page_cache(sender, **kwargs):
+    """Any post or audio change can show up on the archive, search and post pages."""
+    page_cache.invalidate_on_commit()
+
+
+@receiver(post_save, sender=User)
+def invalidate_page_cache_for_author(sender, instance, update_fields=None, **kwargs):
+    """Author names are shown on every card and post page (cached and revalidated)."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return  # Logging in doesn't change anything public
+    if Post.objects.filter(author=instance).exists():
+        page_cache.invalidate_on_commit()
+        conditional.authors_changed_on_commit()
+
+
+# ========================================
+# PUBLISH SCHEDULER
+# ========================================
+@receiver(post_save, sender=Post)
+def wake_publish_scheduler(sender, instance, update_fields=None, **kwargs):
+    """A new or moved publish time must be queued now, not on the scheduler's next poll."""
+    if not page_cache.scheduler_enabled():
+        return
+    if update_fields is not None and not {'is_published', 'published_date'} & set(update_fields):
+        return
+    if instance.is_published and instance.published_date and instance.published_date > timezone.now():
+        from .scheduler import notify_schedule_changed  # blog.scheduler imports this module
+
+        transaction.on_commit(notify_schedule_changed)
+
+
+# ========================================
+# GO-LIVE EVENTS
+# ========================================
+@receiver(post_went_live)
+def refresh_on_go_live(sender, post, **kwargs):
+    """A scheduled post just went live: show it on every public page."""
+    page_cache.invalidate()
+    search.index_post(post)
+    feeds.refresh_entry(post.pk)
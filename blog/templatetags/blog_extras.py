@@ -1,6 +1,6 @@
 from django import template
-from django.conf import settings
-import re
+
+from blog.rendering import replace_media_placeholders
 
 register = template.Library()
 
@@ -10,17 +10,8 @@ def process_media(content):
     Replace media placeholders with actual media URLs.
     Syntax: {{MEDIA:path/to/file.mp3}}
     Example: {{MEDIA:blog/audio/Estoy_comiendo.mp3}}
+
+    post_page serves pre-rendered content (see blog.rendering); this filter
+    stays available for other templates.
     """
-    if not content:
-        return content
-    
-    # Pattern to match {{MEDIA:path/to/file}}
-    pattern = r'\{\{MEDIA:(.*?)\}\}'
-    
-    def replace_media(match):
-        media_path = match.group(1).strip()
-        media_url = settings.MEDIA_URL.rstrip('/')
-        return f"{media_url}/{media_path}"
-    
-    processed_content = re.sub(pattern, replace_media, content)
-    return processed_content
\ No newline at end of file
+    return replace_media_placeholders(content)
@@ -1,3 +1,1018 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import struct
+import tempfile
+import time
+import wave
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from readers.models import DifficultyLevel, Reader
+
+from .models import ArchiveMonth, MediaReference, Post, PostAudio, RelatedPost
+from . import archive, audio_metadata, feeds, page_cache, related
+from . import scheduler as scheduler_module
+from .pagination import KeysetPaginator, encode_cursor
+from .scheduler import PublishScheduler
+from .signals import post_went_live
+
+
+class PostTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(
+            username="renato", email="renato@email.com", password="testpass123", nickname="Renato"
+        )
+
+    def create_post(self, slug, **kwargs):
+        defaults = {
+            "title": slug.replace("-", " ").title(),
+            "content": "<p>Contenido</p>",
+            "is_published": True,
+            "published_date": timezone.now() - timedelta(days=1),
+            "author": self.author,
+        }
+        defaults.update(kwargs)
+        return Post.objects.create(slug=slug, **defaults)
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class SearchPostsTests(PostTestMixin, TestCase):
+    def search(self, query, **params):
+        response = self.client.get(reverse("search_posts"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [post.slug for post in response.context["posts"]]
+
+    def test_matches_all_text_fields(self):
+        self.create_post("title-hit", title="Aprendiendo el subjuntivo")
+        self.create_post("subtitle-hit", subtitle="Notas sobre el subjuntivo")
+        self.create_post("excerpt-hit", excerpt="Un resumen del subjuntivo")
+        self.create_post("content-hit", content="<p>Hoy practiqué el <b>subjuntivo</b></p>")
+        self.create_post("no-hit", title="Vocabulario de cocina")
+
+        results = self.search("subjuntivo")
+
+        self.assertEqual(len(results), 4)
+        self.assertNotIn("no-hit", results)
+        # Title matches rank first
+        self.assertEqual(results[0], "title-hit")
+
+    def test_accents_and_prefixes(self):
+        self.create_post("arbol", title="El árbol de mi abuela")
+
+        self.assertEqual(self.search("arbol"), ["arbol"])
+        self.assertEqual(self.search("abue"), ["arbol"])
+
+    def test_index_follows_updates_and_deletes(self):
+        post = self.create_post("cambio", title="Primer título")
+        post.title = "Segundo título"
+        post.save()
+
+        self.assertEqual(self.search("primer"), [])
+        self.assertEqual(self.search("segundo"), ["cambio"])
+
+        post.delete()
+        self.assertEqual(self.search("segundo"), [])
+
+    def test_hides_unpublished_and_scheduled_posts(self):
+        self.create_post("draft", title="Borrador", is_published=False)
+        self.create_post(
+            "scheduled", title="Borrador programado",
+            published_date=timezone.now() + timedelta(days=1)
+        )
+
+        self.assertEqual(self.search("borrador"), [])
+
+    def test_punctuation_only_query(self):
+        self.create_post("post", title="Hola")
+
+        self.assertEqual(self.search('"*()'), [])
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class PostPageRenderingTests(PostTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def get_content(self, post):
+        response = self.client.get(reverse("post_page", args=[post.slug]))
+        self.assertEqual(response.status_code, 200)
+        return response.context["processed_content"]
+
+    def test_placeholders_are_rendered(self):
+        post = self.create_post(
+            "placeholders",
+            content='<h2>{{ title }} by {{ author }}</h2><audio src="{{MEDIA:blog/audio/a.mp3}}"></audio>',
+        )
+
+        self.assertEqual(
+            self.get_content(post),
+            '<h2>Placeholders by Renato</h2><audio src="/media/blog/audio/a.mp3"></audio>',
+        )
+
+    def test_cache_follows_post_author_and_media_url(self):
+        post = self.create_post("cached", content="{{ author }} {{MEDIA:x.mp3}}")
+        self.assertEqual(self.get_content(post), "Renato /media/x.mp3")
+
+        self.author.nickname = "Renny"
+        self.author.save()
+        self.assertEqual(self.get_content(post), "Renny /media/x.mp3")
+
+        with self.settings(MEDIA_URL="https://cdn.casipe.net/media/"):
+            self.assertEqual(self.get_content(post), "Renny https://cdn.casipe.net/media/x.mp3")
+
+        post.content = "{{ title }}"
+        post.save()
+        self.assertEqual(self.get_content(post), "Cached")
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class KeysetPaginationTests(PostTestMixin, TestCase):
+    def setUp(self):
+        start = timezone.now() - timedelta(days=30)
+        # Two posts share each published_date so the id tie-breaker matters
+        self.posts = [
+            self.create_post(f"post-{i}", published_date=start + timedelta(days=i // 2))
+            for i in range(20)
+        ]
+
+    def walk(self, params):
+        """Follow the next links from the first page and collect every slug."""
+        slugs, pages = [], []
+        response = self.client.get(reverse("blog"), params)
+        while True:
+            page = response.context["posts"]
+            pages.append(page)
+            slugs.extend(post.slug for post in page)
+            if not page.next_cursor:
+                return slugs, pages
+            response = self.client.get(reverse("blog"), {**params, "after": page.next_cursor})
+
+    def test_newest_and_oldest_cover_every_post_once(self):
+        newest, pages = self.walk({})
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(newest, [post.slug for post in sorted(
+            self.posts, key=lambda p: (p.published_date, p.pk), reverse=True
+        )])
+
+        oldest, _ = self.walk({"sort": "oldest"})
+        self.assertEqual(oldest, list(reversed(newest)))
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.client.get(reverse("blog")).context["posts"]
+        second = self.client.get(reverse("blog"), {"after": first.next_cursor}).context["posts"]
+        back = self.client.get(reverse("blog"), {"before": second.previous_cursor}).context["posts"]
+
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_stale_before_cursor(self):
+        paginator = KeysetPaginator(Post.objects.filter(is_published=True), 9)
+        newest = max(self.posts, key=lambda p: (p.published_date, p.pk))
+        oldest = min(self.posts, key=lambda p: (p.published_date, p.pk))
+
+        # Everything newer than the cursor was deleted: the first page, not an empty one
+        cursor = encode_cursor(newest)
+        newest.delete()
+        page = paginator.page(before=cursor)
+        self.assertEqual(len(page), 9)
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+        # Everything older than the cursor was deleted: no next link
+        cursor = encode_cursor(oldest)
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[:4]]).delete()
+        page = paginator.page(before=cursor)
+        self.assertEqual(len(page), 9)
+        self.assertFalse(page.has_next())
+        self.assertIsNone(page.next_cursor)
+
+    def test_empty_result(self):
+        page = KeysetPaginator(Post.objects.none(), 9).page(before=encode_cursor(self.posts[0]))
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_other_pages())
+
+    def test_each_page_is_one_query(self):
+        first = self.client.get(reverse("blog")).context["posts"]
+        with self.assertNumQueries(1):
+            list(KeysetPaginator(
+                Post.objects.filter(is_published=True), 9
+            ).page(after=first.next_cursor))
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get(reverse("blog"), {"page": 3})
+        self.assertEqual(response.context["posts"].number, 3)
+        self.assertEqual(len(response.context["posts"]), 2)
+
+        response = self.client.get(reverse("blog"), {"page": 99})
+        self.assertEqual(response.context["posts"].number, 3)
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse("blog"), {"after": "not-a-cursor"})
+        self.assertEqual(response.context["posts"][0].slug, "post-19")
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class ArchiveQueryCountTests(PostTestMixin, TestCase):
+    def setUp(self):
+        for i in range(12):
+            self.create_post(f"post-{i}", content="<p>Long body</p>" * 500)
+
+    def test_archive_page_query_count(self):
+        # Conditional GET aggregate, one keyset query for the cards (author included)
+        # and two small archive sidebar queries
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("blog"))
+        self.assertEqual(len(response.context["posts"]), 9)
+        self.assertContains(response, "Renato")
+
+        # Legacy page links: COUNT(*) + one page query instead of the keyset query
+        with self.assertNumQueries(5):
+            self.client.get(reverse("blog"), {"page": 2})
+
+    def test_cards_skip_post_content(self):
+        response = self.client.get(reverse("blog"))
+        post = response.context["posts"][0]
+
+        self.assertIn("content", post.get_deferred_fields())
+        self.assertNotIn("author", post.get_deferred_fields())
+
+
+class PageCacheTests(PostTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.post = self.create_post("cached-page", title="Primera versión")
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        # Only the conditional GET aggregate runs on a cache hit
+        self.client.get(reverse("blog"))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("blog"))
+        self.assertContains(response, "Primera versión")
+
+        self.client.get(reverse("post_page", args=[self.post.slug]))
+        with self.assertNumQueries(1):
+            self.client.get(reverse("post_page", args=[self.post.slug]))
+
+    def test_pages_keep_their_headers_in_their_own_cache(self):
+        calls = []
+
+        @page_cache.cache_public_page
+        def view(request):
+            calls.append(request)
+            response = HttpResponse("<p>Hola</p>", content_type="text/html; charset=utf-8")
+            response.headers["Content-Language"] = "es"
+            response.headers["X-Robots-Tag"] = "noindex"
+            return response
+
+        request = RequestFactory().get("/blog/?page=2")
+        request.user = AnonymousUser()
+        first = view(request)
+        second = view(request)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Language"], "es")
+        self.assertEqual(second["X-Robots-Tag"], "noindex")
+        self.assertEqual(second["Content-Type"], "text/html; charset=utf-8")
+
+        key = page_cache.page_key(page_cache.current_state()[0], request)
+        self.assertIsNotNone(caches["pages"].get(key))
+        self.assertIsNone(cache.get(key))
+
+    def test_logged_in_users_bypass_cache(self):
+        self.client.get(reverse("blog"))
+        self.client.force_login(self.author)
+
+        response = self.client.get(reverse("blog"))
+        self.assertIsNotNone(response.context)
+
+    def test_saving_a_post_invalidates(self):
+        self.client.get(reverse("blog"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = "Segunda versión"
+            self.post.save()
+
+        self.assertContains(self.client.get(reverse("blog")), "Segunda versión")
+
+    def test_admin_publish_action_invalidates(self):
+        draft = self.create_post("draft", title="Borrador listo", is_published=False, published_date=None)
+        self.assertNotContains(self.client.get(reverse("blog")), "Borrador listo")
+
+        admin_user = get_user_model().objects.create_superuser(
+            username="admin", email="admin@email.com", password="testpass123"
+        )
+        self.client.force_login(admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("admin:blog_post_changelist"), {
+                "action": "publish_posts_now",
+                "_selected_action": [draft.pk],
+            })
+        self.client.logout()
+
+        self.assertContains(self.client.get(reverse("blog")), "Borrador listo")
+
+    def test_scheduled_post_goes_live_on_time(self):
+        publish_at = timezone.now() + timedelta(minutes=5)
+        self.create_post("scheduled", title="Programado", published_date=publish_at)
+        self.assertNotContains(self.client.get(reverse("blog")), "Programado")
+
+        with mock.patch("django.utils.timezone.now", return_value=publish_at + timedelta(seconds=1)):
+            self.assertContains(self.client.get(reverse("blog")), "Programado")
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(PostTestMixin, TestCase):
+    def setUp(self):
+        self.post = self.create_post("conditional")
+        self.url = reverse("post_page", args=[self.post.slug])
+
+    def test_post_page_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etags_follow_author_changes_and_releases(self):
+        listing = reverse("blog")
+        etags = {self.url: self.client.get(self.url)["ETag"], listing: self.client.get(listing)["ETag"]}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.nickname = "Renato G."
+            self.author.save()
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etags[url] = response["ETag"]
+        self.assertContains(self.client.get(listing), "Renato G.")
+
+        with override_settings(RELEASE_VERSION="2026.10.2"):
+            for url, etag in etags.items():
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_post_etag_follows_post_and_audio_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        audio = PostAudio.objects.create(post=self.post, title="Audio", audio_file="blog/audio/a.mp3")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        audio.delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_listings_revalidate_on_the_etag_only(self):
+        listing = reverse("blog")
+        response = self.client.get(listing)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+
+        # Unpublishing moves no date forward, but the list changed
+        Post.objects.filter(pk=self.post.pk).update(is_published=False)
+        self.assertEqual(self.client.get(listing, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(
+            self.client.get(listing, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)).status_code, 200
+        )
+
+    def test_archive_not_modified_until_a_post_changes(self):
+        etag = self.client.get(reverse("blog"))["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("blog"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.create_post("another")
+        response = self.client.get(reverse("blog"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_post_is_404(self):
+        self.assertEqual(self.client.get(reverse("post_page", args=["missing"])).status_code, 404)
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class ArchiveIndexTests(PostTestMixin, TestCase):
+    def counts(self):
+        return {
+            (month.year, month.month): month.post_count
+            for month in ArchiveMonth.objects.exclude(post_count=0)
+        }
+
+    def date(self, year, month):
+        return timezone.make_aware(datetime(year, month, 10))
+
+    def test_counts_follow_publish_unpublish_reschedule_and_delete(self):
+        post = self.create_post("a", published_date=self.date(2025, 3))
+        self.create_post("b", published_date=self.date(2025, 3))
+        self.create_post("draft", is_published=False, published_date=self.date(2025, 4))
+        self.assertEqual(self.counts(), {(2025, 3): 2})
+
+        post.published_date = self.date(2024, 12)
+        post.save()
+        self.assertEqual(self.counts(), {(2025, 3): 1, (2024, 12): 1})
+
+        post.is_published = False
+        post.save()
+        self.assertEqual(self.counts(), {(2025, 3): 1})
+
+        Post.objects.get(slug="b").delete()
+        self.assertEqual(self.counts(), {})
+
+    def test_month_created_by_another_worker_is_updated(self):
+        update = QuerySet.update
+        raced = []
+
+        def racing_update(queryset, **kwargs):
+            if not raced:
+                # Another worker creates the month between our update and our insert
+                raced.append(True)
+                ArchiveMonth.objects.create(year=2020, month=1, post_count=2)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", racing_update):
+            archive.apply_changes({(2020, 1): 1})
+        self.assertEqual(self.counts(), {(2020, 1): 3})
+
+    def test_sidebar_hides_scheduled_posts(self):
+        self.create_post("live", published_date=self.date(2025, 3))
+        self.create_post("scheduled", published_date=timezone.now() + timedelta(days=40))
+
+        months = archive.get_archive_months()
+
+        self.assertEqual(months, [
+            {"year": 2025, "count": 1, "months": [{"month": 3, "name": "March", "count": 1}]},
+        ])
+
+    def test_rebuild_matches_incremental_counts(self):
+        self.create_post("a", published_date=self.date(2025, 3))
+        self.create_post("b", published_date=self.date(2025, 5))
+        expected = self.counts()
+
+        ArchiveMonth.objects.all().delete()
+        archive.rebuild()
+
+        self.assertEqual(self.counts(), expected)
+
+    def test_month_view(self):
+        self.create_post("march", published_date=self.date(2025, 3))
+        self.create_post("april", published_date=self.date(2025, 4))
+
+        response = self.client.get(reverse("archive_month", args=[2025, 3]))
+        self.assertEqual([post.slug for post in response.context["posts"]], ["march"])
+
+        response = self.client.get(reverse("archive_year", args=[2025]))
+        self.assertEqual(len(response.context["posts"]), 2)
+
+        self.assertEqual(self.client.get(reverse("archive_month", args=[2025, 13])).status_code, 404)
+
+
+class PublishSchedulerTests(PostTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.fired = []
+        post_went_live.connect(self.on_go_live)
+        self.addCleanup(post_went_live.disconnect, self.on_go_live)
+
+    def on_go_live(self, sender, post, **kwargs):
+        self.fired.append(post.slug)
+
+    def test_fires_each_post_once_at_its_publish_time(self):
+        self.create_post("first", published_date=self.now + timedelta(minutes=5))
+        self.create_post("second", published_date=self.now + timedelta(minutes=10))
+        scheduler = PublishScheduler(poll_interval=600)
+
+        scheduler.run_pending(self.now)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(scheduler.seconds_until_next(self.now), 300)
+
+        scheduler.run_pending(self.now + timedelta(minutes=5))
+        scheduler.run_pending(self.now + timedelta(minutes=6))
+        self.assertEqual(self.fired, ["first"])
+
+        scheduler.run_pending(self.now + timedelta(minutes=11))
+        self.assertEqual(self.fired, ["first", "second"])
+
+    def test_skips_unpublished_and_picks_up_rescheduled_posts(self):
+        post = self.create_post("moved", published_date=self.now + timedelta(minutes=5))
+        self.create_post("cancelled", published_date=self.now + timedelta(minutes=5))
+        scheduler = PublishScheduler(poll_interval=60)
+        scheduler.run_pending(self.now)
+
+        Post.objects.filter(slug="cancelled").update(is_published=False)
+        post.published_date = self.now + timedelta(minutes=20)
+        post.save()
+
+        scheduler.run_pending(self.now + timedelta(minutes=5))
+        self.assertEqual(self.fired, [])
+
+        scheduler.run_pending(self.now + timedelta(minutes=20))
+        self.assertEqual(self.fired, ["moved"])
+
+    def test_restarted_scheduler_catches_up(self):
+        PublishScheduler().run_pending(self.now)
+        self.create_post("missed", published_date=self.now + timedelta(minutes=1))
+        cache.clear()  # the watermark is in the database, not the cache
+
+        PublishScheduler().run_pending(self.now + timedelta(hours=1))
+
+        self.assertEqual(self.fired, ["missed"])
+
+    def test_watermark_is_only_written_when_posts_go_live(self):
+        self.create_post("later", published_date=self.now + timedelta(minutes=30))
+        scheduler = PublishScheduler(poll_interval=60)
+        scheduler.run_pending(self.now)
+
+        for minutes in (1, 2, 3):
+            with CaptureQueriesContext(connection) as queries:
+                scheduler.run_pending(self.now + timedelta(minutes=minutes))
+            self.assertFalse([q for q in queries if "blog_publishwatermark" in q["sql"]])
+        self.assertEqual(scheduler_module.load_watermark(), self.now)
+
+        scheduler.run_pending(self.now + timedelta(minutes=30))
+        self.assertEqual(self.fired, ["later"])
+        self.assertEqual(scheduler_module.load_watermark(), self.now + timedelta(minutes=30))
+
+        # A long quiet spell still moves it forward now and then
+        later = self.now + timedelta(minutes=30) + scheduler_module.WATERMARK_CHECKPOINT
+        scheduler.run_pending(later)
+        self.assertEqual(scheduler_module.load_watermark(), later)
+
+    def test_saving_a_scheduled_post_wakes_the_scheduler(self):
+        with override_settings(BLOG_SCHEDULER_WAKE_ADDRESS=("127.0.0.1", 0)):
+            sock = scheduler_module.wake_socket()
+        self.addCleanup(sock.close)
+        scheduler = PublishScheduler(poll_interval=3600)
+        scheduler.run_pending(self.now)
+        self.assertEqual(scheduler.seconds_until_next(self.now), 3600)
+
+        with override_settings(BLOG_PUBLISH_SCHEDULER=True, BLOG_SCHEDULER_WAKE_ADDRESS=sock.getsockname()):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_post("new", published_date=self.now + timedelta(minutes=2))
+        scheduler.wait(sock, 5)
+
+        self.assertEqual(scheduler.seconds_until_next(self.now), 0)
+        scheduler.run_pending(self.now)
+        self.assertEqual(scheduler.seconds_until_next(self.now), 120)
+        scheduler.run_pending(self.now + timedelta(minutes=2))
+        self.assertEqual(self.fired, ["new"])
+
+
+def make_wav(seconds, rate=8000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * rate * seconds)
+    return buffer.getvalue()
+
+
+def make_mp3(frames):
+    """MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames."""
+    frame = b"\xff\xfb\x90\x00" + b"\x00" * 413
+    return b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10 + frame * frames
+
+
+def make_ogg_vorbis(samples, rate=44100):
+    def page(granule, packet):
+        header = b"OggS\x00\x00" + struct.pack("<qIII", granule, 1, 0, 0)
+        return header + bytes([1, len(packet)]) + packet
+    identification = (
+        b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, rate, 0, 128000, 0) + b"\xb8\x01"
+    )
+    return page(0, identification) + page(samples // 2, b"\x00" * 100) + page(samples, b"\x00" * 100)
+
+
+class AudioMetadataTests(PostTestMixin, TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def read(self, data):
+        return audio_metadata.read_metadata(io.BytesIO(data), len(data))
+
+    def test_wav(self):
+        data = make_wav(3)
+        self.assertEqual(self.read(data), (3, 128, len(data)))
+
+    def test_cbr_mp3(self):
+        data = make_mp3(1000)
+        metadata = self.read(data)
+        self.assertEqual(metadata.duration, 26)
+        self.assertEqual(metadata.bitrate, 128)
+
+    def test_xing_vbr_mp3(self):
+        xing = b"Xing" + struct.pack(">II", 1, 5000)
+        first = b"\xff\xfb\x90\x00" + b"\x00" * 32 + xing
+        first += b"\x00" * (417 - len(first))
+        data = first + b"\xff\xfb\x90\x00" + b"\x00" * 413
+        # 5000 frames * 1152 samples / 44100 Hz, whatever the file length
+        self.assertEqual(self.read(data).duration, 131)
+
+    def test_ogg_vorbis(self):
+        self.assertEqual(self.read(make_ogg_vorbis(44100 * 90)).duration, 90)
+
+    def test_unknown_format_keeps_size(self):
+        self.assertEqual(self.read(b"not audio at all"), (None, None, 16))
+
+    def test_upload_queues_extraction_and_stores_metadata(self):
+        post = self.create_post("con-audio")
+        with mock.patch.object(audio_metadata, "extract_in_background") as extract:
+            audio = PostAudio.objects.create(
+                post=post, title="Ejemplo", audio_file=SimpleUploadedFile("ejemplo.wav", make_wav(2))
+            )
+        extract.assert_called_once_with(audio)
+
+        audio_metadata.update_metadata("blog.PostAudio", audio.pk)
+        audio.refresh_from_db()
+        self.assertEqual(audio.audio_duration, 2)
+        self.assertEqual(audio.audio_size, audio.audio_file.size)
+
+        # Saving again without a new file doesn't re-read it
+        with mock.patch.object(audio_metadata, "extract_in_background") as extract:
+            audio.save()
+        extract.assert_not_called()
+
+        # Replacing the file does
+        audio.audio_file = SimpleUploadedFile("otro.wav", make_wav(1))
+        with mock.patch.object(audio_metadata, "extract_in_background") as extract:
+            audio.save()
+        extract.assert_called_once_with(audio)
+        self.assertIsNone(audio.audio_size)
+
+    def test_stale_saves_keep_the_extracted_metadata(self):
+        post = self.create_post("con-audio", audio_file=SimpleUploadedFile("post.wav", make_wav(3)))
+        audio = PostAudio.objects.create(
+            post=post, title="Ejemplo", audio_file=SimpleUploadedFile("ejemplo.wav", make_wav(2))
+        )
+        # Admin forms opened before the worker finished
+        stale_post = Post.objects.get(pk=post.pk)
+        stale_audio = PostAudio.objects.get(pk=audio.pk)
+        audio_metadata.update_metadata("blog.Post", post.pk)
+        audio_metadata.update_metadata("blog.PostAudio", audio.pk)
+
+        stale_post.title = "Nuevo título"
+        stale_post.save()
+        stale_audio.title = "Nuevo título"
+        stale_audio.save()
+        self.assertEqual(Post.objects.values_list("audio_duration", "audio_bitrate").get(pk=post.pk), (3, 128))
+        self.assertEqual(PostAudio.objects.values_list("audio_duration", "audio_bitrate").get(pk=audio.pk), (2, 128))
+
+    def test_edited_duration_is_saved(self):
+        post = self.create_post("con-audio", audio_file=SimpleUploadedFile("post.ogg", b"not parsed"))
+        audio = PostAudio.objects.create(
+            post=post, title="Ejemplo", audio_file=SimpleUploadedFile("ejemplo.m4a", b"not parsed")
+        )
+        post = Post.objects.get(pk=post.pk)
+        post.audio_duration = 123
+        post.save()
+        self.assertEqual(Post.objects.values_list("audio_duration", flat=True).get(pk=post.pk), 123)
+
+        admin_user = get_user_model().objects.create_superuser(
+            username="admin", email="admin@email.com", password="testpass123"
+        )
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse("admin:blog_postaudio_change", args=[audio.pk]), {
+            "post": post.pk, "title": "Ejemplo", "audio_duration": 77, "description": "", "order": 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(PostAudio.objects.values_list("audio_duration", flat=True).get(pk=audio.pk), 77)
+
+
+class AudioCountTests(PostTestMixin, TestCase):
+    def add_audio(self, post, title="Ejemplo"):
+        return PostAudio.objects.create(post=post, title=title, audio_file="blog/audio/ejemplo.mp3")
+
+    def test_counter_follows_saves_moves_and_deletes(self):
+        first = self.create_post("primera")
+        second = self.create_post("segunda")
+        audio = self.add_audio(first)
+        self.add_audio(first, "Otro")
+        first.refresh_from_db()
+        self.assertEqual(first.audio_count, 2)
+        self.assertTrue(first.has_audio)
+
+        audio.post = second
+        audio.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.audio_count, second.audio_count), (1, 1))
+
+        audio.delete()
+        second.refresh_from_db()
+        self.assertEqual(second.audio_count, 0)
+        with self.assertNumQueries(0):
+            self.assertFalse(second.has_audio)
+
+    def test_saving_a_stale_post_keeps_maintained_columns(self):
+        post = self.create_post("stale", audio_file="blog/audio/principal.mp3")
+        stale = Post.objects.get(pk=post.pk)
+        self.add_audio(post)
+        Post.objects.filter(pk=post.pk).update(audio_size=2048, audio_bitrate=128)
+
+        stale.title = "Editado"
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.title, "Editado")
+        self.assertEqual((post.audio_count, post.audio_size, post.audio_bitrate), (1, 2048, 128))
+
+        # A new upload still clears the metadata of the old file
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        stale.audio_file = SimpleUploadedFile("nuevo.mp3", b"ID3")
+        with mock.patch.object(audio_metadata, "extract_in_background"), override_settings(MEDIA_ROOT=media_root):
+            stale.save()
+        post.refresh_from_db()
+        self.assertEqual((post.audio_count, post.audio_size), (1, None))
+
+    def test_admin_changelist_query_count_is_constant(self):
+        admin_user = get_user_model().objects.create_superuser(
+            username="admin", email="admin@email.com", password="testpass123"
+        )
+        self.client.force_login(admin_user)
+        url = reverse("admin:blog_post_changelist")
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            return len(queries)
+
+        for index in range(3):
+            self.add_audio(self.create_post(f"post-{index}"))
+        few = changelist_queries()
+        for index in range(3, 20):
+            self.add_audio(self.create_post(f"post-{index}"))
+        self.assertEqual(changelist_queries(), few)
+
+
+class MediaReferenceTests(PostTestMixin, TestCase):
+    def paths(self, **filters):
+        return set(MediaReference.objects.filter(**filters).values_list("source", "path"))
+
+    def write_media(self, media_root, name, age=timedelta(days=2)):
+        """A file under media_root last modified age ago."""
+        full_path = os.path.join(media_root, name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(b"media")
+        modified = time.time() - age.total_seconds()
+        os.utime(full_path, (modified, modified))
+
+    def test_index_follows_content_and_file_fields(self):
+        post = self.create_post(
+            "con-medios",
+            content='<p>{{MEDIA:blog/audio/uno.mp3}}</p><img src="/media/uploads/foto.jpg">',
+        )
+        audio = PostAudio.objects.create(post=post, title="Dos", audio_file="blog/audio/dos.mp3")
+        self.assertEqual(self.paths(), {
+            ("content", "blog/audio/uno.mp3"),
+            ("content", "uploads/foto.jpg"),
+            ("audio_file", "blog/audio/dos.mp3"),
+        })
+
+        post.content = "<p>{{MEDIA:blog/audio/tres.mp3}}</p>"
+        post.save()
+        self.assertEqual(self.paths(source="content"), {("content", "blog/audio/tres.mp3")})
+
+        # Saves that can't change references don't touch the index
+        post = Post.objects.get(pk=post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.save(update_fields=["reviewed"])
+        self.assertFalse([q for q in queries if "blog_mediareference" in q["sql"]])
+
+        audio.delete()
+        post.delete()
+        self.assertFalse(MediaReference.objects.exists())
+
+    def test_find_orphan_media(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        for name in ("blog/audio/usado.mp3", "blog/audio/huerfano.mp3"):
+            self.write_media(media_root, name)
+        self.create_post(
+            "referencias",
+            content="{{MEDIA:blog/audio/usado.mp3}} {{MEDIA:blog/audio/borrado.mp3}}",
+        )
+
+        out = io.StringIO()
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command("find_orphan_media", stdout=out)
+        output = out.getvalue()
+        self.assertIn("Orphaned files: 1", output)
+        self.assertIn("blog/audio/huerfano.mp3", output)
+        self.assertNotIn("usado.mp3 (", output)
+        self.assertIn("blog/audio/borrado.mp3: post", output)
+
+    def test_reader_text_is_indexed_and_delete_rebuilds_first(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        for name in ("uploads/lectura.jpg", "uploads/portada.jpg", "uploads/huerfano.jpg"):
+            self.write_media(media_root, name)
+        level = DifficultyLevel.objects.create(name="Beginner", level_number=1)
+        reader = Reader.objects.create(
+            title="Lectura", author="Ana", difficulty_level=level, publication_date=timezone.now().date(),
+            word_count=10, description='<img src="/media/uploads/portada.jpg">',
+            content="<p>{{MEDIA:uploads/lectura.jpg}}</p>",
+        )
+        self.assertEqual(self.paths(object_id=reader.pk), {
+            ("content", "uploads/lectura.jpg"), ("description", "uploads/portada.jpg"),
+        })
+
+        # Even with references missing from the index, --delete only removes real orphans
+        MediaReference.objects.all().delete()
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command("find_orphan_media", "--delete", stdout=io.StringIO())
+        self.assertEqual(sorted(os.listdir(os.path.join(media_root, "uploads"))), ["lectura.jpg", "portada.jpg"])
+
+    def test_delete_keeps_files_younger_than_the_grace_period(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.write_media(media_root, "uploads/viejo.jpg")
+        # An upload whose transaction hasn't committed, a derivative being written
+        self.write_media(media_root, "uploads/nuevo.jpg", age=timedelta(minutes=1))
+        self.write_media(media_root, "derivatives/abc123/320.webp.tmp", age=timedelta(minutes=1))
+
+        out = io.StringIO()
+        with override_settings(MEDIA_ROOT=media_root, MEDIA_ORPHAN_GRACE_PERIOD=60 * 60):
+            call_command("find_orphan_media", "--delete", stdout=out)
+        self.assertIn("Skipped 2 unreferenced files", out.getvalue())
+        self.assertEqual(os.listdir(os.path.join(media_root, "uploads")), ["nuevo.jpg"])
+        self.assertEqual(os.listdir(os.path.join(media_root, "derivatives", "abc123")), ["320.webp.tmp"])
+
+    def test_models_that_cant_reference_media_are_not_indexed(self):
+        level = DifficultyLevel.objects.create(name="Beginner", level_number=1)
+        with CaptureQueriesContext(connection) as queries:
+            level.description = '<img src="/media/uploads/foto.jpg">'
+            level.save()
+        self.assertFalse([q for q in queries if "blog_mediareference" in q["sql"]])
+        self.assertFalse(MediaReference.objects.exists())
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class RelatedPostsTests(PostTestMixin, TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.corpus_path = os.path.join(directory, "related-corpus.npz")
+        override = override_settings(BLOG_RELATED_CORPUS_PATH=self.corpus_path)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Run the background refreshes inline
+        patcher = mock.patch.object(related, "refresh_in_background", side_effect=related.refresh_posts)
+        self.refresh_in_background = patcher.start()
+        self.addCleanup(patcher.stop)
+        topics = {
+            "subjuntivo-1": ("El subjuntivo presente", "<p>Usamos el subjuntivo para deseos y dudas.</p>"),
+            "subjuntivo-2": ("Más sobre el subjuntivo", "<p>El subjuntivo aparece después de ojalá y deseos.</p>"),
+            "cocina-1": ("Vocabulario de cocina", "<p>Sartén, cuchara y receta de tortilla.</p>"),
+            "cocina-2": ("Recetas en la cocina", "<p>Una receta de tortilla con sartén.</p>"),
+            "viajes": ("Viajar en tren", "<p>Billete, andén y estación.</p>"),
+        }
+        self.posts = {slug: self.create_post(slug, title=title, content=content) for slug, (title, content) in topics.items()}
+        related.rebuild()
+
+    def neighbours(self, slug):
+        return list(
+            RelatedPost.objects.filter(post=self.posts[slug]).values_list("related__slug", flat=True)
+        )
+
+    def test_rebuild_ranks_posts_on_the_same_topic_first(self):
+        self.assertEqual(self.neighbours("subjuntivo-1")[0], "subjuntivo-2")
+        self.assertEqual(self.neighbours("cocina-2")[0], "cocina-1")
+        # Nothing in common, nothing related
+        self.assertEqual(self.neighbours("viajes"), [])
+
+    def test_new_post_enters_existing_lists_incrementally(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts["subjuntivo-3"] = self.create_post(
+                "subjuntivo-3", title="Ojalá y el subjuntivo", content="<p>Deseos con ojalá.</p>"
+            )
+        # Queued once committed, not refreshed inside the save
+        self.refresh_in_background.assert_called_once_with([self.posts["subjuntivo-3"].pk], [])
+        self.assertIn("subjuntivo-3", self.neighbours("subjuntivo-1"))
+        self.assertIn("subjuntivo-3", self.neighbours("subjuntivo-2"))
+        self.assertIn("subjuntivo-1", self.neighbours("subjuntivo-3"))
+        self.assertNotIn("subjuntivo-3", self.neighbours("cocina-1"))
+
+    def test_unpublished_and_deleted_posts_leave_the_lists(self):
+        post = self.posts["subjuntivo-2"]
+        post.is_published = False
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertNotIn("subjuntivo-2", self.neighbours("subjuntivo-1"))
+        self.assertEqual(self.neighbours("subjuntivo-2"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts["cocina-1"].delete()
+        self.assertEqual(self.neighbours("cocina-2"), [])
+
+    def test_corpus_snapshot_outlives_the_cache_and_is_only_built_by_rebuild(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts["cocina-3"] = self.create_post(
+                "cocina-3", title="Tortilla en la sartén", content="<p>Receta de cocina.</p>"
+            )
+        self.assertIn("cocina-3", self.neighbours("cocina-1"))
+
+        # Without a snapshot a save leaves the lists to the next rebuild
+        os.remove(self.corpus_path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post("cocina-4", title="Cocina con sartén", content="<p>Otra receta de tortilla.</p>")
+        self.assertNotIn("cocina-4", self.neighbours("cocina-1"))
+        self.assertFalse(os.path.exists(self.corpus_path))
+
+        call_command("rebuild_related_posts", stdout=io.StringIO())
+        self.assertTrue(os.path.exists(self.corpus_path))
+        self.assertIn("cocina-4", self.neighbours("cocina-1"))
+
+    @override_settings(BLOG_PAGE_CACHE_TIMEOUT=60)
+    def test_pages_cached_before_the_refresh_finishes_are_invalidated(self):
+        cache.clear()
+        url = reverse("post_page", args=["subjuntivo-1"])
+        self.client.get(url)
+
+        queued = []
+        self.refresh_in_background.side_effect = lambda *args: queued.append(args)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post("subjuntivo-3", title="Ojalá y el subjuntivo", content="<p>Deseos con ojalá.</p>")
+        # A request between the save's invalidation and the refresh caches the old list
+        new_url = reverse("post_page", args=["subjuntivo-3"])
+        self.assertNotContains(self.client.get(url), new_url)
+
+        for args in queued:
+            related._run_in_worker(*args)
+        self.assertContains(self.client.get(url), new_url)
+
+    def test_post_page_shows_live_related_posts(self):
+        response = self.client.get(reverse("post_page", args=["subjuntivo-1"]))
+        self.assertEqual(response.context["related_posts"][0].slug, "subjuntivo-2")
+        self.assertContains(response, reverse("post_page", args=["subjuntivo-2"]))
+
+        # Scheduled posts stay hidden until they go live
+        Post.objects.filter(slug="subjuntivo-2").update(published_date=timezone.now() + timedelta(days=1))
+        response = self.client.get(reverse("post_page", args=["subjuntivo-1"]))
+        self.assertNotIn("subjuntivo-2", [post.slug for post in response.context["related_posts"]])
+
+
+class FeedTests(PostTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def fetch(self, name):
+        response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_rss_and_atom_list_live_posts(self):
+        self.create_post("publicado", title="Publicado", excerpt="Resumen del post")
+        self.create_post("programado", published_date=timezone.now() + timedelta(days=1))
+
+        rss = self.fetch("blog_rss")
+        self.assertIn("<title>Publicado</title>", rss)
+        self.assertIn("Resumen del post", rss)
+        self.assertIn("/blog/post/publicado/", rss)
+        self.assertNotIn("programado", rss)
+        self.assertTrue(rss.rstrip().endswith("</channel></rss>"))
+
+        atom = self.fetch("blog_atom")
+        self.assertIn("<entry>", atom)
+        self.assertTrue(atom.rstrip().endswith("</feed>"))
+
+    def test_only_changed_entries_are_rendered_again(self):
+        posts = [self.create_post(f"post-{index}") for index in range(5)]
+        self.fetch("blog_rss")
+
+        with mock.patch("blog.feeds.render_entry", wraps=feeds.render_entry) as render:
+            self.fetch("blog_rss")
+        self.assertEqual(render.call_count, 0)
+
+        # Saving renders the entries into the cache on commit
+        posts[2].title = "Nuevo título"
+        with self.captureOnCommitCallbacks(execute=True):
+            posts[2].save()
+        with mock.patch("blog.feeds.render_entry", wraps=feeds.render_entry) as render:
+            rss = self.fetch("blog_rss")
+        self.assertEqual(render.call_count, 0)
+        self.assertIn("Nuevo título", rss)
@@ -6,7 +6,13 @@ urlpatterns = [
     
     path('post/<slug:slug>/', views.post_page, name='post_page'),
     
+    path('<int:year>/', views.archive_posts, name='archive_year'),
+    path('<int:year>/<int:month>/', views.archive_posts, name='archive_month'),
+    
     
     path('blog/search/', views.search_posts, name='search_posts'),
+
+    path('feed/rss/', views.post_feed, {'kind': 'rss'}, name='blog_rss'),
+    path('feed/atom/', views.post_feed, {'kind': 'atom'}, name='blog_atom'),
     #path('blog/<slug:slug>/', views.post_detail, name='post_detail'),
 ]
\ No newline at end of file
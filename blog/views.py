@@ -1,98 +1,84 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect
 from django.urls import reverse
-from django.utils import timezone
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
+from django.utils.dates import MONTHS
+from . import archive, feeds, related, rendering, search
+from .conditional import conditional_page, listing_validators, post_validators
+from .page_cache import cache_public_page
 from .models import Post
+from .pagination import KeysetPaginator
 
 User = get_user_model()
 
+POSTS_PER_PAGE = 9
+
+
+def paginate_posts(request, posts_list, sort):
+    """
+    Paginate a post listing for blog.html.
+
+    'newest' and 'oldest' listings use keyset pagination on (published_date, id):
+    ?after=<cursor> / ?before=<cursor> cost one range query whatever the depth.
+    Legacy ?page=N links and relevance-ranked search results keep using
+    Django's Paginator (invalid page -> first page, out of range -> last page).
+    """
+    if sort in ('newest', 'oldest') and 'page' not in request.GET:
+        paginator = KeysetPaginator(posts_list, POSTS_PER_PAGE, descending=(sort == 'newest'))
+        return paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+
+    if sort == 'oldest':
+        posts_list = posts_list.order_by('published_date', 'id')
+    elif sort == 'newest':
+        posts_list = posts_list.order_by('-published_date', '-id')
+    paginator = Paginator(posts_list, POSTS_PER_PAGE)
+    return paginator.get_page(request.GET.get('page'))
+
+
+@conditional_page(listing_validators)
+@cache_public_page
 def blog(request):
     """
     Blog archive view that displays all published posts with pagination and sorting.
     Shows all published posts ordered by publication date (newest or oldest first).
     """
-    # Get all published posts
-    all_published_posts = Post.objects.filter(
-        is_published=True,
-        published_date__lte=timezone.now()
-    )
+    # Get all published posts (card columns only)
+    all_published_posts = Post.objects.published().cards()
     
     # Get sort parameter (default to 'newest')
-    sort = request.GET.get('sort', 'newest')
-    
-    # Apply sorting
-    if sort == 'oldest':
-        all_published_posts = all_published_posts.order_by('published_date')
-    else:  # newest (default)
-        all_published_posts = all_published_posts.order_by('-published_date')
+    sort = 'oldest' if request.GET.get('sort') == 'oldest' else 'newest'
     
-    # Pagination for published posts
-    paginator = Paginator(all_published_posts, 9)  # Show 9 posts per page
-    page = request.GET.get("page")
-    try:
-        posts = paginator.page(page)
-    except PageNotAnInteger:
-        # If page is not an integer, deliver first page
-        posts = paginator.page(1)
-    except EmptyPage:
-        # If page is out of range, deliver last page of results
-        posts = paginator.page(paginator.num_pages)
+    posts = paginate_posts(request, all_published_posts, sort)
     
-    #context = {
-    #    "posts": posts,
-    #}
-    # In your view
     context = {
         'posts': posts,  # Your paginated posts
-        #'search_query': search_query,
-        'available_years': [2025],  # Actual years from your posts
-        'available_months': [
-            (1, 'January'), (2, 'February'), (3, 'March'), 
-            (4, 'April'), (5, 'May'), (6, 'June'),
-            (7, 'July'), (8, 'August'), (9, 'September'),
-            (10, 'October'), (11, 'November'), (12, 'December')
-        ],
-    }    
-    
+        'archive_months': archive.get_archive_months(),
+    }
     
     return render(request, "blog/blog.html", context)
 
 
+@conditional_page(listing_validators)
+@cache_public_page
 def search_posts(request):
     """
-    Search view for finding posts by title or content with sorting options
+    Full-text search over title, subtitle, excerpt and content.
+    Results are ranked by relevance unless a sort order is requested.
     """
-    search_query = request.GET.get("q", "")
+    search_query = request.GET.get("q", "").strip()
     
-    if search_query:
-        posts_list = Post.objects.filter(
-            is_published=True, 
-            title__icontains=search_query
-        )
-    else:
-        # If no search term is provided, show all posts
-        posts_list = Post.objects.filter(is_published=True)
+    posts_list = Post.objects.published().cards()
     
-    # Get sort parameter (default to 'newest')
-    sort = request.GET.get('sort', 'newest')
+    if search_query:
+        posts_list = search.search_posts(posts_list, search_query)
     
-    # Apply sorting
-    if sort == 'oldest':
-        posts_list = posts_list.order_by('published_date')
-    else:  # newest (default)
-        posts_list = posts_list.order_by('-published_date')
+    # Get sort parameter (default to 'relevance' when searching, 'newest' otherwise)
+    sort = request.GET.get('sort', 'relevance' if search_query else 'newest')
+    if sort not in ('oldest', 'relevance') or (sort == 'relevance' and not search_query):
+        sort = 'newest'
     
-    # Pagination
-    paginator = Paginator(posts_list, 9)  # Show 9 posts per page
-    page = request.GET.get("page")
-    try:
-        posts = paginator.page(page)
-    except PageNotAnInteger:
-        posts = paginator.page(1)
-    except EmptyPage:
-        posts = paginator.page(paginator.num_pages)
+    posts = paginate_posts(request, posts_list, sort)
     
     context = {
         "posts": posts,
@@ -101,25 +87,61 @@ def search_posts(request):
     return render(request, "blog/blog.html", context)
 
 
+@conditional_page(listing_validators)
+@cache_public_page
+def archive_posts(request, year, month=None):
+    """
+    Published posts of one year or one month, with the archive sidebar.
+    URLs: /blog/2025/ and /blog/2025/3/
+    """
+    if not 1 <= year <= 9998 or (month is not None and not 1 <= month <= 12):
+        raise Http404("Invalid archive date")
+    
+    if month is None:
+        start, _ = archive.month_range(year, 1)
+        _, end = archive.month_range(year, 12)
+        archive_label = str(year)
+    else:
+        start, end = archive.month_range(year, month)
+        archive_label = f"{MONTHS[month]} {year}"
+    
+    posts_list = Post.objects.published().cards().filter(
+        published_date__gte=start,
+        published_date__lt=end
+    )
+    
+    sort = 'oldest' if request.GET.get('sort') == 'oldest' else 'newest'
+    posts = paginate_posts(request, posts_list, sort)
+    
+    context = {
+        'posts': posts,
+        'archive_label': archive_label,
+        'archive_months': archive.get_archive_months(),
+    }
+    return render(request, "blog/blog.html", context)
+
+
+@conditional_page(post_validators)
+@cache_public_page
 def post_page(request, slug):
     post = get_object_or_404(
-        Post, 
-        slug=slug, 
-        published_date__lte=timezone.now(), 
-        is_published=True
+        Post.objects.published().select_related('author'),
+        slug=slug
     )
 
-    # Process content here in the view
-    processed_content = post.content
-    processed_content = processed_content.replace('{{ title }}', post.title)
-    processed_content = processed_content.replace('{{ slug }}', post.slug)
-    processed_content = processed_content.replace('{{ author }}', str(post.author))
-    if post.published_date:
-        processed_content = processed_content.replace('{{ published_date }}', post.published_date.strftime('%B %d, %Y'))
+    # Placeholders and media paths are rendered once per post revision
+    processed_content = rendering.get_rendered_content(post)
     
     context = {
         "post": post,
         "processed_content": processed_content,
+        # Precomputed TF-IDF neighbours (blog.related), one indexed query
+        "related_posts": related.related_posts(post),
     }
     
-    return render(request, "blog/post.html", context)
\ No newline at end of file
+    return render(request, "blog/post.html", context)
+
+@conditional_page(listing_validators)
+def post_feed(request, kind):
+    """RSS ('rss') or Atom ('atom') feed of the latest posts, streamed from cached entries."""
+    return feeds.feed_response(request, kind)
@@ -0,0 +1,67 @@
+"""
+Write transactions that take SQLite's write lock up front.
+
+Transactions start DEFERRED (settings.py): BEGIN takes no lock, the first
+read takes a read snapshot and the first write upgrades it to the write
+lock. If another worker committed in between, that upgrade fails at once
+with "database is locked", whatever the busy timeout. Read-then-write
+paths that run concurrently in several workers (the archive month counts,
+the word count repair) use immediate_atomic() instead: BEGIN IMMEDIATE
+waits for the write lock (busy_timeout) and then can't fail on an upgrade.
+
+Admin saves are the other such path: Django runs the change, delete and
+changelist POSTs in its own atomic() (read the object, then write it and
+whatever the signals update), where immediate_atomic() could only open a
+savepoint. ImmediateWriteAdminMixin begins those requests IMMEDIATE.
+
+Everything else, reads in particular, keeps DEFERRED, so it never queues
+behind a writer.
+"""
+from contextlib import contextmanager, nullcontext
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+
+@contextmanager
+def immediate_atomic(using=DEFAULT_DB_ALIAS):
+    """
+    transaction.atomic() that begins with BEGIN IMMEDIATE on SQLite. Inside
+    an existing transaction it is a plain savepoint: the lock mode was
+    chosen by the outermost block.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    connection.ensure_connection()  # connecting resets transaction_mode from the settings
+    transaction_mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = transaction_mode  # BEGIN has been sent
+            yield
+    finally:
+        connection.transaction_mode = transaction_mode
+
+
+class ImmediateWriteAdminMixin:
+    """ModelAdmin mixin: POSTs to the change, delete and changelist views begin IMMEDIATE."""
+
+    def immediate_for_post(self, request):
+        if request.method == 'POST':
+            return immediate_atomic(using=router.db_for_write(self.model))
+        return nullcontext()
+
+    def changeform_view(self, request, *args, **kwargs):
+        with self.immediate_for_post(request):
+            return super().changeform_view(request, *args, **kwargs)
+
+    def delete_view(self, request, *args, **kwargs):
+        with self.immediate_for_post(request):
+            return super().delete_view(request, *args, **kwargs)
+
+    def changelist_view(self, request, *args, **kwargs):
+        with self.immediate_for_post(request):  # admin actions and list_editable saves
+            return super().changelist_view(request, *args, **kwargs)
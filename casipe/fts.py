@@ -0,0 +1,50 @@
+"""
+SQLite FTS5 pieces shared by the blog and temario search indexes
+(blog/search.py, temario/search.py).
+
+    FullTextField        the hidden column named like its FTS5 table, mapped on the
+                         unmanaged index models so querysets can use `__match`
+    build_match_query()  user input -> a safe FTS5 query string
+"""
+import re
+
+from django.db import models
+
+# Splits like the unicode61 tokenizer (runs of letters and digits). It doesn't
+# fold accents: the tokenizer's remove_diacritics does that inside FTS5.
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class FullTextField(models.TextField):
+    """
+    The hidden column SQLite FTS5 gives every virtual table (same name as the
+    table). It only exists so queries can use the `match` lookup below.
+    """
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    """
+    field__match='query' -> "table"."table" MATCH 'query'
+    """
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def build_match_query(text):
+    """
+    Turn user input into a safe FTS5 query.
+    Every word must match (implicit AND); the last word also matches as a
+    prefix so partially typed words still find results.
+    Example: 'estoy comi' -> '"estoy" "comi"*'
+    """
+    tokens = TOKEN_PATTERN.findall(text)
+    if not tokens:
+        return ''
+    phrases = [f'"{token}"' for token in tokens]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
@@ -0,0 +1,218 @@
+"""
+Responsive derivatives for uploaded images (Reader.cover_image).
+
+Templates used to scale the original upload down in CSS, so every visitor
+downloaded the full-size file. After an upload is committed, a process pool
+(Pillow resizing is CPU bound, so it runs outside the web worker) writes WebP and JPEG copies at fixed widths:
+
+    MEDIA_ROOT/derivatives/<content hash>/<width>.webp
+    MEDIA_ROOT/derivatives/<content hash>/<width>.jpg
+
+The directory is named after a hash of the image bytes, so regenerating is
+idempotent: the same upload always maps to the same files and existing ones
+are skipped. The hash and the widths that exist are stored on the model in a
+JSONField ({'hash': ..., 'widths': [...]}); the {% responsive_image %} tag
+(pages/templatetags/responsive_images.py) turns that into srcset URLs and
+falls back to the original while derivatives are still being generated.
+An image that can't be read (corrupt or unsupported) gets {'error': ...}
+instead, so later saves don't queue it again; a new upload starts over.
+
+Models opt in with connect(), for images a template renders with
+{% responsive_image %}; see readers/signals.py.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save, pre_save
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+
+DEFAULT_WIDTHS = (320, 640, 1280)
+
+# (extension, Pillow format, content type)
+FORMATS = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+
+QUALITY = 80
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+# (model, image field, derivatives field) registered with connect()
+registry = []
+
+
+def get_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def derivative_name(digest, width, extension):
+    """Storage name (relative to MEDIA_ROOT) of one derivative."""
+    return f'{DERIVATIVES_DIR}/{digest}/{width}.{extension}'
+
+
+def derivative_urls(derivatives, extension):
+    """[(url, width), ...] for the stored derivatives, smallest first."""
+    if not derivatives or 'hash' not in derivatives:
+        return []
+    return [
+        (settings.MEDIA_URL + derivative_name(derivatives['hash'], width, extension), width)
+        for width in derivatives['widths']
+    ]
+
+
+# ========================================
+# WORKER PROCESS (Pillow only, no Django)
+# ========================================
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def target_widths(original_width, widths):
+    """Configured widths below the original, plus the original if it's smaller than the largest."""
+    targets = [width for width in sorted(widths) if width < original_width]
+    if not targets or original_width <= max(widths):
+        targets.append(original_width)
+    return targets
+
+
+def flatten(image):
+    """JPEG has no alpha channel: put transparent images on a white background."""
+    from PIL import Image
+
+    if image.mode in ('RGB', 'L'):
+        return image
+    image = image.convert('RGBA')
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def render_derivatives(source_path, media_root, widths):
+    """
+    Write every missing derivative of source_path. Returns (hash, widths).
+    Files are written under a temporary name and renamed, so a concurrent
+    request never sees half an image.
+    """
+    from PIL import Image, ImageOps
+
+    digest = file_hash(source_path)
+    output_dir = os.path.join(media_root, DERIVATIVES_DIR, digest)
+    os.makedirs(output_dir, exist_ok=True)
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+        targets = target_widths(image.width, widths)
+        for width in targets:
+            resized = None
+            for extension, image_format, content_type in FORMATS:
+                path = os.path.join(output_dir, f'{width}.{extension}')
+                if os.path.exists(path):
+                    continue
+                if resized is None:
+                    height = max(round(image.height * width / image.width), 1)
+                    resized = image.resize((width, height), Image.LANCZOS)
+                frame = flatten(resized) if image_format == 'JPEG' else resized
+                temporary_path = f'{path}.{os.getpid()}.tmp'
+                frame.save(temporary_path, image_format, quality=QUALITY, optimize=True)
+                os.replace(temporary_path, path)
+    return digest, targets
+
+
+# ========================================
+# BACKGROUND GENERATION
+# ========================================
+_process_pool = None
+_thread_pool = None
+
+
+def get_executors():
+    """(process pool for resizing, thread pool waiting on it and saving results)"""
+    global _process_pool, _thread_pool
+    if _process_pool is None:
+        # spawn: forking a threaded web worker isn't safe
+        _process_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+        _thread_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+    return _process_pool, _thread_pool
+
+
+def store_derivatives(model, pk, field_name, derivatives_field, file_name, result):
+    """Save the (hash, widths) result unless the image was replaced in the meantime."""
+    digest, widths = result
+    model._default_manager.filter(pk=pk, **{field_name: file_name}).update(
+        **{derivatives_field: {'hash': digest, 'widths': widths}}
+    )
+
+
+def store_failure(model, pk, field_name, derivatives_field, file_name, error):
+    """Record that the image can't be processed, unless it was replaced in the meantime."""
+    model._default_manager.filter(pk=pk, **{field_name: file_name}).update(
+        **{derivatives_field: {'error': str(error) or type(error).__name__}}
+    )
+
+
+def generate_derivatives(instance, field_name, derivatives_field):
+    """Generate derivatives in this process (management commands, tests)."""
+    field_file = getattr(instance, field_name)
+    result = render_derivatives(field_file.path, settings.MEDIA_ROOT, get_widths())
+    store_derivatives(type(instance), instance.pk, field_name, derivatives_field, field_file.name, result)
+    return result
+
+
+def _run_in_worker(model, pk, field_name, derivatives_field, source_path, file_name):
+    process_pool = get_executors()[0]
+    try:
+        try:
+            result = process_pool.submit(render_derivatives, source_path, settings.MEDIA_ROOT, get_widths()).result()
+        except (OSError, ValueError) as error:  # unreadable image (PIL's UnidentifiedImageError is an OSError)
+            logger.warning('Image derivatives failed for %s %s: %s', model._meta.label, pk, error)
+            store_failure(model, pk, field_name, derivatives_field, file_name, error)
+            return
+        store_derivatives(model, pk, field_name, derivatives_field, file_name, result)
+    except Exception:
+        logger.exception('Image derivatives failed for %s %s', model._meta.label, pk)
+    finally:
+        connection.close()  # the worker thread has its own connection
+
+
+def generate_in_background(instance, field_name, derivatives_field):
+    """Queue derivative generation once the current transaction commits."""
+    field_file = getattr(instance, field_name)
+    args = (type(instance), instance.pk, field_name, derivatives_field, field_file.path, field_file.name)
+    transaction.on_commit(lambda: get_executors()[1].submit(_run_in_worker, *args))
+
+
+def connect(model, field_name, derivatives_field):
+    """
+    Keep derivatives_field in sync with the image in field_name:
+    a new upload (not yet committed to storage) or a removed image clears
+    it, and a saved image with neither derivatives nor a recorded failure
+    is queued for generation.
+    """
+    def reset_derivatives(sender, instance, **kwargs):
+        field_file = getattr(instance, field_name)
+        if not field_file or not field_file._committed:
+            setattr(instance, derivatives_field, {})
+
+    def queue_derivatives(sender, instance, **kwargs):
+        if getattr(instance, field_name) and not getattr(instance, derivatives_field):
+            generate_in_background(instance, field_name, derivatives_field)
+
+    registry.append((model, field_name, derivatives_field))
+    uid = f'{model._meta.label}.{field_name}:derivatives'
+    pre_save.connect(reset_derivatives, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(queue_derivatives, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,72 @@
+"""
+Columns kept up to date outside of save().
+
+Counters adjusted with F() by signals (Post.audio_count, ThematicCategory.word_count)
+and values written by background workers with update() (audio metadata, image
+derivatives) would be clobbered by any ordinary save() of an instance loaded
+before they changed: the admin form, a script, another signal receiver.
+MaintainedFieldsMixin leaves them out of saves of existing rows:
+
+    class Post(MaintainedFieldsMixin, models.Model):
+        maintained_fields = {
+            'audio_count': None,              # never written by save()
+            'audio_size': 'audio_file',       # only when audio_file is new or removed
+        }
+
+A field tied to a file field is still saved when that file is a new upload
+(not committed to storage yet) or was cleared, so the reset done by the
+pre_save receivers reaches the database. It is also saved when the instance's
+value differs from the one it was loaded with: an editor correcting
+Post.audio_duration in the admin wins, while a form that was merely opened
+before the worker finished doesn't write its stale value back. Saves that
+pass update_fields, and inserts, are left alone.
+"""
+
+
+class MaintainedFieldsMixin:
+    # {field name: file field whose new upload or removal resets it, or None}
+    maintained_fields = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_maintained = {
+            name: value for name, value in zip(field_names, values) if name in cls.maintained_fields
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        names = self.maintained_fields.keys() if fields is None else set(fields) & self.maintained_fields.keys()
+        deferred = self.get_deferred_fields()
+        self._loaded_maintained = {
+            **getattr(self, '_loaded_maintained', {}),
+            **{name: getattr(self, name) for name in names if name not in deferred},
+        }
+
+    def save(self, *args, **kwargs):
+        if (
+            self.maintained_fields and not args and not self._state.adding and self.pk is not None
+            and kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = self.saved_field_names()
+        super().save(*args, **kwargs)
+
+    def saved_field_names(self):
+        """Loaded, non-primary-key fields minus the maintained ones that save() mustn't touch."""
+        deferred = self.get_deferred_fields()
+        skipped = set(deferred)
+        loaded = getattr(self, '_loaded_maintained', {})
+        for name, file_field in self.maintained_fields.items():
+            if file_field is None or file_field in deferred:
+                skipped.add(name)
+                continue
+            if name in loaded and getattr(self, name) != loaded[name]:
+                continue  # set on purpose since it was loaded
+            field_file = getattr(self, file_field)
+            if field_file and field_file._committed:
+                skipped.add(name)
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in skipped and field.attname not in skipped
+        ]
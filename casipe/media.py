@@ -0,0 +1,170 @@
+"""
+Production media serving for uploaded files (MEDIA_ROOT).
+
+django.conf.urls.static.static() only works with DEBUG and always sends the
+whole file, so every seek in an <audio> player re-downloads the MP3.
+serve_media supports:
+
+    - Range requests (206 Partial Content / 416) and If-Range
+    - strong ETags and Last-Modified (304 Not Modified / 412)
+    - far-future, immutable caching: uploads are never overwritten in place
+      (the storage picks a new name on collision), so a URL always means the same bytes
+    - handing the transfer off to a reverse proxy with X-Accel-Redirect (nginx)
+      or X-Sendfile (Apache / lighttpd), see MEDIA_SENDFILE_BACKEND in settings
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+DEFAULT_MAX_AGE = 60 * 60 * 24 * 365  # 1 year
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) inclusive for a single byte range, None when the header
+    should be ignored (missing, malformed or multiple ranges) and raise
+    ValueError when the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        raise ValueError('Empty file')
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def if_range_matches(request, etag, mtime):
+    """If-Range: only honour Range when the client's copy is still current."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def iter_file(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def sendfile_response(path, relative_path, content_type):
+    """Empty response telling the reverse proxy which file to send."""
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    response = HttpResponse(content_type=content_type)
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        # nginx decodes the URI before matching the internal location; quote()
+        # keeps spaces, %, ? and non-ASCII names from breaking or rerouting it
+        response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative_path)
+    else:
+        # Header values must be latin-1; mod_xsendfile unescapes the path
+        # (XSendFileUnescape, on by default), so non-ASCII names survive
+        response.headers['X-Sendfile'] = quote(path)
+    return response
+
+
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT. Mounted at MEDIA_URL in casipe/urls.py."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('File not found')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    etag = file_etag(stat)
+    mtime = stat.st_mtime
+    size = stat.st_size
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if response is None:
+        if getattr(settings, 'MEDIA_SENDFILE_BACKEND', None):
+            # The proxy handles Range and streaming itself
+            response = sendfile_response(full_path, path, content_type)
+        else:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response.headers['Content-Range'] = f'bytes */{size}'
+                response.headers['Accept-Ranges'] = 'bytes'
+                return response
+
+            if byte_range and if_range_matches(request, etag, mtime):
+                start, end = byte_range
+                length = end - start + 1
+                if request.method == 'HEAD':
+                    response = HttpResponse(status=206, content_type=content_type)
+                else:
+                    response = StreamingHttpResponse(
+                        iter_file(full_path, start, length), status=206, content_type=content_type
+                    )
+                response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response.headers['Content-Length'] = str(length)
+            elif request.method == 'HEAD':
+                response = HttpResponse(content_type=content_type)
+                response.headers['Content-Length'] = str(size)
+            else:
+                response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.headers['Accept-Ranges'] = 'bytes'
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(mtime)
+    max_age = getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+    patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+    return response
@@ -0,0 +1,154 @@
+"""
+Response compression for pages (HTML, feeds, JSON), streamed responses included.
+
+Long Post.content and Reader.content pages went out uncompressed. CompressionMiddleware
+gzips text responses when the client accepts it, and leaves alone:
+
+    - responses that already carry a Content-Encoding
+    - media types that are compressed already or not worth it (images, audio, fonts, ...)
+    - STATIC_URL and MEDIA_URL: static files come precompressed from collectstatic
+      (casipe/static.py), uploads are binary and served with Range support
+    - partial content (206) and Cache-Control: no-transform
+
+Like django.middleware.gzip.GZipMiddleware it makes strong ETags weak and adds
+random filler to the gzip header against BREACH-style attacks.
+
+Every compressed response sends the response_compressed signal with its
+sizes and the CPU time spent compressing; connect a receiver to feed them to
+your metrics (`python manage.py benchmark_compression` measures the cost per KB).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+from .static import accepted_encodings
+
+logger = logging.getLogger(__name__)
+
+# Sent with path, content_type, original_size, compressed_size, seconds, streaming
+response_compressed = Signal()
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/rss+xml',
+    'application/atom+xml',
+    'application/xhtml+xml',
+    'image/svg+xml',
+)
+
+# Shorter bodies don't shrink enough to pay for the gzip header
+MIN_SIZE = 200
+
+
+def is_compressible_type(content_type):
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def report(request, response, original_size, compressed_size, seconds):
+    logger.debug(
+        'Compressed %s: %d -> %d bytes in %.2f ms',
+        request.path, original_size, compressed_size, seconds * 1000
+    )
+    response_compressed.send(
+        sender=CompressionMiddleware,
+        path=request.path,
+        content_type=response.get('Content-Type', ''),
+        original_size=original_size,
+        compressed_size=compressed_size,
+        seconds=seconds,
+        streaming=response.streaming,
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    max_random_bytes = 100
+
+    def skip_path(self, path):
+        prefixes = [settings.STATIC_URL, settings.MEDIA_URL]
+        return any(prefix and path.startswith('/' + prefix.lstrip('/')) for prefix in prefixes)
+
+    def should_compress(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 206:
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if not is_compressible_type(response.get('Content-Type', '')):
+            return False
+        if self.skip_path(request.path):
+            return False
+        if response.streaming:
+            # Async iterators are left alone; this site runs under WSGI
+            return not response.is_async
+        return len(response.content) >= MIN_SIZE
+
+    def process_response(self, request, response):
+        if not self.should_compress(request, response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+        if accepted.get('gzip', accepted.get('*', 0)) <= 0:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(request, response, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            started = time.perf_counter()
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            seconds = time.perf_counter() - started
+            original_size = len(response.content)
+            if len(compressed) >= original_size:
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+            report(request, response, original_size, len(compressed), seconds)
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    def compress_stream(self, request, response, sequence):
+        """compress_sequence(), timing only the compression (not the view producing chunks)."""
+        original_size = 0
+        producing = 0.0
+
+        def source():
+            nonlocal original_size, producing
+            iterator = iter(sequence)
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    producing += time.perf_counter() - started
+                    return
+                producing += time.perf_counter() - started
+                original_size += len(chunk)
+                yield chunk
+
+        compressed_size = 0
+        total = 0.0
+        compressed = compress_sequence(source(), max_random_bytes=self.max_random_bytes)
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(compressed)
+            except StopIteration:
+                total += time.perf_counter() - started
+                break
+            total += time.perf_counter() - started
+            compressed_size += len(chunk)
+            yield chunk
+        report(request, response, original_size, compressed_size, total - producing)
@@ -62,6 +62,8 @@ CKEDITOR_5_CONFIGS = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # gzip for pages and feeds; static files come precompressed (casipe/middleware.py)
+    'casipe.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,12 +78,21 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         "DIRS": [BASE_DIR / "templates"],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
+                'django.template.context_processors.i18n',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'pages.context_processors.layout',
+            ],
+            # Compiled templates are kept for the life of the worker (the
+            # development autoreloader clears them when a template changes)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -93,10 +104,32 @@ WSGI_APPLICATION = 'casipe.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Run on every new SQLite connection. WAL lets readers carry on while one
+# worker writes; NORMAL sync is crash-safe in WAL mode (a power cut may only
+# lose the last commits); negative cache_size is in KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,           # 20 MB page cache per connection
+    'mmap_size': 128 * 1024 * 1024,  # read pages through the OS page cache
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # busy_timeout: wait up to 20 s for another worker's write lock instead of failing.
+            # Transactions stay DEFERRED, so reads never wait for a writer; the
+            # read-then-write paths take the lock at BEGIN (casipe/db.py)
+            'timeout': 20,
+        },
+        # Keep each gunicorn worker's connection (and its pragmas and page
+        # cache) for 10 minutes, checking it is still usable before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -144,6 +177,19 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "staticfiles"),  
 ]
 
+# collectstatic writes content-hashed names, a staticfiles.json manifest and
+# .gz/.br siblings (casipe/storage.py); casipe/static.py serves them
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "casipe.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+# Hashed static names never change content, so browsers may cache them for a year
+STATIC_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 LOGIN_REDIRECT_URL = "home"
@@ -152,6 +198,80 @@ LOGOUT_REDIRECT_URL = "home"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media serving (casipe/media.py)
+# Uploaded files never change under the same name, so browsers may cache them for a year
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+# Behind nginx use 'x-accel-redirect' (with an `internal` location at
+# MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT); behind Apache/lighttpd use
+# 'x-sendfile'. None streams the file from Django.
+MEDIA_SENDFILE_BACKEND = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Snapshot of the "did you mean" index over temario words (temario/fuzzy.py)
+TEMARIO_FUZZY_INDEX_PATH = os.path.join(BASE_DIR, 'cache', 'temario-fuzzy.npz')
+
+# Snapshot of the TF-IDF matrix behind related posts (blog/related.py),
+# written by `python manage.py rebuild_related_posts`
+BLOG_RELATED_CORPUS_PATH = os.path.join(BASE_DIR, 'cache', 'related-corpus.npz')
+
+# Widths (px) of the WebP/JPEG copies made of uploaded images (casipe/images.py)
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# File-based so every gunicorn worker shares the same entries and invalidations.
+# Both caches cull entries at random once full, so nothing that must survive
+# goes in them. Anonymous blog pages (one entry per ?page=/?q= variant) get
+# their own alias so a crawl only culls other pages (blog/page_cache.py).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'pages'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Tests get in-memory caches instead of the ones above (casipe/test_runner.py)
+TEST_RUNNER = 'casipe.test_runner.TestRunner'
+
+# Seconds the navbar/footer fragments of base.html stay cached, per login
+# state, language and active section (pages/context_processors.py)
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds the temario word/category page fragments stay cached; they are also
+# deleted whenever their words change (temario/fragments.py)
+TEMARIO_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Identifies the deployed release (e.g. the git commit); part of every blog
+# ETag so a deploy that changes templates isn't answered with 304 Not Modified
+# (blog/conditional.py). Collected static changes are picked up on their own.
+RELEASE_VERSION = ''
+
+# Seconds an anonymous blog page stays in the page cache (0 disables it)
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Set to True when `manage.py run_publish_scheduler` runs next to gunicorn:
+# scheduled posts then go live through its events instead of per-request checks
+BLOG_PUBLISH_SCHEDULER = False
+
+# Where run_publish_scheduler listens for "schedule changed" datagrams sent
+# when a scheduled post is saved (blog/scheduler.py)
+BLOG_SCHEDULER_WAKE_ADDRESS = ('127.0.0.1', 8765)
+
+# Seconds an unreferenced file under MEDIA_ROOT is kept by
+# `find_orphan_media --delete`: uploads whose transaction hasn't committed and
+# image derivatives still being written aren't in the index yet (blog/media_index.py)
+MEDIA_ORPHAN_GRACE_PERIOD = 60 * 60 * 24
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
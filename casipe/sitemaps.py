@@ -0,0 +1,261 @@
+"""
+Sitemaps for the public pages, blog posts, graded readers and the temario
+word and category pages.
+
+/sitemap.xml is a sitemap index: it lists one child sitemap per section and
+page, /sitemap-<section>-<page>.xml, each with at most PAGE_SIZE URLs (the
+protocol allows 50,000 per file, and 100k temario words would go past it).
+
+Each page's XML is cached under a version computed by one aggregate query
+(count, ids and latest dates), so pages nothing changed in are served from
+the cache as they are. When a section's version moves, the page's rows are
+read again (one query) and its entries spliced back together from the
+previous render of that page: every <url> is cached with the row it was
+rendered from (id, dates), so a new or edited post renders only its own
+entry. Entries are cached per page, not one key each (100k temario words
+would crowd everything else out of the file cache, MAX_ENTRIES) nor one
+value per section (a single huge value to read and rewrite on every change).
+"""
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Sum
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_safe
+
+from blog.models import Post
+from readers.models import Reader
+from temario.models import ThematicCategory, Word
+
+SECTION_TIMEOUT = 60 * 60 * 24  # 1 day
+
+PAGE_SIZE = 10000  # URLs per child sitemap (the protocol's limit is 50,000)
+
+HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+FOOTER = '</urlset>\n'
+
+INDEX_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+INDEX_FOOTER = '</sitemapindex>\n'
+
+STATIC_PAGES = (
+    # (url name, changefreq, priority)
+    ('home', 'weekly', '1.0'),
+    ('blog', 'daily', '0.9'),
+    ('apps', 'monthly', '0.6'),
+    ('readers:reader_list', 'weekly', '0.7'),
+    ('temario:index', 'weekly', '0.7'),
+    ('about', 'yearly', '0.3'),
+)
+
+
+def url_entry(loc, lastmod=None, changefreq=None, priority=None):
+    parts = [f'<url><loc>{escape(loc)}</loc>']
+    if lastmod:
+        parts.append(f'<lastmod>{lastmod.isoformat()}</lastmod>')
+    if changefreq:
+        parts.append(f'<changefreq>{changefreq}</changefreq>')
+    if priority:
+        parts.append(f'<priority>{priority}</priority>')
+    parts.append('</url>\n')
+    return ''.join(parts)
+
+
+class Section:
+    """One group of URLs, served as PAGE_SIZE pages that are each cached as a block of XML."""
+    name = None
+
+    def version(self):
+        """Changes whenever the section's output would; None for static sections."""
+        return None
+
+    def count(self):
+        """Number of URLs in the section."""
+        return len(self.rows())
+
+    def rows(self):
+        """
+        Sliceable rows (a values_list queryset) of everything an entry depends
+        on, in sitemap order; the first item identifies it.
+        """
+        raise NotImplementedError
+
+    def entry(self, base_url, row):
+        raise NotImplementedError
+
+    def pages(self):
+        return max(-(-self.count() // PAGE_SIZE), 1)
+
+    def render(self, base_url, page):
+        version = '|'.join(str(part) for part in (base_url, PAGE_SIZE, self.version()))
+        key = f'sitemap:{self.name}:{page}:{hashlib.md5(version.encode("utf-8")).hexdigest()}'
+        xml = cache.get(key)
+        if xml is None:
+            xml = self.splice(base_url, page)
+            cache.set(key, xml, SECTION_TIMEOUT)
+        return xml
+
+    def splice(self, base_url, page):
+        """Join the page's entries, rendering only the rows that changed since its last render."""
+        entries_key = f'sitemap:{self.name}:{page}:entries:{hashlib.md5(base_url.encode("utf-8")).hexdigest()}'
+        previous = cache.get(entries_key) or {}
+        entries, changed = {}, False
+        start = (page - 1) * PAGE_SIZE
+        for row in self.rows()[start:start + PAGE_SIZE]:
+            entry = previous.get(row[0])
+            if entry is None or entry[0] != row:
+                entry, changed = (row, self.entry(base_url, row)), True
+            entries[row[0]] = entry
+        if changed or len(entries) != len(previous):
+            cache.set(entries_key, entries, SECTION_TIMEOUT)
+        return ''.join(xml for row, xml in entries.values())
+
+
+class StaticPagesSection(Section):
+    name = 'pages'
+
+    def rows(self):
+        return STATIC_PAGES
+
+    def entry(self, base_url, row):
+        url_name, changefreq, priority = row
+        return url_entry(base_url + reverse(url_name), changefreq=changefreq, priority=priority)
+
+
+class PostsSection(Section):
+    name = 'posts'
+
+    def version(self):
+        return tuple(Post.objects.published().aggregate(
+            count=Count('id'), ids=Sum('id'), updated_at=Max('updated_at'), published_date=Max('published_date')
+        ).values())
+
+    def count(self):
+        return Post.objects.published().count()
+
+    def rows(self):
+        return Post.objects.published().order_by('-published_date', '-pk').values_list(
+            'pk', 'slug', 'updated_at', 'published_date'
+        )
+
+    def entry(self, base_url, row):
+        pk, slug, updated_at, published_date = row
+        return url_entry(
+            base_url + reverse('post_page', args=[slug]),
+            lastmod=max(updated_at, published_date),
+            priority='0.8'
+        )
+
+
+class ReadersSection(Section):
+    name = 'readers'
+
+    def version(self):
+        return tuple(Reader.objects.aggregate(
+            count=Count('id'), ids=Sum('id'), publication_date=Max('publication_date')
+        ).values())
+
+    def count(self):
+        return Reader.objects.count()
+
+    def rows(self):
+        return Reader.objects.order_by('pk').values_list('pk', 'publication_date')
+
+    def entry(self, base_url, row):
+        pk, publication_date = row
+        return url_entry(
+            base_url + reverse('readers:reader_detail', args=[pk]),
+            lastmod=publication_date,
+            priority='0.6'
+        )
+
+
+class TemarioCategoriesSection(Section):
+    name = 'temario-categories'
+
+    def version(self):
+        return tuple(ThematicCategory.objects.aggregate(count=Count('id'), ids=Sum('id')).values())
+
+    def count(self):
+        return ThematicCategory.objects.count()
+
+    def rows(self):
+        return ThematicCategory.objects.order_by('pk').values_list('pk')
+
+    def entry(self, base_url, row):
+        return url_entry(base_url + reverse('temario:category_detail', args=row), priority='0.5')
+
+
+class TemarioWordsSection(Section):
+    name = 'temario-words'
+
+    def version(self):
+        return tuple(Word.objects.aggregate(
+            count=Count('id'), ids=Sum('id'), updated_at=Max('updated_at')
+        ).values())
+
+    def count(self):
+        return Word.objects.values('text').distinct().count()
+
+    def rows(self):
+        # One URL per text: word_detail shows every meaning, so the other ids
+        # are duplicates. Grouped in index order (temario_word_text_updated_idx),
+        # so the table itself isn't read.
+        words = Word.objects.values('text').annotate(first=Min('pk'), updated_at=Max('updated_at')).order_by('text')
+        return words.values_list('first', 'updated_at')
+
+    def entry(self, base_url, row):
+        pk, updated_at = row
+        return url_entry(
+            base_url + reverse('temario:word_detail', args=[pk]),
+            lastmod=updated_at,
+            priority='0.4'
+        )
+
+
+SECTIONS = {
+    section.name: section for section in (
+        StaticPagesSection(), PostsSection(), ReadersSection(), TemarioCategoriesSection(), TemarioWordsSection(),
+    )
+}
+
+
+@require_safe
+def sitemap_index(request):
+    """The child sitemaps of every section, one per page (one count query per section)."""
+    base_url = f'{request.scheme}://{request.get_host()}'
+
+    def stream():
+        yield INDEX_HEADER
+        for name, section in SECTIONS.items():
+            for page in range(1, section.pages() + 1):
+                loc = base_url + reverse('sitemap_section', args=[name, page])
+                yield f'<sitemap><loc>{escape(loc)}</loc></sitemap>\n'
+        yield INDEX_FOOTER
+
+    return StreamingHttpResponse(stream(), content_type='application/xml; charset=utf-8')
+
+
+@require_safe
+def sitemap_section(request, section, page):
+    section = SECTIONS.get(section)
+    if section is None or page < 1:
+        raise Http404('No such sitemap')
+    base_url = f'{request.scheme}://{request.get_host()}'
+    xml = section.render(base_url, page)
+    if not xml and page > 1:
+        raise Http404('No such sitemap page')
+
+    def stream():
+        yield HEADER
+        yield xml
+        yield FOOTER
+
+    return StreamingHttpResponse(stream(), content_type='application/xml; charset=utf-8')
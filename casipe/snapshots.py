@@ -0,0 +1,53 @@
+"""
+Locking for the .npz snapshots that every worker reads and some rewrite
+(temario/fuzzy.py, blog/related.py).
+
+Snapshots are written under a temporary name and renamed into place, so readers
+never see half a file. Writers that load, patch and save a snapshot take
+snapshot_lock(path) first, so two workers can't both start from the same copy
+and lose one of the changes.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not POSIX
+    fcntl = None
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+def _thread_lock(path):
+    with _thread_locks_lock:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+
+class snapshot_lock:
+    """
+    Exclusive lock on a snapshot, held through `{path}.lock`.
+    Without fcntl (not POSIX) it only serializes the threads of one process.
+    """
+
+    def __init__(self, path):
+        self.path = f'{path}.lock'
+
+    def __enter__(self):
+        self.thread_lock = _thread_lock(self.path)
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.file = open(self.path, 'w')
+                fcntl.flock(self.file, fcntl.LOCK_EX)
+            except BaseException:
+                self.thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+        self.thread_lock.release()
@@ -0,0 +1,113 @@
+"""
+Production static file serving from STATIC_ROOT.
+
+collectstatic (casipe/storage.py) leaves a content-hashed copy of every asset
+plus .br/.gz siblings for text files, so serving is only a choice between files:
+
+    - Accept-Encoding negotiation (q-values honoured): brotli, then gzip, then
+      the plain file; the response carries Content-Encoding and Vary: Accept-Encoding
+    - hashed names are cached for a year as immutable; plain names (e.g. an
+      asset referenced by a hardcoded URL) must be revalidated
+    - strong ETags per variant and Last-Modified (304 Not Modified)
+
+Nothing is compressed at request time, so gunicorn workers only copy bytes
+(FileResponse uses the server's sendfile wrapper).
+"""
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .media import DEFAULT_MAX_AGE, file_etag
+
+# (file extension, Content-Encoding), best first
+ENCODINGS = (
+    ('br', 'br'),
+    ('gz', 'gzip'),
+)
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_variant(full_path, header):
+    """
+    (path, stat, Content-Encoding or None, has variants) of the file to send.
+    Precompressed siblings only exist for files worth compressing.
+    """
+    accepted = accepted_encodings(header)
+    has_variants = False
+    for extension, coding in ENCODINGS:
+        try:
+            stat = os.stat(f'{full_path}.{extension}')
+        except OSError:
+            continue
+        has_variants = True
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return f'{full_path}.{extension}', stat, coding, has_variants
+    return full_path, os.stat(full_path), None, has_variants
+
+
+def is_hashed(path):
+    return path in getattr(staticfiles_storage, 'hashed_names', ())
+
+
+def serve_static(request, path):
+    """Serve a collected file from STATIC_ROOT. Mounted at STATIC_URL in casipe/urls.py."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid path')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found')
+
+    variant_path, stat, coding, has_variants = choose_variant(full_path, request.headers.get('Accept-Encoding'))
+    etag = file_etag(stat)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+            response.headers['Content-Length'] = str(stat.st_size)
+        else:
+            response = FileResponse(open(variant_path, 'rb'), content_type=content_type)
+        if coding:
+            response.headers['Content-Encoding'] = coding
+
+    if has_variants:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    if is_hashed(path):
+        max_age = getattr(settings, 'STATIC_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+        patch_cache_control(response, public=True, max_age=max_age, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -0,0 +1,106 @@
+"""
+Static files storage: content-hashed names plus precompressed siblings.
+
+collectstatic writes every file under a fingerprinted name (css/style.3f2a9c1b.css,
+see ManifestStaticFilesStorage) and records the mapping in staticfiles.json, so
+{% static %} URLs change whenever the content does and browsers can cache them
+forever. After hashing, each text asset also gets
+
+    css/style.3f2a9c1b.css.gz   gzip, level 9
+    css/style.3f2a9c1b.css.br   brotli, quality 11 (`brotli` is in requirements.txt; skipped without it)
+
+next to it, so casipe/static.py can hand out the smallest variant the browser
+accepts without compressing anything at request time.
+"""
+import gzip
+import os
+from functools import cached_property
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Already-compressed formats (images, fonts, archives) gain nothing
+COMPRESSIBLE_EXTENSIONS = frozenset((
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.otf', '.eot',
+))
+
+# Tiny files compress badly and fit in one packet anyway
+MIN_SIZE = 256
+
+# Keep a variant only if it saves at least 5%
+MAX_RATIO = 0.95
+
+
+def gzip_compress(data):
+    # mtime=0 keeps the output identical across collectstatic runs
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+
+def compressors():
+    """[(extension, function), ...] in order of preference."""
+    available = [('br', brotli_compress)] if brotli is not None else []
+    available.append(('gz', gzip_compress))
+    return available
+
+
+def is_compressible(name):
+    return os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Files added to staticfiles/ but not collected yet (development, tests)
+    # fall back to their plain name instead of breaking the page
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    @cached_property
+    def hashed_names(self):
+        """Every fingerprinted name in the manifest; safe to cache forever."""
+        return frozenset(self.hashed_files.values())
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if not isinstance(processed, Exception):
+                processed_names.add(name)
+                if hashed_name:
+                    processed_names.add(hashed_name)
+
+        if dry_run:
+            return
+        # The manifest passes may rewrite a file several times; compress the final bytes once
+        for name in sorted(processed_names):
+            if is_compressible(name):
+                self.compress(name)
+        self.__dict__.pop('hashed_names', None)
+
+    def compress(self, name):
+        """Write (or refresh) the .br/.gz siblings of one collected file."""
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for extension, function in compressors():
+            target = f'{path}.{extension}'
+            compressed = function(data) if len(data) >= MIN_SIZE else None
+            if compressed is None or len(compressed) > len(data) * MAX_RATIO:
+                if os.path.exists(target):
+                    os.remove(target)  # stale variant of an older version
+                continue
+            temporary_path = f'{target}.{os.getpid()}.tmp'
+            with open(temporary_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(temporary_path, target)
@@ -0,0 +1,47 @@
+"""
+Test runner that keeps the suite away from the real caches.
+
+Tests clear the cache freely; with the file-based CACHES from settings.py that
+would wipe (and fill) BASE_DIR/cache of the checkout the tests run from. Every
+alias is swapped for a local-memory cache for the whole run, and the index
+snapshots are written to a temporary directory.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def test_caches():
+    return {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'test-{alias}',
+        }
+        for alias in settings.CACHES
+    }
+
+
+def test_snapshot_paths(directory):
+    return {
+        'BLOG_RELATED_CORPUS_PATH': os.path.join(directory, 'related-corpus.npz'),
+        'TEMARIO_FUZZY_INDEX_PATH': os.path.join(directory, 'temario-fuzzy.npz'),
+    }
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.snapshot_directory = tempfile.mkdtemp(prefix='casipe-tests-')
+        self.cache_override = override_settings(
+            CACHES=test_caches(), **test_snapshot_paths(self.snapshot_directory)
+        )
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        shutil.rmtree(self.snapshot_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,413 @@
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock, skipUnless
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog import archive
+from blog.models import ArchiveMonth, Post
+from temario.models import ThematicCategory, Word
+
+from . import sitemaps, storage
+from .db import immediate_atomic
+from .middleware import CompressionMiddleware, response_compressed
+from .snapshots import snapshot_lock
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, "blog", "audio"))
+        self.data = bytes(range(256)) * 40  # 10240 bytes
+        with open(os.path.join(self.media_root, "blog", "audio", "clip.mp3"), "wb") as f:
+            f.write(self.data)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.url = "/media/blog/audio/clip.mp3"
+
+    def test_full_file_with_cache_headers(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        self.assertEqual(response["Content-Type"], "audio/mpeg")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("ETag", response)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 100-199/10240")
+        self.assertEqual(b"".join(response.streaming_content), self.data[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10000-")
+        self.assertEqual(b"".join(response.streaming_content), self.data[10000:])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-40")
+        self.assertEqual(response["Content-Range"], "bytes 10200-10239/10240")
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=20000-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10240")
+
+    def test_if_range_with_stale_etag_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_traversal_and_missing_files(self):
+        self.assertEqual(self.client.get("/media/../manage.py").status_code, 404)
+        self.assertEqual(self.client.get("/media/blog/audio/missing.mp3").status_code, 404)
+        self.assertEqual(self.client.get("/media/blog/audio/").status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND="x-accel-redirect")
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/blog/audio/clip.mp3")
+        self.assertEqual(response.content, b"")
+
+    @override_settings(MEDIA_SENDFILE_BACKEND="x-accel-redirect")
+    def test_accel_redirect_quotes_the_path(self):
+        name = "canción 100% ¿sí?.mp3"
+        with open(os.path.join(self.media_root, "blog", "audio", name), "wb") as f:
+            f.write(self.data)
+
+        response = self.client.get("/media/blog/audio/" + quote(name))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/blog/audio/canci%C3%B3n%20100%25%20%C2%BFs%C3%AD%3F.mp3"
+        )
+
+    @override_settings(MEDIA_SENDFILE_BACKEND="x-sendfile")
+    def test_sendfile_quotes_the_path(self):
+        name = "canción.mp3"
+        with open(os.path.join(self.media_root, "blog", "audio", name), "wb") as f:
+            f.write(self.data)
+
+        response = self.client.get("/media/blog/audio/" + quote(name))
+
+        self.assertEqual(
+            response["X-Sendfile"], quote(os.path.join(self.media_root, "blog", "audio", name))
+        )
+        self.assertTrue(response["X-Sendfile"].endswith("/blog/audio/canci%C3%B3n.mp3"))
+
+    def test_ranges_of_an_empty_file_are_unsatisfiable(self):
+        open(os.path.join(self.media_root, "blog", "audio", "empty.mp3"), "wb").close()
+
+        for header in ("bytes=-10", "bytes=0-"):
+            response = self.client.get("/media/blog/audio/empty.mp3", HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response["Content-Range"], "bytes */0")
+
+
+class StaticServingTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.static_root)
+        os.makedirs(os.path.join(self.source, "css"))
+        self.css = b"body { color: #333; }\n" * 100
+        with open(os.path.join(self.source, "css", "site.css"), "wb") as f:
+            f.write(self.css)
+        with open(os.path.join(self.source, "css", "tiny.css"), "wb") as f:
+            f.write(b"p {}")
+        override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name("css/site.css")
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        self.assertRegex(self.hashed, r"^css/site\.[0-9a-f]{12}\.css$")
+        with open(os.path.join(self.static_root, self.hashed + ".gz"), "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), self.css)
+        self.assertEqual(os.path.exists(os.path.join(self.static_root, self.hashed + ".br")), storage.brotli is not None)
+        # Not worth compressing
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, "css", "tiny.css.gz")))
+
+    def test_serves_precompressed_variant(self):
+        response = self.client.get("/static/" + self.hashed, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.css)
+
+    @skipUnless(storage.brotli, "brotli is not installed")
+    def test_collectstatic_writes_and_serves_brotli(self):
+        with open(os.path.join(self.static_root, self.hashed + ".br"), "rb") as f:
+            self.assertEqual(storage.brotli.decompress(f.read()), self.css)
+
+        response = self.client.get("/static/" + self.hashed, HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(storage.brotli.decompress(b"".join(response.streaming_content)), self.css)
+
+    def test_identity_when_compression_is_refused(self):
+        for header in ("", "gzip;q=0", "identity"):
+            response = self.client.get("/static/" + self.hashed, HTTP_ACCEPT_ENCODING=header)
+            self.assertNotIn("Content-Encoding", response)
+            self.assertEqual(b"".join(response.streaming_content), self.css)
+
+    def test_plain_names_are_revalidated(self):
+        response = self.client.get("/static/css/site.css", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(
+            "/static/css/site.css", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_manifest_entry_falls_back_to_plain_name(self):
+        self.assertEqual(staticfiles_storage.stored_name("css/not-collected.css"), "css/not-collected.css")
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = ("<p>Hola, ¿qué tal?</p>\n" * 200).encode("utf-8")
+
+    def setUp(self):
+        self.reports = []
+
+        def record(sender, **kwargs):
+            self.reports.append(kwargs)
+
+        response_compressed.connect(record)
+        self.addCleanup(response_compressed.disconnect, record)
+
+    def process(self, response, path="/blog/post/hola/", accept="gzip, br"):
+        request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_html(self):
+        response = HttpResponse(self.body, content_type="text/html; charset=utf-8")
+        response["ETag"] = '"abc"'
+        response = self.process(response)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(len(self.reports), 1)
+        self.assertEqual(self.reports[0]["original_size"], len(self.body))
+        self.assertEqual(self.reports[0]["compressed_size"], len(response.content))
+        self.assertFalse(self.reports[0]["streaming"])
+
+    def test_compresses_streaming_responses(self):
+        chunks = [self.body[i:i + 1000] for i in range(0, len(self.body), 1000)]
+        response = self.process(StreamingHttpResponse(iter(chunks), content_type="application/rss+xml"))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(self.reports, [])  # reported once the stream has been sent
+        compressed = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(compressed), self.body)
+        self.assertEqual(self.reports[0]["original_size"], len(self.body))
+        self.assertEqual(self.reports[0]["compressed_size"], len(compressed))
+        self.assertTrue(self.reports[0]["streaming"])
+
+    def test_skips(self):
+        encoded = HttpResponse(self.body, content_type="text/html")
+        encoded["Content-Encoding"] = "br"
+        cases = [
+            (encoded, "/", "gzip"),
+            (HttpResponse(self.body, content_type="image/png"), "/", "gzip"),
+            (HttpResponse(self.body, content_type="text/css"), "/static/css/style.css", "gzip"),
+            (HttpResponse(self.body, content_type="text/plain"), "/media/notes.txt", "gzip"),
+            (HttpResponse(b"<p>short</p>", content_type="text/html"), "/", "gzip"),
+            (HttpResponse(self.body, content_type="text/html"), "/", "gzip;q=0, identity"),
+        ]
+        for response, path, accept in cases:
+            with self.subTest(path=path, content_type=response["Content-Type"], accept=accept):
+                response = self.process(response, path, accept)
+                self.assertNotEqual(response.get("Content-Encoding"), "gzip")
+        self.assertEqual(self.reports, [])
+
+
+class SnapshotLockTests(SimpleTestCase):
+    def test_writers_take_turns(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "index.npz")
+        entered = threading.Event()
+
+        def writer():
+            with snapshot_lock(path):
+                entered.set()
+
+        with snapshot_lock(path):
+            thread = threading.Thread(target=writer)
+            thread.start()
+            self.assertFalse(entered.wait(0.2))
+        thread.join(5)
+        self.assertTrue(entered.is_set())
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_pragmas_are_set_on_connect(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(cursor.execute("PRAGMA cache_size").fetchone()[0], -20000)
+            self.assertEqual(cursor.execute("PRAGMA busy_timeout").fetchone()[0], 20000)
+        # Only the write paths in casipe/db.py take the lock at BEGIN
+        self.assertIsNone(connection.transaction_mode)
+
+
+class ImmediateTransactionTests(TransactionTestCase):
+    def test_only_immediate_atomic_begins_immediate(self):
+        with CaptureQueriesContext(connection) as queries:
+            with immediate_atomic():
+                ArchiveMonth.objects.count()
+                with immediate_atomic():  # nested: a savepoint
+                    ArchiveMonth.objects.count()
+            with transaction.atomic():
+                ArchiveMonth.objects.count()
+        begins = [query["sql"] for query in queries if query["sql"].startswith("BEGIN")]
+        self.assertEqual(begins, ["BEGIN IMMEDIATE", "BEGIN"])
+        self.assertIsNone(connection.transaction_mode)
+
+    def test_admin_saves_begin_immediate(self):
+        category = ThematicCategory.objects.create(name="Comida")
+        self.client.force_login(get_user_model().objects.create_superuser(username="admin", password="testpass123"))
+        url = reverse("admin:temario_thematiccategory_change", args=[category.pk])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertNotIn("BEGIN IMMEDIATE", [query["sql"] for query in queries])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {"name": "Cocina", "description": ""})
+        self.assertEqual(response.status_code, 302)
+        begins = [query["sql"] for query in queries if query["sql"].startswith("BEGIN")]
+        self.assertEqual(begins[0], "BEGIN IMMEDIATE")
+        self.assertEqual(ThematicCategory.objects.get(pk=category.pk).name, "Cocina")
+
+    def test_archive_changes_take_the_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries:
+            archive.apply_changes({(2025, 1): 1})
+        self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+        self.assertEqual(ArchiveMonth.objects.get(year=2025, month=1).post_count, 1)
+
+
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(username="renato", password="testpass123")
+        cls.post = Post.objects.create(
+            title="Hola", slug="hola", content="<p>Hola</p>", author=author,
+            is_published=True, published_date=timezone.now()
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def fetch(self, url="/sitemap.xml"):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_index_lists_a_child_sitemap_per_section(self):
+        xml = self.fetch()
+        self.assertTrue(xml.endswith("</sitemapindex>\n"))
+        for name in ("pages", "posts", "readers", "temario-categories", "temario-words"):
+            self.assertIn(f"<sitemap><loc>http://testserver/sitemap-{name}-1.xml</loc></sitemap>", xml)
+
+    def test_lists_pages_and_posts(self):
+        self.assertIn("<loc>http://testserver/</loc>", self.fetch("/sitemap-pages-1.xml"))
+        xml = self.fetch("/sitemap-posts-1.xml")
+        self.assertIn("<loc>http://testserver/blog/post/hola/</loc>", xml)
+        self.assertTrue(xml.endswith("</urlset>\n"))
+
+    def test_lists_temario_words_and_categories(self):
+        category = ThematicCategory.objects.create(name="Casa")
+        word = Word.objects.create(text="mesa", definition="Table")
+        self.assertIn(
+            f"<loc>http://testserver/apps/temario/category/{category.pk}/</loc>",
+            self.fetch("/sitemap-temario-categories-1.xml")
+        )
+        self.assertIn(
+            f"<loc>http://testserver/apps/temario/word/{word.pk}/</loc>", self.fetch("/sitemap-temario-words-1.xml")
+        )
+
+    def test_words_sharing_a_text_are_listed_once(self):
+        first = Word.objects.create(text="banco", definition="Bench")
+        second = Word.objects.create(text="banco", definition="Bank")
+        xml = self.fetch("/sitemap-temario-words-1.xml")
+        self.assertIn(f"<loc>http://testserver/apps/temario/word/{first.pk}/</loc>", xml)
+        self.assertNotIn(f"/apps/temario/word/{second.pk}/", xml)
+
+    def test_large_sections_are_split_into_pages(self):
+        words = [Word.objects.create(text=text, definition=text) for text in ("arroz", "banco", "banco", "casa")]
+        with mock.patch.object(sitemaps, "PAGE_SIZE", 2):
+            index = self.fetch()
+            self.assertIn("/sitemap-temario-words-2.xml", index)
+            self.assertNotIn("/sitemap-temario-words-3.xml", index)
+            self.assertNotIn("/sitemap-posts-2.xml", index)
+
+            first = self.fetch("/sitemap-temario-words-1.xml")
+            second = self.fetch("/sitemap-temario-words-2.xml")
+            self.assertEqual(first.count("<url>"), 2)
+            self.assertIn(f"/apps/temario/word/{words[1].pk}/", first)
+            self.assertIn(f"/apps/temario/word/{words[3].pk}/", second)
+            self.assertEqual(self.client.get("/sitemap-temario-words-3.xml").status_code, 404)
+        self.assertEqual(self.client.get("/sitemap-nothing-1.xml").status_code, 404)
+
+    def test_pages_are_cached_until_they_change(self):
+        self.fetch("/sitemap-posts-1.xml")
+        # Only the version query
+        with self.assertNumQueries(1):
+            self.fetch("/sitemap-posts-1.xml")
+
+        self.post.title = "Hola otra vez"
+        self.post.save()
+        with self.assertNumQueries(2):
+            self.assertIn("/blog/post/hola/", self.fetch("/sitemap-posts-1.xml"))
+
+    def test_a_change_renders_only_its_own_entry(self):
+        other = Post.objects.create(
+            title="Adiós", slug="adios", content="<p>Adiós</p>", author=self.post.author,
+            is_published=True, published_date=timezone.now()
+        )
+        self.fetch("/sitemap-posts-1.xml")
+
+        Post.objects.filter(pk=other.pk).update(slug="chao", updated_at=timezone.now())
+        render = sitemaps.PostsSection.entry
+        with mock.patch.object(sitemaps.PostsSection, "entry", autospec=True, side_effect=render) as entry:
+            xml = self.fetch("/sitemap-posts-1.xml")
+        self.assertEqual([call.args[2][0] for call in entry.call_args_list], [other.pk])
+        self.assertIn("<loc>http://testserver/blog/post/chao/</loc>", xml)
+        self.assertIn("<loc>http://testserver/blog/post/hola/</loc>", xml)
+        self.assertNotIn("/blog/post/adios/", xml)
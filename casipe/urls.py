@@ -1,7 +1,12 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .media import serve_media
+from .static import serve_static
+from .sitemaps import sitemap_index, sitemap_section
 
 urlpatterns = [
     # Django admin
@@ -19,7 +24,17 @@ urlpatterns = [
     path("accounts/", include("accounts.urls")),
     path("blog/", include("blog.urls")),
     path("apps/", include("apps.urls")),    
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    
+    # Crawlers: a sitemap index of paged, cached section sitemaps instead of walking every listing
+    path("sitemap.xml", sitemap_index, name="sitemap"),
+    path("sitemap-<slug:section>-<int:page>.xml", sitemap_section, name="sitemap_section"),
+    
+    # Uploaded media with Range / ETag support (audio seeking), in production too
+    re_path(r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")), serve_media),
+
+    # Collected static files: hashed names, precompressed .br/.gz variants
+    re_path(r"^%s(?P<path>.*)$" % re.escape(settings.STATIC_URL.lstrip("/")), serve_static),
+]
 
 
 # if settings.DEBUG:
@@ -14,3 +14,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'casipe.settings')
 
 application = get_wsgi_application()
+
+# Load the "did you mean" word index snapshot once per worker, not on the first
+# misspelled search (it is built by `manage.py rebuild_fuzzy_index`, never here)
+from django.db import connection  # noqa: E402
+
+from temario import fuzzy  # noqa: E402
+
+fuzzy.warm()
+# Under gunicorn --preload this runs in the master: don't let the forked
+# workers inherit its SQLite connection
+connection.close()
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+# (URL fragment, section) checked in order; mirrors the active links in partials/_navbar.html
+NAV_SECTIONS = (
+    ('/blog/', 'blog'),
+    ('/about/', 'about'),
+)
+
+DEFAULT_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def nav_section(path):
+    if path == '/':
+        return 'home'
+    for fragment, section in NAV_SECTIONS:
+        if fragment in path:
+            return section
+    return ''
+
+
+def layout(request):
+    """
+    Values base.html keys its cached navbar/footer fragments on: the active
+    navbar section (the only part of the navbar that depends on the URL) and
+    the fragment lifetime.
+    """
+    return {
+        'nav_section': nav_section(request.path),
+        'fragment_cache_timeout': getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', DEFAULT_FRAGMENT_CACHE_TIMEOUT),
+    }
@@ -0,0 +1,129 @@
+import re
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from blog.models import ArchiveMonth, Post
+from readers.models import DifficultyLevel, Reader
+from temario.models import ThematicCategory, Word
+
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def scanned_table(line, tables):
+    """
+    Table of a plan line like "SCAN blog_post", but not "SCAN ... USING [COVERING] INDEX",
+    FTS5 tables or subqueries (e.g. the ROW_NUMBER() window of a sliced prefetch).
+    """
+    if line.startswith('SCAN ') and ' USING ' not in line and 'VIRTUAL TABLE' not in line:
+        table = line.split()[1]
+        if table in tables:
+            return table
+    return None
+
+
+def public_paths():
+    """One URL per public view (and per filter that changes its queries), using existing rows."""
+    paths = [
+        reverse('home'),
+        reverse('blog'),
+        reverse('search_posts') + '?q=hola',
+        reverse('blog_rss'),
+        reverse('sitemap'),
+        reverse('sitemap_section', args=['posts', 1]),
+        reverse('sitemap_section', args=['temario-words', 1]),
+        reverse('temario:index'),
+        reverse('temario:index') + '?search=casa',
+        reverse('readers:reader_list'),
+        reverse('readers:reader_list') + '?search=casa',
+    ]
+    post = Post.objects.published().order_by('-published_date').first()
+    if post:
+        paths.append(reverse('post_page', args=[post.slug]))
+    month = ArchiveMonth.objects.first()
+    if month:
+        paths.append(reverse('archive_year', args=[month.year]))
+        paths.append(reverse('archive_month', args=[month.year, month.month]))
+    category = ThematicCategory.objects.first()
+    if category:
+        paths.append(reverse('temario:index') + f'?category={category.pk}')
+        paths.append(reverse('temario:category_detail', args=[category.pk]))
+    word = Word.objects.first()
+    if word:
+        paths.append(reverse('temario:word_detail', args=[word.pk]))
+    level = DifficultyLevel.objects.first()
+    if level:
+        paths.append(reverse('readers:reader_list') + f'?level={level.level_number}')
+    reader = Reader.objects.first()
+    if reader:
+        paths.append(reverse('readers:reader_detail', args=[reader.pk]))
+    return paths
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN on the queries of every public view and report table scans and sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan of every query')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error when a table scan is found')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The audit reads SQLite query plans')
+
+        client = Client()
+        tables = set(connection.introspection.table_names())
+        findings = defaultdict(set)  # (kind, detail) -> paths
+        seen = set()
+        # No page or fragment cache, so every view runs all of its queries
+        with override_settings(
+            ALLOWED_HOSTS=['*'],
+            BLOG_PAGE_CACHE_TIMEOUT=0,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        ):
+            for path in public_paths():
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{path} [{response.status_code}]: {len(captured.captured_queries)} queries'
+                ))
+                for query in captured.captured_queries:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT') or sql in seen:
+                        continue
+                    seen.add(sql)
+                    self.explain(path, sql, tables, findings, options['verbose_plans'])
+
+        scans = sorted(detail for kind, detail in findings if kind == 'scan')
+        sorts = sorted(detail for kind, detail in findings if kind == 'sort')
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Table scans: {len(scans)}'))
+        for table in scans:
+            self.stdout.write(self.style.WARNING(f"  {table}: {', '.join(sorted(findings['scan', table]))}"))
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Temporary sorts: {len(sorts)}'))
+        for table in sorts:
+            self.stdout.write(f"  {table}: {', '.join(sorted(findings['sort', table]))}")
+        if scans and options['fail_on_scan']:
+            raise CommandError(f'{len(scans)} tables are scanned')
+
+    def explain(self, path, sql, tables, findings, verbose):
+        with connection.cursor() as cursor:
+            plan = [row[-1] for row in cursor.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()]
+        if verbose:
+            self.stdout.write(f'  {sql}')
+            for line in plan:
+                self.stdout.write(f'    {line}')
+        for line in plan:
+            table = scanned_table(line, tables)
+            if table:
+                findings['scan', table].add(path)
+                if not verbose:
+                    self.stdout.write(self.style.WARNING(f'  {line}') + f'  <- {sql[:160]}')
+            elif TEMP_SORT in line:
+                table = re.search(r'FROM "(\w+)"', sql)
+                findings['sort', table.group(1) if table else '?'].add(path)
@@ -0,0 +1,79 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from blog.models import Post
+from casipe.middleware import CompressionMiddleware, response_compressed
+from readers.models import Reader
+
+STREAM_CHUNK_SIZE = 8 * 1024
+
+SAMPLE_PARAGRAPH = (
+    '<p>El <strong>subjuntivo</strong> se usa para expresar deseos, dudas y emociones: '
+    '<em>Espero que vengas mañana</em>. Compara con el indicativo en las frases siguientes.</p>\n'
+)
+
+
+class Command(BaseCommand):
+    help = 'Measure the CPU cost per KB and the ratio of CompressionMiddleware on the longest posts and readers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=5, help='Longest texts to take from each model')
+        parser.add_argument('--iterations', type=int, default=50, help='Compressions per text and mode')
+
+    def handle(self, *args, **options):
+        bodies = self.sample_bodies(options['samples'])
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/benchmark/', HTTP_ACCEPT_ENCODING='gzip')
+
+        measurements = []
+
+        def record(sender, **kwargs):
+            measurements.append(kwargs)
+
+        response_compressed.connect(record)
+        try:
+            self.stdout.write(f'{"source":<28} {"mode":<10} {"KB":>8} {"ratio":>7} {"us/KB":>8}')
+            for label, body in bodies:
+                for mode in ('buffered', 'streaming'):
+                    measurements.clear()
+                    for _ in range(options['iterations']):
+                        response = self.make_response(body, mode)
+                        response = middleware.process_response(request, response)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                    if not measurements:
+                        self.stdout.write(f'{label:<28} {mode:<10} not compressed')
+                        continue
+                    kilobytes = measurements[0]['original_size'] / 1024
+                    ratio = measurements[0]['compressed_size'] / measurements[0]['original_size']
+                    per_kb = statistics.median(m['seconds'] for m in measurements) / kilobytes * 1e6
+                    self.stdout.write(f'{label:<28} {mode:<10} {kilobytes:>8.1f} {ratio:>7.2f} {per_kb:>8.1f}')
+        finally:
+            response_compressed.disconnect(record)
+
+    def sample_bodies(self, samples):
+        bodies = []
+        for model in (Post, Reader):
+            for pk, content in model.objects.annotate(length=Length('content')).order_by('-length').values_list(
+                'pk', 'content'
+            )[:samples]:
+                bodies.append((f'{model.__name__} {pk}', self.page(content)))
+        if not bodies:
+            self.stdout.write(self.style.WARNING('No posts or readers, using a synthetic page'))
+            bodies.append(('synthetic', self.page(SAMPLE_PARAGRAPH * 200)))
+        return bodies
+
+    def page(self, content):
+        # Roughly what base.html wraps around the text
+        return ('<!DOCTYPE html><html><head><title>Casipe</title></head><body><main>'
+                + content + '</main></body></html>').encode('utf-8')
+
+    def make_response(self, body, mode):
+        if mode == 'buffered':
+            return HttpResponse(body, content_type='text/html; charset=utf-8')
+        chunks = (body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE))
+        return StreamingHttpResponse(chunks, content_type='text/html; charset=utf-8')
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ROWS = 2000
+
+
+def connect(path, options):
+    conn = sqlite3.connect(path, timeout=options['timeout'], isolation_level=None)
+    for statement in options['init_command'].split(';'):
+        if statement.strip():
+            conn.execute(statement)
+    return conn
+
+
+def run_worker(path, options, seconds, write_ratio, seed):
+    """One gunicorn-like worker: page reads mixed with read-then-write transactions."""
+    rng = random.Random(seed)
+    conn = connect(path, options)
+    begin = f"BEGIN {options['transaction_mode'] or ''}"
+    reads, writes, errors = [], [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                # Like a Django save() in atomic(): read the row, then write it
+                conn.execute(begin)
+                post_id = rng.randint(1, ROWS)
+                views = conn.execute('SELECT views FROM post WHERE id = ?', (post_id,)).fetchone()[0]
+                conn.execute('UPDATE post SET views = ? WHERE id = ?', (views + 1, post_id))
+                conn.execute('COMMIT')
+                writes.append(time.perf_counter() - started)
+            else:
+                conn.execute(
+                    'SELECT id, title FROM post WHERE published = 1 ORDER BY published_date DESC LIMIT 20'
+                ).fetchall()
+                conn.execute('SELECT content FROM post WHERE id = ?', (rng.randint(1, ROWS),)).fetchone()
+                reads.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:  # database is locked
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+    return reads, writes, errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare SQLite read/write throughput of concurrent workers with default settings and with '
+        'DATABASES OPTIONS, for DEFERRED and IMMEDIATE write transactions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent worker processes')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--write-ratio', type=float, default=0.1, help='Share of requests that write')
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES['default'].get('OPTIONS', {})
+        configurations = [
+            ('defaults (rollback journal)', {
+                'init_command': 'PRAGMA journal_mode=DELETE', 'timeout': 5, 'transaction_mode': None,
+            }),
+            # Ordinary saves (scripts, signals, workers) begin DEFERRED
+            ('DATABASES OPTIONS, DEFERRED', {
+                'init_command': configured.get('init_command', ''),
+                'timeout': configured.get('timeout', 5),
+                'transaction_mode': configured.get('transaction_mode'),
+            }),
+            # Admin saves and the counter paths begin IMMEDIATE (casipe/db.py)
+            ('DATABASES OPTIONS, IMMEDIATE', {
+                'init_command': configured.get('init_command', ''),
+                'timeout': configured.get('timeout', 5),
+                'transaction_mode': 'IMMEDIATE',
+            }),
+        ]
+
+        directory = tempfile.mkdtemp()
+        try:
+            self.stdout.write(
+                f'{"configuration":<30} {"reads/s":>9} {"writes/s":>9} {"read p99":>10} {"write p99":>10} {"locked":>7}'
+            )
+            for number, (label, database_options) in enumerate(configurations):
+                path = os.path.join(directory, f'benchmark{number}.sqlite3')
+                self.create_database(path, database_options)
+                self.report(label, self.run(path, database_options, options), options['seconds'])
+        finally:
+            shutil.rmtree(directory)
+
+    def create_database(self, path, database_options):
+        conn = connect(path, database_options)
+        conn.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, content TEXT, '
+            'published INTEGER, published_date TEXT, views INTEGER)'
+        )
+        conn.execute('CREATE INDEX post_published ON post (published, published_date)')
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO post (title, content, published, published_date, views) VALUES (?, ?, ?, ?, 0)',
+            [(f'Post {i}', 'Lorem ipsum dolor sit amet. ' * 100, i % 5 != 0, f'2025-01-01T00:{i:06d}') for i in range(ROWS)]
+        )
+        conn.execute('COMMIT')
+        conn.close()
+
+    def run(self, path, database_options, options):
+        # spawn: each worker gets its own SQLite connection, like separate gunicorn processes
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(options['workers']) as pool:
+            return pool.starmap(run_worker, [
+                (path, database_options, options['seconds'], options['write_ratio'], seed)
+                for seed in range(options['workers'])
+            ])
+
+    def report(self, label, results, seconds):
+        reads = [timing for worker_reads, worker_writes, errors in results for timing in worker_reads]
+        writes = [timing for worker_reads, worker_writes, errors in results for timing in worker_writes]
+        errors = sum(result[2] for result in results)
+        self.stdout.write(
+            f'{label:<30} {len(reads) / seconds:>9.0f} {len(writes) / seconds:>9.0f} '
+            f'{percentile(reads, 0.99) * 1000:>8.2f}ms {percentile(writes, 0.99) * 1000:>8.2f}ms {errors:>7}'
+        )
+        if reads:
+            self.stdout.write(f'{"":<30} median read {statistics.median(reads) * 1000:.3f} ms')
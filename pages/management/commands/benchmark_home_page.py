@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from pages.views import HomePageView
+
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def templates_with_loaders(loaders):
+    templates = [dict(engine, OPTIONS=dict(engine['OPTIONS'])) for engine in settings.TEMPLATES]
+    templates[0]['OPTIONS']['loaders'] = loaders
+    return templates
+
+
+def caches_with_fragments(backend):
+    return dict(settings.CACHES, template_fragments={'BACKEND': backend})
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request render time of HomePageView with and without the template and fragment caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per configuration')
+
+    def handle(self, *args, **options):
+        configurations = [
+            ('no template or fragment cache', override_settings(
+                TEMPLATES=templates_with_loaders(PLAIN_LOADERS),
+                CACHES=caches_with_fragments('django.core.cache.backends.dummy.DummyCache'),
+            )),
+            ('cached loader only', override_settings(
+                CACHES=caches_with_fragments('django.core.cache.backends.dummy.DummyCache'),
+            )),
+            # The fragments go to the configured default cache (file based in production)
+            ('cached loader + fragments', override_settings()),
+        ]
+
+        baseline = None
+        for label, configuration in configurations:
+            with configuration:
+                median = self.measure(options['requests'])
+            baseline = baseline or median
+            self.stdout.write(
+                f'{label:<32} {median * 1000:8.3f} ms/request  (saves {(baseline - median) * 1000:.3f} ms)'
+            )
+
+    def measure(self, requests):
+        view = HomePageView.as_view()
+        factory = RequestFactory()
+        timings = []
+        for number in range(requests + 1):
+            request = factory.get('/')
+            request.user = AnonymousUser()
+            started = time.perf_counter()
+            view(request).render()
+            if number:  # the first request fills the caches
+                timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
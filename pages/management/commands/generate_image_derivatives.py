@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from casipe import images
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive WebP/JPEG copies of uploaded images (Reader.cover_image)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help=(
+                'Regenerate every image, not only the ones without derivatives, including '
+                'the ones that failed before (existing files are kept)'
+            )
+        )
+
+    def handle(self, *args, **options):
+        for model, field_name, derivatives_field in images.registry:
+            queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if not options['all']:
+                queryset = queryset.filter(**{derivatives_field: {}})
+
+            generated = 0
+            for instance in queryset.only('pk', field_name).iterator():
+                try:
+                    images.generate_derivatives(instance, field_name, derivatives_field)
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'{model.__name__} {instance.pk}: {error}')
+                    images.store_failure(
+                        model, instance.pk, field_name, derivatives_field, getattr(instance, field_name).name, error
+                    )
+                    continue
+                generated += 1
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.verbose_name_plural}: {generated} images processed'))
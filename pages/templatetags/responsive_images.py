@@ -0,0 +1,35 @@
+from django import template
+
+from casipe.images import FORMATS, derivative_urls
+
+register = template.Library()
+
+
+@register.inclusion_tag('partials/_responsive_image.html')
+def responsive_image(image, derivatives, alt='', sizes='100vw', css_class='', style=''):
+    """
+    <picture> with WebP and JPEG srcsets for an uploaded image.
+    Usage: {% responsive_image reader.cover_image reader.cover_image_derivatives alt=reader.title sizes="220px" %}
+
+    Falls back to the original upload while derivatives are being generated.
+    """
+    sources = []
+    for extension, image_format, content_type in FORMATS:
+        urls = derivative_urls(derivatives, extension)
+        if urls:
+            sources.append({
+                'type': content_type,
+                'srcset': ', '.join(f'{url} {width}w' for url, width in urls),
+                'largest': urls[-1][0],
+            })
+    # The last format (JPEG) goes on the <img> itself for browsers without WebP
+    fallback = sources.pop() if sources else None
+    return {
+        'sources': sources,
+        'src': fallback['largest'] if fallback else image.url,
+        'srcset': fallback['srcset'] if fallback else '',
+        'alt': alt,
+        'sizes': sizes,
+        'css_class': css_class,
+        'style': style,
+    }
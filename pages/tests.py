@@ -1,3 +1,71 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog.models import Post
+from temario import fuzzy
+from temario.models import ThematicCategory, Word
+
+from .context_processors import nav_section
+
+
+class LayoutFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_navbar_and_footer_are_cached_per_login_state_and_section(self):
+        self.assertContains(self.client.get("/"), "Casipe.net</span>. All rights reserved.")
+
+        self.assertIsNotNone(cache.get(make_template_fragment_key("navbar", [False, "en-us", "home"])))
+        self.assertIsNotNone(cache.get(make_template_fragment_key("footer", [False, "en-us"])))
+
+        user = get_user_model().objects.create_user(username="renato", password="testpass123")
+        self.client.force_login(user)
+        self.client.get("/about/")
+        self.assertIsNotNone(cache.get(make_template_fragment_key("navbar", [True, "en-us", "about"])))
+
+    def test_cached_navbar_keeps_the_active_link(self):
+        self.client.get("/")
+        response = self.client.get("/about/")
+        self.assertContains(response, 'class="nav-link active" href="/about/"', html=False)
+        self.assertNotContains(response, 'class="nav-link active" href="/"', html=False)
+
+    def test_nav_section(self):
+        self.assertEqual(nav_section("/"), "home")
+        self.assertEqual(nav_section("/blog/post/hola/"), "blog")
+        self.assertEqual(nav_section("/about/"), "about")
+        self.assertEqual(nav_section("/apps/temario/"), "")
+
+
+class QueryPlanAuditTests(TestCase):
+    def test_public_views_do_not_scan_posts_or_words(self):
+        author = get_user_model().objects.create_user(username="renato", password="testpass123")
+        Post.objects.create(
+            title="Hola", slug="hola", content="<p>Hola</p>", author=author,
+            is_published=True, published_date=timezone.now()
+        )
+        category = ThematicCategory.objects.create(name="Casa")
+        Word.objects.create(text="mesa", definition="table").thematic_categories.add(category)
+
+        # The "did you mean" index is read once per worker, not per request
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(TEMARIO_FUZZY_INDEX_PATH=os.path.join(directory, "fuzzy.npz")):
+            fuzzy.warm()
+            output = StringIO()
+            call_command("audit_query_plans", stdout=output)
+        report = output.getvalue()
+
+        self.assertIn("/apps/temario/ [200]", report)
+        scans = report.split("Table scans:")[1].split("Temporary sorts:")[0]
+        self.assertNotIn("blog_post", scans)
+        self.assertNotIn("temario_word", scans)
+        self.assertNotIn("subquery", scans)
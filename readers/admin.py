@@ -1,4 +1,7 @@
 from django.contrib import admin
+
+from casipe.db import ImmediateWriteAdminMixin
+
 from .models import DifficultyLevel, Reader
 
 @admin.register(DifficultyLevel)
@@ -7,7 +10,7 @@ class DifficultyLevelAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(Reader)
-class ReaderAdmin(admin.ModelAdmin):
+class ReaderAdmin(ImmediateWriteAdminMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'difficulty_level', 'word_count', 'publication_date')
     list_filter = ('difficulty_level', 'publication_date')
     search_fields = ('title', 'author', 'description', 'content', 'vocabulary_focus', 'grammar_focus')
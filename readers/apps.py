@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReadersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'readers'
+
+    def ready(self):
+        # Register signal handlers (image derivatives)
+        from . import signals  # noqa: F401
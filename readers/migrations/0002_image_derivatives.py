@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reader',
+            name='cover_image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readers', '0002_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reader',
+            index=models.Index(fields=['difficulty_level', 'title'], name='readers_reader_level_title_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 # readers/models.py
 from django.db import models
 
+from casipe.maintained import MaintainedFieldsMixin
+
 class DifficultyLevel(models.Model):
     name = models.CharField(max_length=50)  # e.g., "Beginner", "Intermediate", "Advanced"
     level_number = models.PositiveSmallIntegerField(unique=True)  # e.g., 1, 2, 3
@@ -12,7 +14,12 @@ class DifficultyLevel(models.Model):
     class Meta:
         ordering = ['level_number']
 
-class Reader(models.Model):
+class Reader(MaintainedFieldsMixin, models.Model):
+    # Written by the image derivatives worker (casipe/images.py), never by save()
+    maintained_fields = {
+        'cover_image_derivatives': 'cover_image',
+    }
+
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=200)
     difficulty_level = models.ForeignKey(DifficultyLevel, on_delete=models.CASCADE, related_name='readers')
@@ -20,6 +27,8 @@ class Reader(models.Model):
     content = models.TextField(help_text="The full text content of the reader")  # Added this field for the actual content
     publication_date = models.DateField()
     cover_image = models.ImageField(upload_to='reader_covers/', blank=True, null=True)
+    # Resized WebP/JPEG copies of cover_image, see casipe/images.py
+    cover_image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     word_count = models.PositiveIntegerField(help_text="Total words in the reader")
     vocabulary_focus = models.CharField(max_length=255, blank=True, help_text="Key vocabulary themes")
     grammar_focus = models.CharField(max_length=255, blank=True, help_text="Key grammar concepts")
@@ -29,3 +38,7 @@ class Reader(models.Model):
     
     class Meta:
         ordering = ['difficulty_level__level_number', 'title']
+        indexes = [
+            # Readers of one level in title order (level filter, related readers)
+            models.Index(fields=['difficulty_level', 'title'], name='readers_reader_level_title_idx'),
+        ]
@@ -0,0 +1,15 @@
+from blog import media_index
+from casipe import images
+
+from .models import Reader
+
+# ========================================
+# IMAGE DERIVATIVES
+# ========================================
+images.connect(Reader, 'cover_image', 'cover_image_derivatives')
+
+
+# ========================================
+# MEDIA REFERENCES
+# ========================================
+media_index.connect(Reader, 'cover_image', 'description', 'content')
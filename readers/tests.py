@@ -1,3 +1,106 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from casipe import images
+
+from .models import DifficultyLevel, Reader
+
+
+def make_png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (200, 16, 46, 128)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class CoverImageDerivativeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.level = DifficultyLevel.objects.create(name="Beginner", level_number=1)
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVE_WIDTHS=(320, 640, 1280))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_reader(self, image):
+        with mock.patch.object(images, "generate_in_background") as generate:
+            reader = Reader.objects.create(
+                title="El viaje", author="Ana", difficulty_level=self.level,
+                description="Un cuento", content="Había una vez", publication_date=date(2025, 1, 1),
+                word_count=3, cover_image=SimpleUploadedFile("cover.png", image),
+            )
+        generate.assert_called_once_with(reader, "cover_image", "cover_image_derivatives")
+        return reader
+
+    def test_derivatives_are_keyed_by_content_and_idempotent(self):
+        reader = self.create_reader(make_png(1000, 500))
+
+        digest, widths = images.generate_derivatives(reader, "cover_image", "cover_image_derivatives")
+
+        # No upscaling: the 1000px original is the largest copy
+        self.assertEqual(widths, [320, 640, 1000])
+        for width in widths:
+            for extension in ("webp", "jpg"):
+                path = os.path.join(self.media_root, "derivatives", digest, f"{width}.{extension}")
+                with Image.open(path) as derivative:
+                    self.assertEqual(derivative.size, (width, width // 2))
+        reader.refresh_from_db()
+        self.assertEqual(reader.cover_image_derivatives, {"hash": digest, "widths": widths})
+
+        # Same bytes, same files: nothing is rewritten
+        jpeg = os.path.join(self.media_root, "derivatives", digest, "320.jpg")
+        mtime = os.stat(jpeg).st_mtime_ns
+        self.assertEqual(images.generate_derivatives(reader, "cover_image", "cover_image_derivatives")[0], digest)
+        self.assertEqual(os.stat(jpeg).st_mtime_ns, mtime)
+
+    def test_list_uses_srcset_once_derivatives_exist(self):
+        reader = self.create_reader(make_png(800, 600))
+        response = self.client.get(reverse("readers:reader_list"))
+        self.assertContains(response, f'src="{reader.cover_image.url}"')
+        self.assertNotContains(response, "srcset")
+
+        digest, widths = images.generate_derivatives(reader, "cover_image", "cover_image_derivatives")
+        response = self.client.get(reverse("readers:reader_list"))
+        self.assertContains(response, f'type="image/webp" srcset="/media/derivatives/{digest}/320.webp 320w')
+        self.assertContains(response, f'/media/derivatives/{digest}/800.jpg 800w"')
+
+    def test_new_upload_clears_derivatives(self):
+        reader = self.create_reader(make_png(400, 400))
+        images.generate_derivatives(reader, "cover_image", "cover_image_derivatives")
+        reader.refresh_from_db()
+
+        reader.cover_image = SimpleUploadedFile("other.png", make_png(300, 300))
+        with mock.patch.object(images, "generate_in_background") as generate:
+            reader.save()
+        generate.assert_called_once()
+        self.assertEqual(reader.cover_image_derivatives, {})
+
+    def test_failed_images_are_not_queued_again(self):
+        reader = self.create_reader(b"not an image")
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(images, "get_executors", return_value=(executor, None)):
+            images._run_in_worker(
+                Reader, reader.pk, "cover_image", "cover_image_derivatives",
+                reader.cover_image.path, reader.cover_image.name,
+            )
+        reader.refresh_from_db()
+        self.assertIn("error", reader.cover_image_derivatives)
+        self.assertEqual(images.derivative_urls(reader.cover_image_derivatives, "webp"), [])
+
+        with mock.patch.object(images, "generate_in_background") as generate:
+            reader.title = "Otro título"
+            reader.save()
+        generate.assert_not_called()
@@ -5,6 +5,9 @@ from .models import ThematicCategory, Word, ExampleSentence
 from django.contrib.admin import SimpleListFilter
 from django.core.exceptions import ValidationError
 
+from casipe.db import ImmediateWriteAdminMixin
+
+
 class CategoryFilter(SimpleListFilter):
     title = 'Thematic Category'
     parameter_name = 'category'
@@ -32,24 +35,14 @@ class ExampleSentenceInline(admin.StackedInline):
     )
 
 @admin.register(ThematicCategory)
-class ThematicCategoryAdmin(admin.ModelAdmin):
+class ThematicCategoryAdmin(ImmediateWriteAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'description', 'word_count')
     search_fields = ('name', 'description')
     list_filter = ('name',)
     readonly_fields = ('word_count',)
-    
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(word_count=Count('words'))
-        return queryset
-    
-    def word_count(self, obj):
-        return obj.word_count
-    word_count.short_description = 'Number of Words'
-    word_count.admin_order_field = 'word_count'
 
 @admin.register(Word)
-class WordAdmin(admin.ModelAdmin):
+class WordAdmin(ImmediateWriteAdminMixin, admin.ModelAdmin):
     list_display = ('display_text', 'contextual_definition', 'category_list', 'gender_display', 'created_at', 'example_count')
     list_filter = (CategoryFilter, 'gender', 'has_gender', 'created_at')
     search_fields = ('text', 'definition')
@@ -142,7 +135,7 @@ class WordAdmin(admin.ModelAdmin):
     duplicate_word_entry.short_description = "Duplicate selected words for new context/meaning"
 
 @admin.register(ExampleSentence)
-class ExampleSentenceAdmin(admin.ModelAdmin):
+class ExampleSentenceAdmin(ImmediateWriteAdminMixin, admin.ModelAdmin):
     list_display = ('word_with_meaning', 'text_preview', 'has_translation', 'created_at')
     list_filter = ('word__thematic_categories', 'created_at')
     search_fields = ('text', 'translation', 'word__text', 'word__definition')
@@ -5,4 +5,6 @@ class TemarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'temario'
 
-
+    def ready(self):
+        # Register signal handlers (search index)
+        from . import signals  # noqa: F401
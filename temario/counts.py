@@ -0,0 +1,69 @@
+"""
+Stored word counts of thematic categories.
+
+ThematicCategory.word_count is how many words are linked to the category, so
+the admin changelist (and any public category listing) reads a column instead
+of aggregating the whole Word.thematic_categories M2M table. The counts are
+adjusted incrementally by temario/signals.py:
+
+    - add() / remove() / set() / clear(), from either side -> m2m_changed
+    - Word delete (its links are removed without m2m_changed) -> pre/post_delete
+
+Links written behind the ORM's back (raw SQL, bulk_create on the through
+model) are not seen; `python manage.py repair_word_counts` recomputes every
+count in one grouped query.
+"""
+from collections import Counter
+
+from django.db.models import Count, F
+
+from casipe.db import immediate_atomic
+
+from .models import ThematicCategory, Word
+
+Link = Word.thematic_categories.through
+
+
+def links(word_ids=None, category_ids=None):
+    """Counter {category id: number of links} for the links matching the filters."""
+    queryset = Link.objects.all()
+    if word_ids is not None:
+        queryset = queryset.filter(word_id__in=word_ids)
+    if category_ids is not None:
+        queryset = queryset.filter(thematiccategory_id__in=category_ids)
+    return Counter(queryset.values_list('thematiccategory_id', flat=True))
+
+
+def apply_changes(changes):
+    """Add {category id: delta} to the stored counts, one UPDATE per distinct delta."""
+    by_delta = {}
+    for category_id, delta in changes.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(category_id)
+    for delta, category_ids in by_delta.items():
+        categories = ThematicCategory.objects.filter(pk__in=category_ids)
+        if delta < 0:
+            categories = categories.filter(word_count__gte=-delta)
+        categories.update(word_count=F('word_count') + delta)
+
+
+def subtract(counter):
+    return Counter({category_id: -count for category_id, count in counter.items()})
+
+
+def rebuild():
+    """
+    Recompute every count from one grouped query over the links.
+    Returns the number of categories whose stored count was wrong.
+    """
+    with immediate_atomic():
+        counts = dict(
+            Link.objects.values('thematiccategory_id').annotate(count=Count('pk')).order_by()
+            .values_list('thematiccategory_id', 'count')
+        )
+        categories = list(ThematicCategory.objects.select_for_update().only('word_count'))
+        wrong = [category for category in categories if category.word_count != counts.get(category.pk, 0)]
+        for category in wrong:
+            category.word_count = counts.get(category.pk, 0)
+        ThematicCategory.objects.bulk_update(wrong, ['word_count'])
+    return len(wrong)
@@ -0,0 +1,69 @@
+"""
+Cached fragments of the temario detail pages.
+
+templates/temario/word_detail.html and category_detail.html wrap everything
+they read from the database in {% cache %} blocks:
+
+    temario_word <text>        every meaning (Word row) with that text, its
+                               categories and examples
+    temario_category <pk>      the words of a category with their first examples
+
+so a repeat visit only looks up the word or category by primary key. The
+blocks are deleted, never rebuilt, by temario/signals.py once a change commits:
+
+    - Word save / delete           -> its text (old and new) and its categories
+    - ExampleSentence save / delete -> the word's text and categories
+    - category links (m2m_changed)  -> both sides of every link added or removed
+    - ThematicCategory save / delete -> the category and the texts of its words
+
+Cached blocks also expire after TEMARIO_FRAGMENT_CACHE_TIMEOUT seconds.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+
+from .models import Word
+
+DEFAULT_TIMEOUT = 60 * 60 * 24  # 1 day; invalidation is explicit
+
+WORD_FRAGMENT = 'temario_word'
+CATEGORY_FRAGMENT = 'temario_category'
+
+
+def get_timeout():
+    return getattr(settings, 'TEMARIO_FRAGMENT_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def word_key(text):
+    return make_template_fragment_key(WORD_FRAGMENT, [text])
+
+
+def category_key(category_id):
+    return make_template_fragment_key(CATEGORY_FRAGMENT, [category_id])
+
+
+def invalidate(texts=(), category_ids=()):
+    keys = [word_key(text) for text in set(texts)]
+    keys += [category_key(category_id) for category_id in set(category_ids)]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_on_commit(texts=(), category_ids=()):
+    """Delete once the current transaction commits, so no fragment is re-cached from old data."""
+    texts, category_ids = set(texts), set(category_ids)
+    transaction.on_commit(lambda: invalidate(texts, category_ids))
+
+
+def word_texts(word_ids):
+    return set(Word.objects.filter(pk__in=word_ids).values_list('text', flat=True))
+
+
+def linked_category_ids(word_ids):
+    links = Word.thematic_categories.through.objects.filter(word_id__in=word_ids)
+    return set(links.values_list('thematiccategory_id', flat=True))
+
+
+def category_word_texts(category_id):
+    return set(Word.objects.filter(thematic_categories=category_id).values_list('text', flat=True))
@@ -0,0 +1,433 @@
+"""
+"Did you mean" suggestions for misspelled temario searches.
+
+A SymSpell index over every Word.text: each word is folded like the search
+index (temario/search.py: NFKD, no accents, lowercase) and every string you
+get by deleting up to MAX_DISTANCE characters from its first PREFIX_LENGTH
+characters is stored. A query is folded the same way; words that share one of
+its deletes are the only candidates, and the real edit distance (optimal
+string alignment, so swapped letters count as one edit) is computed for
+those few. That makes a lookup independent of the vocabulary size.
+
+Candidates whose length or letter counts are too far from the query are
+dropped with vectorized checks first. Queries of up to SHORT_QUERY_LENGTH
+letters allow one typo.
+
+The deletes are stored as sorted 32-bit hashes next to the word they came
+from (about 35 per word, ~35 MB for 100k words), so the whole index is a few
+NumPy arrays:
+
+    - saved as one uncompressed .npz snapshot (TEMARIO_FUZZY_INDEX_PATH) that
+      every gunicorn worker loads at start (casipe/wsgi.py) instead of rebuilding
+    - built in full by `python manage.py rebuild_fuzzy_index`, never by a request
+    - updated in place by a background thread when a word is saved or deleted
+      (temario/signals.py), rewriting the snapshot; other workers notice the
+      new file and reload it. Until there is a snapshot, saves leave it alone.
+    - stamped with the Word table version (count, id sum, last update) of its
+      last full build; a worker that starts on a snapshot which doesn't match
+      the database (raw imports, another database) logs a warning and keeps
+      using it until the command is run
+
+Until there is a snapshot no suggestions are made, and neither are they
+without NumPy installed.
+"""
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import Count, Max, Sum
+from django.dispatch import receiver
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from casipe.snapshots import snapshot_lock
+
+from .models import Word
+from .search import fold
+
+logger = logging.getLogger(__name__)
+
+MAX_DISTANCE = 2
+
+# Deletes are generated from the first PREFIX_LENGTH characters only (the
+# usual SymSpell trade-off: long words cost no more than 9-letter ones)
+PREFIX_LENGTH = 9
+
+# Two typos in a word this short would match half the vocabulary
+SHORT_QUERY_LENGTH = 4
+
+# Queries shorter than this match too much to be useful
+MIN_QUERY_LENGTH = 3
+
+SUGGESTIONS = 5
+
+# Seconds between checks for a newer snapshot
+RELOAD_INTERVAL = 5
+
+
+def is_available():
+    return np is not None
+
+
+def get_snapshot_path():
+    return getattr(
+        settings, 'TEMARIO_FUZZY_INDEX_PATH', os.path.join(settings.BASE_DIR, 'cache', 'temario-fuzzy.npz')
+    )
+
+
+def deletes(term, max_distance=MAX_DISTANCE):
+    """Every non-empty string left after deleting up to max_distance characters from the prefix."""
+    prefix = term[:PREFIX_LENGTH]
+    found = {prefix}
+    frontier = {prefix}
+    for _ in range(max_distance):
+        frontier = {
+            candidate[:i] + candidate[i + 1:]
+            for candidate in frontier if len(candidate) > 1
+            for i in range(len(candidate))
+        }
+        found |= frontier
+    return found
+
+
+def hash_deletes(term, max_distance=MAX_DISTANCE):
+    return [zlib.crc32(delete.encode('utf-8')) for delete in deletes(term, max_distance)]
+
+
+def distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once it is clearly larger."""
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    # Only cells within max_distance of the diagonal can stay under the limit
+    previous_previous = None
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+        if min(current) > max_distance:
+            return too_far
+        previous_previous, previous = previous, current
+    return min(previous[-1], too_far)
+
+
+def letter_counts(term):
+    """Occurrences of a..z (after folding) plus one bucket for everything else."""
+    counts = [0] * 27
+    for char in term:
+        code = ord(char) - 97
+        counts[code if 0 <= code < 26 else 26] += 1
+    return [min(count, 255) for count in counts]
+
+
+def pack(strings):
+    """(UTF-8 blob, offsets) for a list of strings."""
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8).copy(), offsets
+
+
+class FuzzyIndex:
+    """Words (ids, texts, folded terms) plus their delete hashes sorted for binary search."""
+
+    def __init__(self, word_ids, texts, text_offsets, terms, term_offsets, lengths, letters, keys, entries, version):
+        self.word_ids = word_ids
+        self.texts = texts
+        self.text_offsets = text_offsets
+        self.terms = terms
+        self.term_offsets = term_offsets
+        self.lengths = lengths  # folded term lengths, in characters
+        self.letters = letters  # letter_counts() of every term, one row per word
+        self.keys = keys        # delete hashes, sorted
+        self.entries = entries  # word position of each key
+        self.version = version
+
+    @classmethod
+    def build(cls, words, version=''):
+        """words: iterable of (word id, text)."""
+        word_ids, texts, terms, keys, entries = [], [], [], [], []
+        for position, (word_id, text) in enumerate(words):
+            term = fold(text).strip()
+            word_ids.append(word_id)
+            texts.append(text)
+            terms.append(term)
+            hashes = hash_deletes(term) if term else []
+            keys.extend(hashes)
+            entries.extend([position] * len(hashes))
+        keys = np.array(keys, dtype=np.uint32)
+        order = np.argsort(keys, kind='stable')
+        return cls(
+            np.array(word_ids, dtype=np.int64),
+            *pack(texts),
+            *pack(terms),
+            np.array([len(term) for term in terms], dtype=np.int16),
+            np.array([letter_counts(term) for term in terms], dtype=np.uint8).reshape(-1, 27),
+            keys[order],
+            np.array(entries, dtype=np.int32)[order],
+            version,
+        )
+
+    def __len__(self):
+        return len(self.word_ids)
+
+    def text(self, position):
+        return bytes(self.texts[self.text_offsets[position]:self.text_offsets[position + 1]]).decode('utf-8')
+
+    def term(self, position):
+        return bytes(self.terms[self.term_offsets[position]:self.term_offsets[position + 1]]).decode('utf-8')
+
+    def lookup(self, query, max_distance=MAX_DISTANCE, limit=SUGGESTIONS):
+        """[(text, word id, distance), ...] closest first."""
+        term = fold(query).strip()
+        if len(term) < MIN_QUERY_LENGTH or not len(self):
+            return []
+        if len(term) <= SHORT_QUERY_LENGTH:
+            max_distance = min(max_distance, 1)
+        hashes = np.array(hash_deletes(term, max_distance), dtype=np.uint32)
+        starts = np.searchsorted(self.keys, hashes, 'left')
+        ends = np.searchsorted(self.keys, hashes, 'right')
+        candidates = np.unique(np.concatenate([self.entries[start:end] for start, end in zip(starts, ends)]))
+        candidates = candidates[np.abs(self.lengths[candidates] - len(term)) <= max_distance]
+        # Each edit changes the letter counts by at most 2 (a swap by 0), which
+        # gives a lower bound on the distance of every candidate
+        letter_difference = np.abs(
+            self.letters[candidates].astype(np.int16) - np.array(letter_counts(term), dtype=np.int16)
+        ).sum(axis=1)
+        bounds = (letter_difference + 1) // 2
+        keep = bounds <= max_distance
+        candidates, bounds = candidates[keep], bounds[keep]
+        order = np.argsort(bounds, kind='stable')
+
+        # Exact distances, most promising first, until nothing left can beat the results
+        found = []
+        for position, bound in zip(candidates[order].tolist(), bounds[order].tolist()):
+            if len(found) >= limit and found[limit - 1][0] <= bound:
+                break
+            edits = distance(term, self.term(position), max_distance)
+            if edits <= max_distance:
+                text = self.text(position)
+                found.append((edits, abs(len(text) - len(query)), text, int(self.word_ids[position])))
+                found.sort()
+        return [(text, word_id, edits) for edits, length_difference, text, word_id in found[:limit]]
+
+    def without(self, word_id):
+        """Copy of the index without one word."""
+        matches = np.nonzero(self.word_ids == word_id)[0]
+        if not len(matches):
+            return self
+        position = int(matches[0])
+        keep = self.entries != position
+        entries = self.entries[keep]
+        entries[entries > position] -= 1
+        text_start, text_end = self.text_offsets[position], self.text_offsets[position + 1]
+        term_start, term_end = self.term_offsets[position], self.term_offsets[position + 1]
+        return FuzzyIndex(
+            np.delete(self.word_ids, position),
+            np.concatenate([self.texts[:text_start], self.texts[text_end:]]),
+            np.concatenate([self.text_offsets[:position], self.text_offsets[position + 1:] - (text_end - text_start)]),
+            np.concatenate([self.terms[:term_start], self.terms[term_end:]]),
+            np.concatenate([self.term_offsets[:position], self.term_offsets[position + 1:] - (term_end - term_start)]),
+            np.delete(self.lengths, position),
+            np.delete(self.letters, position, axis=0),
+            self.keys[keep],
+            entries,
+            self.version,
+        )
+
+    def with_word(self, word_id, text):
+        """Copy of the index with one word added (or replaced)."""
+        index = self.without(word_id)
+        term = fold(text).strip()
+        position = len(index)
+        hashes = np.array(sorted(hash_deletes(term)) if term else [], dtype=np.uint32)
+        insert_at = np.searchsorted(index.keys, hashes, 'right')
+        text_data, text_offsets = pack([text])
+        term_data, term_offsets = pack([term])
+        return FuzzyIndex(
+            np.append(index.word_ids, word_id),
+            np.concatenate([index.texts, text_data]),
+            np.append(index.text_offsets, index.text_offsets[-1] + text_offsets[1]),
+            np.concatenate([index.terms, term_data]),
+            np.append(index.term_offsets, index.term_offsets[-1] + term_offsets[1]),
+            np.append(index.lengths, np.int16(len(term))),
+            np.vstack([index.letters, np.array([letter_counts(term)], dtype=np.uint8)]),
+            np.insert(index.keys, insert_at, hashes),
+            np.insert(index.entries, insert_at, np.int32(position)),
+            index.version,
+        )
+
+    # ----- snapshot -----
+    FIELDS = ('word_ids', 'texts', 'text_offsets', 'terms', 'term_offsets', 'lengths', 'letters', 'keys', 'entries')
+
+    def save(self, path):
+        """Write the snapshot under a temporary name and rename it, so readers never see half a file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            np.savez(f, version=np.array(self.version), **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(*(data[field] for field in cls.FIELDS), version=str(data['version']))
+
+
+# ========================================
+# PROCESS-WIDE INDEX
+# ========================================
+_lock = threading.Lock()
+_index = None
+_snapshot_mtime = None
+_checked_at = 0.0
+
+
+def database_version():
+    """Changes whenever a word is added, removed or edited."""
+    stats = Word.objects.aggregate(count=Count('id'), ids=Sum('id'), updated_at=Max('updated_at'))
+    updated_at = stats['updated_at'].isoformat() if stats['updated_at'] else ''
+    return f"{stats['count']}:{stats['ids'] or 0}:{updated_at}"
+
+
+def _snapshot_mtime_of(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def rebuild():
+    """Build the index from the database and save the snapshot. Returns the index."""
+    global _index, _snapshot_mtime
+    path = get_snapshot_path()
+    with snapshot_lock(path):
+        version = database_version()
+        index = FuzzyIndex.build(Word.objects.order_by('pk').values_list('pk', 'text').iterator(), version)
+        index.save(path)
+        with _lock:
+            _index, _snapshot_mtime = index, _snapshot_mtime_of(path)
+    return index
+
+
+def get_index():
+    """The current index, reloaded when the snapshot changes; None until there is one."""
+    global _index, _snapshot_mtime, _checked_at
+    if not is_available():
+        return None
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < RELOAD_INTERVAL:
+        return _index
+    _checked_at = now
+
+    path = get_snapshot_path()
+    mtime = _snapshot_mtime_of(path)
+    index = _index
+    if mtime is not None and mtime != _snapshot_mtime:
+        try:
+            index = FuzzyIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            logger.warning('Unreadable fuzzy index snapshot %s; run `python manage.py rebuild_fuzzy_index`', path)
+            index = None
+        with _lock:
+            _index, _snapshot_mtime = index, mtime
+    return index
+
+
+@receiver(setting_changed)
+def forget_index(setting, **kwargs):
+    """A different snapshot path (tests) means a different index."""
+    global _index, _snapshot_mtime, _checked_at
+    if setting == 'TEMARIO_FUZZY_INDEX_PATH':
+        with _lock:
+            _index, _snapshot_mtime, _checked_at = None, None, 0.0
+
+
+def warm():
+    """Load the index before the first request and say if it is stale; called at worker start."""
+    try:
+        index = get_index()
+        if index is None:
+            logger.warning('No fuzzy word index yet; run `python manage.py rebuild_fuzzy_index`')
+        elif index.version != database_version():
+            logger.warning('The fuzzy word index is out of date; run `python manage.py rebuild_fuzzy_index`')
+    except Exception:
+        logger.exception('Could not load the fuzzy word index')
+
+
+def suggest(query, limit=SUGGESTIONS):
+    """[(text, word id, distance), ...] for a misspelled query, closest first."""
+    index = get_index()
+    if index is None:
+        return []
+    return index.lookup(query, limit=limit)
+
+
+def update_word(word_id):
+    """
+    Apply one saved or deleted word to the index and its snapshot. The snapshot
+    keeps the version of its last full build: one word being current says
+    nothing about the rest of the table.
+    """
+    global _index, _snapshot_mtime
+    if not is_available():
+        return
+    path = get_snapshot_path()
+    if not os.path.exists(path):
+        logger.warning('No fuzzy word index yet; run `python manage.py rebuild_fuzzy_index`')
+        return
+    with snapshot_lock(path):
+        index = FuzzyIndex.load(path)
+        text = Word.objects.filter(pk=word_id).values_list('text', flat=True).first()
+        index = index.without(word_id) if text is None else index.with_word(word_id, text)
+        index.save(path)
+        with _lock:
+            _index, _snapshot_mtime = index, _snapshot_mtime_of(path)
+
+
+# ========================================
+# BACKGROUND UPDATES
+# ========================================
+_executor = None
+
+
+def get_executor():
+    """One thread, so the saves of one worker patch the snapshot in order."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fuzzy-index')
+    return _executor
+
+
+def _run_in_worker(word_id):
+    try:
+        update_word(word_id)
+    except Exception:
+        logger.exception('Fuzzy index update failed for word %s', word_id)
+    finally:
+        connection.close()  # the worker thread has its own connection
+
+
+def update_in_background(word_id):
+    get_executor().submit(_run_in_worker, word_id)
+
+
+def update_on_commit(word_id):
+    """Patch the snapshot off the request once the change commits."""
+    transaction.on_commit(lambda: update_in_background(word_id))
@@ -0,0 +1,92 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from temario import fuzzy
+
+SYLLABLES = (
+    'ma me mi mo mu pa pe pi po pu ta te ti to tu ca co cu ga go gu la le li lo lu ra re ri ro ru '
+    'sa se si so su na ne ni no nu ba be bi bo bu da de di do du ña ño ción tra tre bla cla gra pri '
+    'ar er ir or es en an al el'
+).split()
+
+LETTERS = 'abcdefghijklmnñopqrstuvwxyzáéíóú'
+
+
+def make_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))))
+    return sorted(words)
+
+
+def misspell(word, edits, rng):
+    for _ in range(edits):
+        position = rng.randrange(len(word))
+        kind = rng.choice(('delete', 'insert', 'replace', 'swap'))
+        if kind == 'delete' and len(word) > 3:
+            word = word[:position] + word[position + 1:]
+        elif kind == 'insert':
+            word = word[:position] + rng.choice(LETTERS) + word[position:]
+        elif kind == 'swap' and position < len(word) - 1:
+            word = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+        else:
+            word = word[:position] + rng.choice(LETTERS) + word[position + 1:]
+    return word
+
+
+class Command(BaseCommand):
+    help = 'Build the "did you mean" index over synthetic words and measure build, snapshot and lookup times'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=100_000, help='Vocabulary size')
+        parser.add_argument('--queries', type=int, default=2000, help='Misspelled lookups to time')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not fuzzy.is_available():
+            raise CommandError('The fuzzy index needs NumPy')
+        rng = random.Random(options['seed'])
+        words = make_words(options['words'], rng)
+
+        started = time.perf_counter()
+        index = fuzzy.FuzzyIndex.build(enumerate(words, start=1))
+        self.stdout.write(f'Build: {len(words)} words in {time.perf_counter() - started:.2f} s, '
+                          f'{len(index.keys)} deletes, {self.size(index) / 1024 / 1024:.1f} MB')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fuzzy.npz')
+            started = time.perf_counter()
+            index.save(path)
+            saved = time.perf_counter() - started
+            started = time.perf_counter()
+            index = fuzzy.FuzzyIndex.load(path)
+            self.stdout.write(f'Snapshot: {os.path.getsize(path) / 1024 / 1024:.1f} MB, '
+                              f'save {saved * 1000:.0f} ms, load {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        started = time.perf_counter()
+        index = index.with_word(len(words) + 1, 'murciélago')
+        self.stdout.write(f'Add/replace one word: {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        for edits in (1, 2):
+            timings, found = [], 0
+            for _ in range(options['queries']):
+                target = rng.choice(words)
+                query = misspell(target, edits, rng)
+                started = time.perf_counter()
+                suggestions = index.lookup(query)
+                timings.append(time.perf_counter() - started)
+                found += any(text == target for text, word_id, distance in suggestions)
+            timings.sort()
+            self.stdout.write(
+                f'{edits} edit(s): median {statistics.median(timings) * 1e6:.0f} us, '
+                f'p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} us, '
+                f'target suggested {found / len(timings):.1%}'
+            )
+
+    def size(self, index):
+        return sum(getattr(index, field).nbytes for field in fuzzy.FuzzyIndex.FIELDS)
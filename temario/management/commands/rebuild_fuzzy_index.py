@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from temario import fuzzy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the "did you mean" index over every temario word and save its snapshot (run after raw imports)'
+
+    def handle(self, *args, **options):
+        if not fuzzy.is_available():
+            raise CommandError('The fuzzy index needs NumPy')
+        index = fuzzy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {len(index.word_ids)} words in {fuzzy.get_snapshot_path()}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from temario import search
+from temario.models import Word
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the accent-insensitive search index for all temario words'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING('Word search needs SQLite FTS5; nothing to rebuild'))
+            return
+
+        count = search.rebuild_index(Word.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} words'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from temario import counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored number of words of every thematic category'
+
+    def handle(self, *args, **options):
+        repaired = counts.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Repaired word counts: {repaired} categories were wrong'))
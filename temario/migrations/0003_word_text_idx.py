@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temario', '0002_alter_word_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['text'], name='temario_word_text_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:39
+
+import unicodedata
+
+import casipe.fts
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'temario_word_fts'
+
+
+def fold(text):
+    """NFKD-decompose, drop the accents and lowercase (frozen copy of temario.search.fold)."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 table and index the existing words (SQLite only)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # Values are folded in Python, as temario/search.py does; prefix indexes for search-as-you-type
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "text, definition, examples, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # Rank by BM25 with text > definition > examples
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 3.0, 1.0)')")
+
+    Word = apps.get_model('temario', 'Word')
+    ExampleSentence = apps.get_model('temario', 'ExampleSentence')
+    examples = {}
+    for word_id, text in ExampleSentence.objects.order_by('pk').values_list('word_id', 'text').iterator():
+        examples.setdefault(word_id, []).append(text)
+    with schema_editor.connection.cursor() as cursor:
+        for pk, text, definition in Word.objects.values_list('pk', 'text', 'definition').iterator():
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, definition, examples) VALUES (%s, %s, %s, %s)",
+                [pk, fold(text), fold(definition), fold('\n'.join(examples.get(pk, ())))]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temario', '0003_word_text_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordSearchIndex',
+            fields=[
+                ('word', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='temario.word')),
+                ('text', models.TextField()),
+                ('definition', models.TextField()),
+                ('examples', models.TextField()),
+                ('document', casipe.fts.FullTextField(db_column='temario_word_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'temario_word_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_word_count(apps, schema_editor):
+    ThematicCategory = apps.get_model('temario', 'ThematicCategory')
+    Word = apps.get_model('temario', 'Word')
+    Link = Word.thematic_categories.through
+    counts = Link.objects.filter(thematiccategory=OuterRef('pk')).values('thematiccategory').annotate(c=Count('pk')).values('c')
+    ThematicCategory.objects.update(word_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temario', '0004_word_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thematiccategory',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of words'),
+        ),
+        migrations.RunPython(populate_word_count, migrations.RunPython.noop),
+    ]
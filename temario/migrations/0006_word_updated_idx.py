@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temario', '0005_thematiccategory_word_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['updated_at'], name='temario_word_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temario', '0006_word_updated_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='word',
+            name='temario_word_text_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='word',
+            name='temario_word_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['text', 'updated_at'], name='temario_word_text_updated_idx'),
+        ),
+    ]
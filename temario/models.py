@@ -1,8 +1,16 @@
 from django.db import models
 
-class ThematicCategory(models.Model):
+from casipe.fts import FullTextField
+from casipe.maintained import MaintainedFieldsMixin
+
+class ThematicCategory(MaintainedFieldsMixin, models.Model):
+    # Adjusted with F() by temario/signals.py, never written by save() (casipe/maintained.py)
+    maintained_fields = {'word_count': None}
+
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    # Number of linked words, kept up to date by temario/signals.py (see temario/counts.py)
+    word_count = models.PositiveIntegerField("number of words", default=0, editable=False)
     
     class Meta:
         verbose_name = "Thematic Category"
@@ -17,6 +25,33 @@ class ThematicCategory(models.Model):
     def __str__(self):
         return self.name
 
+class WordQuerySet(models.QuerySet):
+    # Example sentences shown on a word card (templates/temario/index.html)
+    CARD_EXAMPLES = 3
+
+    def cards(self):
+        """
+        Words with what their listing card shows, in two extra queries for the
+        whole page: the categories, and only the first CARD_EXAMPLES example
+        sentences of each word (a ROW_NUMBER() window per word) as word.card_examples.
+        """
+        return self.prefetch_related(
+            models.Prefetch('thematic_categories', queryset=ThematicCategory.objects.order_by('name')),
+            models.Prefetch(
+                'example_sentences',
+                queryset=ExampleSentence.objects.order_by('created_at', 'pk')[:self.CARD_EXAMPLES],
+                to_attr='card_examples'
+            ),
+        )
+
+    def meanings(self):
+        """Words with their categories and every example, as listed on a word page."""
+        return self.prefetch_related(
+            models.Prefetch('thematic_categories', queryset=ThematicCategory.objects.order_by('name')),
+            models.Prefetch('example_sentences', queryset=ExampleSentence.objects.order_by('created_at', 'pk')),
+        )
+
+
 class Word(models.Model):
     # Gender choices 
     GENDER_CHOICES = [ ("M", "Masculine"), ("F", "Feminine"), ("N", "None"),]
@@ -42,6 +77,16 @@ class Word(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = WordQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The word list is ordered and paginated by text; the sitemap's version
+            # and its one-URL-per-text listing read (text, id, updated_at) from it
+            # without the long definitions
+            models.Index(fields=['text', 'updated_at'], name='temario_word_text_updated_idx'),
+        ]
     
     def __str__(self):
         if self.has_gender and self.gender in ["M", "F"]:
@@ -66,3 +111,29 @@ class ExampleSentence(models.Model):
     def __str__(self):
         return f"Example for '{self.word.text}': {self.text[:50]}..."
 
+
+
+class WordSearchIndex(models.Model):
+    """
+    Read-only mapping of the FTS5 table that indexes word text (temario/search.py).
+    The table is created by migration 0004 and kept in sync by temario/signals.py.
+    Use it through the reverse relation: Word.objects.filter(search_index__document__match=...)
+    """
+    word = models.OneToOneField(
+        Word,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index'
+    )
+    text = models.TextField()
+    definition = models.TextField()
+    examples = models.TextField()
+    # Hidden FTS5 columns
+    document = FullTextField(db_column='temario_word_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'temario_word_fts'
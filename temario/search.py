@@ -0,0 +1,106 @@
+"""
+Accent- and case-insensitive search for temario words.
+
+Every Word is indexed in the SQLite FTS5 table `temario_word_fts` (rowid = word id)
+with the columns text, definition and examples (its example sentences joined).
+Values are NFKD-folded and lowercased before they are indexed and before a query
+is matched, so "arbol" finds "árbol" and "ÁRBOL". The table keeps prefix indexes
+for 2 and 3 characters, so the prefix query of search-as-you-type is an index
+lookup. Results are ranked with BM25, the word itself above its definition and
+examples.
+
+The index is updated from the signals in temario/signals.py; run
+`python manage.py rebuild_word_search_index` after bulk imports done with raw SQL.
+
+On databases other than SQLite the search falls back to icontains lookups.
+"""
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+
+from casipe.fts import build_match_query
+
+FTS_TABLE = 'temario_word_fts'
+FTS_COLUMNS = ('text', 'definition', 'examples')
+
+# bm25() column weights, same order as FTS_COLUMNS
+BM25_WEIGHTS = (10.0, 3.0, 1.0)
+
+INSERT_SQL = f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s)"
+
+
+def is_available():
+    """True when the FTS5 index can be used on the default database."""
+    return connection.vendor == 'sqlite'
+
+
+def fold(text):
+    """NFKD-decompose, drop the accents and lowercase: 'Árbol' -> 'arbol'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def document_values(word, examples):
+    """Folded values indexed for a word, in FTS_COLUMNS order."""
+    return [fold(word.text), fold(word.definition), fold('\n'.join(examples))]
+
+
+def index_word(word):
+    """Add or replace a single word in the index."""
+    if not is_available():
+        return
+    examples = word.example_sentences.values_list('text', flat=True)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [word.pk])
+        cursor.execute(INSERT_SQL, [word.pk] + document_values(word, examples))
+
+
+def remove_word(word_id):
+    """Drop a word from the index."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [word_id])
+
+
+def rebuild_index(words):
+    """
+    Replace the whole index with the given words (a queryset, also a historical
+    one in migrations). Returns the number indexed.
+    """
+    if not is_available():
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for word in words.prefetch_related('example_sentences').iterator(chunk_size=500):
+            examples = [example.text for example in word.example_sentences.all()]
+            cursor.execute(INSERT_SQL, [word.pk] + document_values(word, examples))
+            count += 1
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES (%s, %s)",
+            ['rank', f"bm25({', '.join(str(w) for w in BM25_WEIGHTS)})"]
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def search_words(queryset, text):
+    """
+    Filter a Word queryset to words matching `text` (the last word as a prefix),
+    best matches first.
+    """
+    match = build_match_query(fold(text))
+    if not match:
+        return queryset.none()
+
+    if not is_available():
+        return queryset.filter(
+            Q(text__icontains=text) |
+            Q(definition__icontains=text)
+        ).order_by('text')
+
+    return queryset.filter(
+        search_index__document__match=match
+    ).order_by('search_index__rank', 'text')
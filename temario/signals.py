@@ -0,0 +1,153 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import counts, fragments, fuzzy, search
+from .models import ExampleSentence, ThematicCategory, Word
+
+
+# ========================================
+# SEARCH INDEX
+# ========================================
+@receiver(post_save, sender=Word)
+def index_word(sender, instance, **kwargs):
+    """Keep the search index in sync with the saved word."""
+    search.index_word(instance)
+
+
+@receiver(post_delete, sender=Word)
+def unindex_word(sender, instance, **kwargs):
+    """Remove a deleted word from the search index."""
+    search.remove_word(instance.pk)
+
+
+@receiver(post_save, sender=ExampleSentence)
+@receiver(post_delete, sender=ExampleSentence)
+def reindex_example_word(sender, instance, **kwargs):
+    """Example sentences are indexed with their word."""
+    word = Word.objects.filter(pk=instance.word_id).first()
+    if word is not None:
+        search.index_word(word)
+
+
+# ========================================
+# FUZZY INDEX ("did you mean")
+# ========================================
+@receiver(post_save, sender=Word)
+def update_fuzzy_word(sender, instance, update_fields=None, **kwargs):
+    """Only the word text is in the index."""
+    if update_fields is None or 'text' in update_fields:
+        fuzzy.update_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Word)
+def remove_fuzzy_word(sender, instance, **kwargs):
+    fuzzy.update_on_commit(instance.pk)
+
+
+# ========================================
+# CATEGORY WORD COUNTS
+# ========================================
+@receiver(m2m_changed, sender=Word.thematic_categories.through)
+def count_category_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    post_add's pk_set only holds the links actually created, but remove() and
+    clear() don't say which links existed, so those are looked up beforehand.
+    """
+    if action == 'post_add':
+        if reverse:
+            counts.apply_changes({instance.pk: len(pk_set)})
+        else:
+            counts.apply_changes(dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear'):
+        if reverse:
+            removed = counts.links(word_ids=pk_set, category_ids=[instance.pk])
+        else:
+            removed = counts.links(word_ids=[instance.pk], category_ids=pk_set)
+        instance._removed_category_links = removed
+    elif action in ('post_remove', 'post_clear'):
+        counts.apply_changes(counts.subtract(instance.__dict__.pop('_removed_category_links', {})))
+
+
+@receiver(pre_delete, sender=Word)
+def remember_word_categories(sender, instance, **kwargs):
+    """A deleted word's links go with it without m2m_changed."""
+    instance._removed_category_links = counts.links(word_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Word)
+def uncount_deleted_word(sender, instance, **kwargs):
+    counts.apply_changes(counts.subtract(instance.__dict__.pop('_removed_category_links', {})))
+
+
+# ========================================
+# DETAIL PAGE FRAGMENTS
+# ========================================
+@receiver(pre_save, sender=Word)
+def remember_word_text(sender, instance, **kwargs):
+    """Remember the stored text, in case the word is renamed."""
+    if not instance._state.adding:
+        instance._previous_text = Word.objects.filter(pk=instance.pk).values_list('text', flat=True).first()
+
+
+@receiver(post_save, sender=Word)
+def invalidate_saved_word(sender, instance, created, **kwargs):
+    texts = {instance.text, getattr(instance, '_previous_text', None)} - {None}
+    category_ids = () if created else fragments.linked_category_ids([instance.pk])
+    fragments.invalidate_on_commit(texts, category_ids)
+
+
+@receiver(pre_delete, sender=Word)
+def remember_deleted_word_categories(sender, instance, **kwargs):
+    instance._fragment_category_ids = fragments.linked_category_ids([instance.pk])
+
+
+@receiver(post_delete, sender=Word)
+def invalidate_deleted_word(sender, instance, **kwargs):
+    fragments.invalidate_on_commit([instance.text], getattr(instance, '_fragment_category_ids', ()))
+
+
+@receiver(post_save, sender=ExampleSentence)
+@receiver(post_delete, sender=ExampleSentence)
+def invalidate_example_word(sender, instance, **kwargs):
+    """Examples are shown on the word's page and on its categories' pages."""
+    fragments.invalidate_on_commit(
+        fragments.word_texts([instance.word_id]), fragments.linked_category_ids([instance.word_id])
+    )
+
+
+@receiver(m2m_changed, sender=Word.thematic_categories.through)
+def invalidate_category_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Both the word and the category page list the other side of a link."""
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_links = fragments.category_word_texts(instance.pk)
+        else:
+            instance._cleared_links = fragments.linked_category_ids([instance.pk])
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if action == 'post_clear':
+            other_side = instance.__dict__.pop('_cleared_links', set())
+        elif reverse:
+            other_side = fragments.word_texts(pk_set)
+        else:
+            other_side = pk_set
+        if reverse:
+            fragments.invalidate_on_commit(other_side, [instance.pk])
+        else:
+            fragments.invalidate_on_commit([instance.text], other_side)
+
+
+@receiver(post_save, sender=ThematicCategory)
+def invalidate_saved_category(sender, instance, created, **kwargs):
+    """Category names and descriptions are shown on the pages of its words."""
+    texts = () if created else fragments.category_word_texts(instance.pk)
+    fragments.invalidate_on_commit(texts, [instance.pk])
+
+
+@receiver(pre_delete, sender=ThematicCategory)
+def remember_category_words(sender, instance, **kwargs):
+    instance._fragment_texts = fragments.category_word_texts(instance.pk)
+
+
+@receiver(post_delete, sender=ThematicCategory)
+def invalidate_deleted_category(sender, instance, **kwargs):
+    fragments.invalidate_on_commit(getattr(instance, '_fragment_texts', ()), [instance.pk])
@@ -1,3 +1,342 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import counts, fuzzy
+from .models import ExampleSentence, ThematicCategory, Word
+
+
+class WordListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        food = ThematicCategory.objects.create(name="Comida")
+        home = ThematicCategory.objects.create(name="Casa")
+        for number in range(15):
+            word = Word.objects.create(text=f"palabra{number:02d}", definition="Una palabra")
+            word.thematic_categories.add(food, home)
+            for example in range(5):
+                ExampleSentence.objects.create(word=word, text=f"Ejemplo {example} de palabra{number:02d}")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        # count, words, categories of the page, first examples of the page, category filter
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("temario:index"))
+        self.assertEqual(len(response.context["words"]), 12)
+        self.assertContains(response, "Comida", count=13)  # 12 cards + the filter dropdown
+
+    def test_cards_show_the_first_three_examples(self):
+        response = self.client.get(reverse("temario:index"))
+        word = response.context["words"][0]
+        self.assertEqual(
+            [example.text for example in word.card_examples],
+            ["Ejemplo 0 de palabra00", "Ejemplo 1 de palabra00", "Ejemplo 2 de palabra00"]
+        )
+        self.assertNotContains(response, "Ejemplo 3 de palabra00")
+
+
+class WordSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tree = Word.objects.create(text="árbol", definition="Planta de tronco leñoso")
+        cls.child = Word.objects.create(text="niño", definition="Persona de poca edad")
+        cls.house = Word.objects.create(text="casa", definition="Edificio para vivir")
+
+    def setUp(self):
+        # Word saves write the fuzzy index snapshot
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(TEMARIO_FUZZY_INDEX_PATH=os.path.join(directory, "fuzzy.npz"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def search(self, query):
+        response = self.client.get(reverse("temario:index"), {"search": query})
+        return [word.text for word in response.context["words"]]
+
+    def test_accents_and_case_are_folded(self):
+        self.assertEqual(self.search("arbol"), ["árbol"])
+        self.assertEqual(self.search("ÁRBOL"), ["árbol"])
+        self.assertEqual(self.search("nino"), ["niño"])
+        self.assertEqual(self.search("leñoso"), ["árbol"])
+
+    def test_prefix_of_the_last_word(self):
+        self.assertEqual(self.search("ar"), ["árbol"])
+        self.assertEqual(self.search("edificio pa"), ["casa"])
+
+    def test_word_matches_rank_above_definition_matches(self):
+        Word.objects.create(text="edificio", definition="Construcción grande")
+        self.assertEqual(self.search("edificio"), ["edificio", "casa"])
+
+    def test_example_sentences_are_indexed_with_their_word(self):
+        example = ExampleSentence.objects.create(word=self.house, text="Vivo en una casa azul")
+        self.assertEqual(self.search("azul"), ["casa"])
+
+        example.text = "Vivo en una casa roja"
+        example.save()
+        self.assertEqual(self.search("azul"), [])
+        self.assertEqual(self.search("roja"), ["casa"])
+
+        example.delete()
+        self.assertEqual(self.search("roja"), [])
+
+    def test_saved_and_deleted_words(self):
+        self.house.definition = "Vivienda"
+        self.house.save()
+        self.assertEqual(self.search("edificio"), [])
+        self.assertEqual(self.search("vivienda"), ["casa"])
+
+        self.house.delete()
+        self.assertEqual(self.search("vivienda"), [])
+
+    def test_punctuation_only_query(self):
+        self.assertEqual(self.search('"*()'), [])
+
+
+class FuzzyIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for text in ("árbol", "abuela", "mesa", "ventana", "zanahoria", "caballo", "cabello"):
+            Word.objects.create(text=text, definition="-")
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "fuzzy.npz")
+        override = override_settings(TEMARIO_FUZZY_INDEX_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command("rebuild_fuzzy_index", stdout=StringIO())
+        # Run the background patches inline
+        patcher = mock.patch.object(fuzzy, "update_in_background", side_effect=fuzzy.update_word)
+        self.update_in_background = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggestions(self, query):
+        return [text for text, word_id, edits in fuzzy.suggest(query)]
+
+    def test_typos_within_two_edits(self):
+        self.assertEqual(self.suggestions("arbl"), ["árbol"])
+        self.assertEqual(self.suggestions("ventaan"), ["ventana"])  # transposition: one edit
+        self.assertEqual(self.suggestions("sanaoria"), ["zanahoria"])
+        self.assertEqual(self.suggestions("cabllo"), ["caballo", "cabello"])
+        self.assertEqual(self.suggestions("xyzzy"), [])
+        self.assertEqual(self.suggestions("ab"), [])
+
+    def test_snapshot_is_reused_until_the_words_change(self):
+        index = fuzzy.FuzzyIndex.load(self.path)
+        self.assertEqual(index.version, fuzzy.database_version())
+        self.assertEqual(index.lookup("meza"), fuzzy.get_index().lookup("meza"))
+
+    def test_requests_never_build_the_index(self):
+        # Words imported behind the signals: the stale index is served, not rebuilt
+        Word.objects.bulk_create([Word(text="silla", definition="-")])
+        with self.assertLogs("temario.fuzzy", "WARNING"):
+            fuzzy.warm()
+        self.assertEqual(self.suggestions("sila"), [])
+        self.assertNotEqual(fuzzy.FuzzyIndex.load(self.path).version, fuzzy.database_version())
+
+        # A one-word update doesn't vouch for the rest of the table
+        version = fuzzy.FuzzyIndex.load(self.path).version
+        with self.captureOnCommitCallbacks(execute=True):
+            Word.objects.create(text="murciélago", definition="-")
+        self.assertEqual(fuzzy.FuzzyIndex.load(self.path).version, version)
+
+        call_command("rebuild_fuzzy_index", stdout=StringIO())
+        self.assertEqual(self.suggestions("sila"), ["silla"])
+        self.assertEqual(fuzzy.FuzzyIndex.load(self.path).version, fuzzy.database_version())
+
+        # Without a snapshot there are no suggestions, and saves don't build one
+        os.remove(self.path)
+        fuzzy.forget_index("TEMARIO_FUZZY_INDEX_PATH")
+        self.assertEqual(self.suggestions("sila"), [])
+        with self.assertLogs("temario.fuzzy", "WARNING"), self.captureOnCommitCallbacks(execute=True):
+            Word.objects.create(text="sillón", definition="-")
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_saved_and_deleted_words_update_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            word = Word.objects.create(text="murciélago", definition="-")
+        # Queued once committed, not patched inside the save
+        self.update_in_background.assert_called_once_with(word.pk)
+        self.assertEqual(self.suggestions("murcielgo"), ["murciélago"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word.text = "mariposa"
+            word.save()
+        self.assertEqual(self.suggestions("murcielgo"), [])
+        self.assertEqual(self.suggestions("mariposs"), ["mariposa"])
+        # Written to the snapshot that other workers load
+        self.assertEqual(fuzzy.FuzzyIndex.load(self.path).lookup("mariposs")[0][0], "mariposa")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word.delete()
+        self.assertEqual(self.suggestions("mariposs"), [])
+        self.assertEqual(self.suggestions("arbl"), ["árbol"])
+
+    def test_word_list_offers_suggestions_when_nothing_matches(self):
+        response = self.client.get(reverse("temario:index"), {"search": "zanaoria"})
+        self.assertEqual(response.context["suggestions"], ["zanahoria"])
+        self.assertContains(response, '<a href="?search=zanahoria">zanahoria</a>', html=True)
+
+
+class CategoryWordCountTests(TestCase):
+    def setUp(self):
+        self.food = ThematicCategory.objects.create(name="Comida")
+        self.home = ThematicCategory.objects.create(name="Casa")
+
+    def assertCounts(self, food, home):
+        self.food.refresh_from_db()
+        self.home.refresh_from_db()
+        self.assertEqual((self.food.word_count, self.home.word_count), (food, home))
+
+    def test_counts_follow_links_from_both_sides(self):
+        pan = Word.objects.create(text="pan", definition="Bread")
+        mesa = Word.objects.create(text="mesa", definition="Table")
+        pan.thematic_categories.add(self.food, self.home)
+        pan.thematic_categories.add(self.food)  # already linked
+        self.home.words.add(mesa)
+        self.assertCounts(1, 2)
+
+        pan.thematic_categories.remove(self.home, self.food)
+        pan.thematic_categories.remove(self.food)  # not linked any more
+        self.assertCounts(0, 1)
+
+        pan.thematic_categories.set([self.food, self.home])
+        self.home.words.remove(mesa)
+        self.assertCounts(1, 1)
+
+        self.food.words.add(mesa)
+        self.food.words.clear()
+        self.assertCounts(0, 1)
+
+        pan.thematic_categories.clear()
+        self.assertCounts(0, 0)
+
+    def test_saving_a_stale_category_keeps_its_count(self):
+        stale = ThematicCategory.objects.get(pk=self.food.pk)
+        Word.objects.create(text="pan", definition="Bread").thematic_categories.add(self.food)
+
+        stale.description = "Cosas de comer"
+        stale.save()
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.description, "Cosas de comer")
+        self.assertCounts(1, 0)
+
+    def test_deleting_words_uncounts_their_links(self):
+        pan = Word.objects.create(text="pan", definition="Bread")
+        mesa = Word.objects.create(text="mesa", definition="Table")
+        pan.thematic_categories.add(self.food, self.home)
+        mesa.thematic_categories.add(self.home)
+
+        pan.delete()
+        self.assertCounts(0, 1)
+        Word.objects.all().delete()
+        self.assertCounts(0, 0)
+
+    def test_repair_recomputes_drifted_counts(self):
+        pan = Word.objects.create(text="pan", definition="Bread")
+        counts.Link.objects.bulk_create([
+            counts.Link(word=pan, thematiccategory=self.food),
+            counts.Link(word=pan, thematiccategory=self.home),
+        ])
+        ThematicCategory.objects.filter(pk=self.home.pk).update(word_count=7)
+        self.assertCounts(0, 7)
+
+        output = StringIO()
+        call_command("repair_word_counts", stdout=output)
+        self.assertIn("2 categories were wrong", output.getvalue())
+        self.assertCounts(1, 1)
+        self.assertEqual(counts.rebuild(), 0)
+
+
+class DetailPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.food = ThematicCategory.objects.create(name="Comida", description="Cosas de comer")
+        cls.home = ThematicCategory.objects.create(name="Casa")
+        cls.bread = Word.objects.create(text="pan", definition="Bread")
+        cls.bread.thematic_categories.add(cls.food)
+        cls.loaf = Word.objects.create(text="pan", definition="Loaf")
+        cls.loaf.thematic_categories.add(cls.home)
+        ExampleSentence.objects.create(word=cls.bread, text="Compro pan.")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, pk):
+        response = self.client.get(reverse(f"temario:{name}", args=[pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode("utf-8")
+
+    def test_word_page_lists_every_meaning_of_its_text(self):
+        page = self.get("word_detail", self.bread.pk)
+        self.assertIn("Bread", page)
+        self.assertIn("Loaf", page)
+        self.assertIn("Compro pan.", page)
+        self.assertIn(reverse("temario:category_detail", args=[self.home.pk]), page)
+        self.assertEqual(page, self.get("word_detail", self.loaf.pk))
+
+    def test_repeat_visits_only_look_up_the_object(self):
+        self.get("word_detail", self.bread.pk)
+        self.get("category_detail", self.food.pk)
+        with self.assertNumQueries(1):
+            self.assertIn("Bread", self.get("word_detail", self.bread.pk))
+        with self.assertNumQueries(1):
+            self.assertIn("Compro pan.", self.get("category_detail", self.food.pk))
+
+    def test_unknown_pages_are_404(self):
+        self.assertEqual(self.client.get(reverse("temario:word_detail", args=[999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("temario:category_detail", args=[999])).status_code, 404)
+
+    def test_word_and_example_changes_refresh_both_pages(self):
+        self.get("word_detail", self.bread.pk)
+        self.get("category_detail", self.food.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExampleSentence.objects.create(word=self.bread, text="Pan con tomate.")
+        self.assertIn("Pan con tomate.", self.get("word_detail", self.loaf.pk))
+        self.assertIn("Pan con tomate.", self.get("category_detail", self.food.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bread.definition = "Fresh bread"
+            self.bread.save()
+        self.assertIn("Fresh bread", self.get("word_detail", self.loaf.pk))
+        self.assertIn("Fresh bread", self.get("category_detail", self.food.pk))
+
+        # Renaming moves the meaning off the old text's page
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bread.text = "barra"
+            self.bread.save()
+        self.assertNotIn("Fresh bread", self.get("word_detail", self.loaf.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bread.delete()
+        self.assertNotIn("barra", self.get("category_detail", self.food.pk))
+
+    def test_link_and_category_changes_refresh_both_pages(self):
+        self.get("word_detail", self.bread.pk)
+        self.get("category_detail", self.home.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bread.thematic_categories.add(self.home)
+        self.assertIn("Bread", self.get("category_detail", self.home.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.home.words.clear()
+        self.assertNotIn("Bread", self.get("category_detail", self.home.pk))
+        self.assertNotIn(reverse("temario:category_detail", args=[self.home.pk]), self.get("word_detail", self.bread.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.description = "Todo lo que se come"
+            self.food.save()
+        self.assertIn("Todo lo que se come", self.get("word_detail", self.bread.pk))
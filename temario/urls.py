@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import WordListView
+from .views import CategoryDetailView, WordDetailView, WordListView
 
 app_name = 'temario'
 
 urlpatterns = [
     path('', WordListView.as_view(), name='index'),
+    path('word/<int:pk>/', WordDetailView.as_view(), name='word_detail'),
+    path('category/<int:pk>/', CategoryDetailView.as_view(), name='category_detail'),
     # If using function-based view instead:
     # path('', views.index, name='index'),
 ]
\ No newline at end of file
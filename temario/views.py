@@ -1,6 +1,6 @@
 # views.py
-from django.views.generic import ListView
-from django.db.models import Q
+from django.views.generic import DetailView, ListView
+from . import fragments, fuzzy, search
 from .models import Word, ThematicCategory
 
 class WordListView(ListView):
@@ -10,15 +10,12 @@ class WordListView(ListView):
     paginate_by = 12  # Show 12 words per page
     
     def get_queryset(self):
-        queryset = Word.objects.all().order_by('text')
+        queryset = Word.objects.cards().order_by('text')
         
-        # Apply search filter if provided
+        # Apply search filter if provided (accent-insensitive, best matches first)
         search_query = self.request.GET.get('search', '')
         if search_query:
-            queryset = queryset.filter(
-                Q(text__icontains=search_query) |
-                Q(definition__icontains=search_query)
-            )
+            queryset = search.search_words(queryset, search_query)
         
         # Apply category filter if provided
         category_id = self.request.GET.get('category', '')
@@ -30,6 +27,11 @@ class WordListView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
+        # "Did you mean" when a search finds nothing
+        search_query = self.request.GET.get('search', '')
+        if search_query and not context['words']:
+            context['suggestions'] = list(dict.fromkeys(text for text, word_id, edits in fuzzy.suggest(search_query)))
+        
         # Add all thematic categories for the dropdown filter
         context['thematic_categories'] = ThematicCategory.objects.all().order_by('name')
         
@@ -39,3 +41,35 @@ class WordListView(ListView):
             context['selected_category'] = ThematicCategory.objects.filter(id=category_id).first()
             
         return context
+
+
+class WordDetailView(DetailView):
+    """
+    Every meaning of a word: all Word rows that share its text. The meanings are
+    only queried when the temario_word fragment isn't cached (temario/fragments.py),
+    so a repeat visit costs one primary key lookup.
+    """
+    model = Word
+    template_name = 'temario/word_detail.html'
+    context_object_name = 'word'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        text = self.object.text
+        context['meanings'] = Word.objects.meanings().filter(text=text).order_by('pk')
+        context['related_categories'] = ThematicCategory.objects.filter(words__text=text).distinct().order_by('name')
+        context['fragment_timeout'] = fragments.get_timeout()
+        return context
+
+
+class CategoryDetailView(DetailView):
+    """The words of a category, cached as the temario_category fragment."""
+    model = ThematicCategory
+    template_name = 'temario/category_detail.html'
+    context_object_name = 'category'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['meanings'] = self.object.words.cards().order_by('text', 'pk')
+        context['fragment_timeout'] = fragments.get_timeout()
+        return context